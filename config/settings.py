@@ -81,6 +81,7 @@ EXTRA_LINKS = [s.strip() for s in os.getenv("BETNACIONAL_LINKS", "").split(",")
 # Configurações de Logging
 # ================================
 LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text | json (uma linha JSON por registro)
 os.makedirs(LOG_DIR, exist_ok=True)
 
 # ================================
@@ -88,6 +89,8 @@ os.makedirs(LOG_DIR, exist_ok=True)
 # ================================
 START_ALERT_MIN = int(os.getenv("START_ALERT_MIN", "15"))
 LATE_WATCH_WINDOW_MIN = int(os.getenv("LATE_WATCH_WINDOW_MIN", "130"))
+# Lembretes consolidados (utils/reminder_consolidator.py) no lugar do lembrete T-15 por jogo
+REMINDER_CONSOLIDATION = os.getenv("ENABLE_REMINDER_CONSOLIDATION", "false").lower() == "true"
 
 # ================================
 # Configurações de Watchlist
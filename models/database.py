@@ -1,12 +1,37 @@
 """Modelos de banco de dados e setup."""
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, Text, DateTime, Boolean, JSON, func, UniqueConstraint, text, Index, ForeignKey
+    create_engine, Column, Integer, String, Float, Text, Date, DateTime, Boolean, JSON, func, UniqueConstraint, text, Index, ForeignKey
 )
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
-from config.settings import DB_URL
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, validates
+import pytz
+from config.settings import DB_URL, ZONE
 
 Base = declarative_base()
-engine = create_engine(DB_URL, echo=False, future=True)
+
+
+def _engine_options(url: str) -> dict:
+    """
+    Opções específicas do banco/driver.
+    
+    - Bancos com servidor: conexões do pool validadas no checkout e recicladas
+      a cada 30 min (evita usar conexões derrubadas pelo servidor)
+    - psycopg2: executemany em lote
+    """
+    u = make_url(url)
+    options = {}
+    if u.get_backend_name() != "sqlite":
+        options.update(pool_pre_ping=True, pool_recycle=1800)
+    if u.get_backend_name() == "postgresql" and u.get_driver_name() == "psycopg2":
+        options.update(
+            executemany_mode="values_plus_batch",
+            insertmanyvalues_page_size=500,
+            executemany_batch_page_size=500,
+        )
+    return options
+
+
+engine = create_engine(DB_URL, echo=False, future=True, **_engine_options(DB_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
 
@@ -20,6 +45,8 @@ class Game(Base):
     team_home = Column(String)
     team_away = Column(String)
     start_time = Column(DateTime, index=True)  # UTC
+    start_hhmm_local = Column(String(5), nullable=True)  # "HH:MM" no fuso ZONE (pré-calculado)
+    start_date_local = Column(Date, nullable=True)  # Data local no fuso ZONE (pré-calculada)
     odds_home = Column(Float)
     odds_draw = Column(Float)
     odds_away = Column(Float)
@@ -36,6 +63,8 @@ class Game(Base):
     final_score_away = Column(Integer, nullable=True)  # Gols do time visitante
     final_score = Column(String, nullable=True)  # "2-1" (formato legível)
     result_fetched_at = Column(DateTime, nullable=True)  # Quando o resultado foi obtido
+    last_result_attempt_at = Column(DateTime, nullable=True)  # Última tentativa de buscar o resultado
+    result_attempt_failures = Column(Integer, default=0)  # Tentativas consecutivas sem resultado (backoff)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
@@ -51,7 +80,34 @@ class Game(Base):
         Index('idx_game_outcome', 'outcome'),
         Index('idx_game_hit', 'hit'),
         Index('idx_game_pick_notified', 'pick_notified_at'),
+        # Consultas de jogos pendentes (recuperação/resumo): will_bet + outcome + faixa de horário
+        Index('idx_game_recovery', 'will_bet', 'outcome', 'start_time', 'status'),
+        # Janela de lembretes/agendados: igualdade em will_bet/status + faixa de start_time
+        Index('idx_game_reminder_window', 'will_bet', 'status', 'start_time'),
     )
+    
+    @validates("start_time")
+    def _set_local_start(self, key, value):
+        """Mantém start_hhmm_local/start_date_local em sincronia com start_time."""
+        hhmm, day = local_start_fields(value)
+        self.start_hhmm_local = hhmm
+        self.start_date_local = day
+        return value
+
+
+def local_start_fields(start_utc):
+    """
+    Calcula ("HH:MM", data) locais de um horário de início em UTC.
+    
+    Feito uma vez na escrita para que os resumos não precisem de
+    astimezone/strftime a cada renderização.
+    """
+    if start_utc is None:
+        return None, None
+    if start_utc.tzinfo is None:
+        start_utc = pytz.UTC.localize(start_utc)
+    local = start_utc.astimezone(ZONE)
+    return local.strftime("%H:%M"), local.date()
 
 
 class Stat(Base):
@@ -61,6 +117,19 @@ class Stat(Base):
     value = Column(JSON)
 
 
+class WatchlistItem(Base):
+    __tablename__ = "watchlist_items"
+    id = Column(Integer, primary_key=True)  # Ordem de inserção
+    ext_id = Column(String, nullable=False)
+    start_time = Column(String, nullable=False)  # ISO 8601 (UTC), como gravado por wl_add
+    link = Column(String)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("ext_id", "start_time", name="uq_watchlist_extid_start"),
+    )
+
+
 class LiveGameTracker(Base):
     __tablename__ = "live_game_trackers"
     id = Column(Integer, primary_key=True)
@@ -177,6 +246,15 @@ def _safe_add_column(table: str, coldef: str):
         pass  # já existe
 
 
+def _safe_create_index(name: str, table: str, columns: str):
+    """Cria índice em tabela já existente (create_all não adiciona índices novos)."""
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    except Exception:
+        pass  # já existe ou dialeto sem suporte
+
+
 def _safe_migrate_metadata_column():
     """Migra coluna 'metadata' para 'event_metadata' se necessário."""
     try:
@@ -221,6 +299,29 @@ def _safe_migrate_metadata_column():
             pass  # Ignora erro se não conseguir migrar
 
 
+def _safe_migrate_watchlist_blob():
+    """Move a watchlist antiga (JSON em stats.key='watchlist') para watchlist_items."""
+    try:
+        with engine.begin() as conn:
+            stats = Stat.__table__
+            blob = conn.execute(
+                stats.select().with_only_columns(stats.c.value).where(stats.c.key == "watchlist")
+            ).scalar_one_or_none()
+            if blob is None:
+                return
+            rows, seen = [], set()
+            for it in (blob or {}).get("items", []):
+                key = (it.get("ext_id"), it.get("start_time"))
+                if key[0] and key[1] and key not in seen:
+                    seen.add(key)
+                    rows.append({"ext_id": key[0], "start_time": key[1], "link": it.get("link")})
+            if rows:
+                conn.execute(WatchlistItem.__table__.insert(), rows)
+            conn.execute(stats.delete().where(stats.c.key == "watchlist"))
+    except Exception:
+        pass  # Mantém o blob; a próxima inicialização tenta de novo
+
+
 def init_database():
     """Inicializa o banco de dados criando todas as tabelas e migrações."""
     Base.metadata.create_all(engine)
@@ -241,8 +342,18 @@ def init_database():
     _safe_add_column("games", "final_score_away INTEGER")
     _safe_add_column("games", "final_score TEXT")
     _safe_add_column("games", "result_fetched_at DATETIME")
+    _safe_add_column("games", "last_result_attempt_at DATETIME")
+    _safe_add_column("games", "result_attempt_failures INTEGER")
+    # Migração: horário/data locais pré-calculados do início do jogo
+    _safe_add_column("games", "start_hhmm_local VARCHAR(5)")
+    _safe_add_column("games", "start_date_local DATE")
+    # Migração: índice composto para as consultas de jogos pendentes
+    _safe_create_index("idx_game_recovery", "games", "will_bet, outcome, start_time, status")
+    _safe_create_index("idx_game_reminder_window", "games", "will_bet, status, start_time")
     # Migração: renomear coluna 'metadata' para 'event_metadata' em analytics_events
     _safe_migrate_metadata_column()
+    # Migração: watchlist sai do blob JSON em stats para uma tabela própria
+    _safe_migrate_watchlist_blob()
 
 
 # Inicializa o banco ao importar o módulo
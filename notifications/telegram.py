@@ -1,9 +1,12 @@
 """Envio de mensagens via Telegram."""
-from typing import Optional
+from typing import Any, Dict, Iterable, Optional
 import requests
 from config.settings import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_TIMEOUT
 from utils.logger import logger
 
+# Sessão HTTP compartilhada: mantém a conexão keep-alive com a API do Telegram
+_http = requests.Session()
+
 
 def tg_send_message(text: str, parse_mode: Optional[str] = "HTML", message_type: Optional[str] = None, game_id: Optional[int] = None, ext_id: Optional[str] = None, skip_rate_limit: bool = False) -> None:
     """
@@ -69,7 +72,7 @@ def tg_send_message(text: str, parse_mode: Optional[str] = "HTML", message_type:
     if parse_mode:  # só inclui quando tem valor válido
         payload["parse_mode"] = parse_mode
     try:
-        r = requests.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
+        r = _http.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
         if r.status_code != 200:
             error_msg = f"HTTP {r.status_code}: {r.text[:300]}"
             logger.error("Telegram %s: %s", r.status_code, r.text[:300])
@@ -105,6 +108,17 @@ def tg_send_message(text: str, parse_mode: Optional[str] = "HTML", message_type:
         )
 
 
+def tg_send_many(messages: Iterable[Dict[str, Any]]) -> None:
+    """
+    Envia várias mensagens em sequência sobre a mesma conexão HTTP.
+    
+    Args:
+        messages: Dicts com os argumentos de `tg_send_message` (text, message_type, game_id, ...)
+    """
+    for message in messages:
+        tg_send_message(**message)
+
+
 def h(b: str) -> str:
     """Helper para texto em negrito HTML."""
     return f"<b>{b}</b>"
@@ -4,7 +4,6 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Any, Dict, List
 import pytz
-from sqlalchemy.exc import IntegrityError
 
 from config.settings import (
     ZONE, HIGH_CONF_THRESHOLD, MIN_EV, MIN_PROB, WATCHLIST_DELTA, WATCHLIST_MIN_LEAD_MIN,
@@ -12,14 +11,15 @@ from config.settings import (
     ONLY_HIGH_CONF_GAMES
 )
 from utils.logger import logger
-from utils.stats import to_aware_utc, save_odd_history
+from utils.stats import to_aware_utc, save_odd_history_bulk
+from utils.game_helpers import game_values_from_event, upsert_games_from_events
 from models.database import Game, SessionLocal
 from scraping.fetchers import fetch_events_from_link
 from scraping.betnacional import parse_local_datetime
 from betting.decision import decide_bet
 from notifications.telegram import tg_send_message
 from utils.formatters import fmt_pick_now, fmt_dawn_games_summary, fmt_today_games_summary
-from watchlist.manager import wl_add
+from watchlist.manager import wl_add_many
 from scheduler.jobs import scheduler
 
 
@@ -57,7 +57,12 @@ async def scan_games_for_date(
                 continue
             
             analyzed_total += len(evs)
+            # Jogos selecionados neste link: histórico de odds gravado em lote ao final
+            odd_history_games: List[Game] = []
             
+            # Decisão de cada evento; os jogos são gravados depois em um único UPSERT em lote
+            decided: List[tuple] = []
+            game_rows: List[Dict[str, Any]] = []
             for ev in evs:
                 try:
                     start_utc = parse_local_datetime(getattr(ev, "start_local_str", ""))
@@ -86,98 +91,41 @@ async def scan_games_for_date(
                         # Comportamento normal: seleciona se will=True ou alta confiança
                         should_save = will or free_pass
                     
-                    # SALVAR TODOS OS JOGOS NO BANCO (mesmo os não selecionados)
-                    # Isso garante que o sistema tenha histórico completo e possa recuperar após reiniciar
-                    
-                    # Upsert do jogo (salva sempre, mas will_bet só é True se selecionado)
-                    g = session.query(Game).filter_by(ext_id=ev.ext_id, start_time=start_utc).one_or_none()
-                    if g:
-                        # Atualiza jogo existente
-                        g.source_link = url
-                        g.game_url = getattr(ev, "game_url", None) or g.game_url
-                        g.competition = ev.competition or g.competition
-                        g.team_home = ev.team_home or g.team_home
-                        g.team_away = ev.team_away or g.team_away
-                        g.odds_home = ev.odds_home
-                        g.odds_draw = ev.odds_draw
-                        g.odds_away = ev.odds_away
-                        g.pick = pick
-                        g.pick_prob = pprob
-                        g.pick_ev = pev
-                        g.pick_reason = reason
-                        # Atualiza will_bet se agora foi selecionado
-                        if should_save:
-                            g.will_bet = True
-                        # Se já estava marcado como will_bet=True, mantém
-                        # Preserva status se já for "live" ou "ended"
-                        if g.status not in ("live", "ended"):
-                            g.status = "live" if getattr(ev, "is_live", False) else "scheduled"
-                        session.commit()
-                    else:
-                        # Cria novo jogo (sempre salva, mesmo se não selecionado)
-                        g = Game(
-                            ext_id=ev.ext_id,
-                            source_link=url,
-                            game_url=getattr(ev, "game_url", None),
-                            competition=ev.competition,
-                            team_home=ev.team_home,
-                            team_away=ev.team_away,
-                            start_time=start_utc,
-                            odds_home=ev.odds_home,
-                            odds_draw=ev.odds_draw,
-                            odds_away=ev.odds_away,
-                            pick=pick,
-                            pick_prob=pprob,
-                            pick_ev=pev,
-                            will_bet=should_save,  # True se selecionado, False caso contrário
-                            pick_reason=reason,
-                            status="live" if getattr(ev, "is_live", False) else "scheduled",
-                        )
-                        session.add(g)
-                        try:
-                            session.commit()
-                        except IntegrityError:
-                            session.rollback()
-                            # Se falhou por constraint único, tenta atualizar
-                            g = session.query(Game).filter_by(ext_id=ev.ext_id, start_time=start_utc).one_or_none()
-                            if g:
-                                g.source_link = url
-                                g.game_url = getattr(ev, "game_url", None) or g.game_url
-                                g.competition = ev.competition or g.competition
-                                g.team_home = ev.team_home or g.team_home
-                                g.team_away = ev.team_away or g.team_away
-                                g.odds_home = ev.odds_home
-                                g.odds_draw = ev.odds_draw
-                                g.odds_away = ev.odds_away
-                                g.pick = pick
-                                g.pick_prob = pprob
-                                g.pick_ev = pev
-                                g.pick_reason = reason
-                                if should_save:
-                                    g.will_bet = True
-                                session.commit()
-                            continue
-                    
+                    status = "live" if getattr(ev, "is_live", False) else "scheduled"
+                    game_rows.append(game_values_from_event(ev, start_utc, url, pick, pprob, pev, reason, should_save, status))
+                    decided.append((ev, start_utc, should_save, free_pass, pprob, pev))
+                except Exception:
+                    logger.exception("Erro ao processar evento %s vs %s", getattr(ev, "team_home", "?"), getattr(ev, "team_away", "?"))
+            
+            # SALVAR TODOS OS JOGOS NO BANCO (mesmo os não selecionados)
+            # Isso garante que o sistema tenha histórico completo e possa recuperar após reiniciar
+            # Upsert em lote (salva sempre, mas will_bet só passa a True se selecionado)
+            try:
+                games_by_key = {
+                    (g.ext_id, to_aware_utc(g.start_time)): g
+                    for g in upsert_games_from_events(session, game_rows, keep_will_bet=True)
+                }
+            except Exception:
+                logger.exception("Falha ao gravar jogos de %s", url)
+                continue
+            
+            # Candidatos à watchlist deste link: gravados em um único INSERT ao final
+            watch_candidates: List[tuple] = []
+            for ev, start_utc, should_save, free_pass, pprob, pev in decided:
+                try:
                     # Se não foi selecionado, adiciona à watchlist se próximo do threshold
                     if not should_save:
                         # Watchlist: adiciona se estiver próximo do threshold
                         if (pev >= (MIN_EV - WATCHLIST_DELTA)) and (pprob >= (MIN_PROB - 0.05)):
                             minutes_until = int((start_utc - datetime.now(pytz.UTC)).total_seconds() / 60)
                             if minutes_until >= WATCHLIST_MIN_LEAD_MIN:
-                                from utils.analytics_logger import log_watchlist_action
-                                wl_add(session, ev.ext_id, url, start_utc)
-                                log_watchlist_action(
-                                    "add", ev.ext_id,
-                                    f"Próximo do threshold (EV={pev:.3f}, prob={pprob:.3f})",
-                                    metadata={"odds_home": ev.odds_home, "odds_draw": ev.odds_draw, "odds_away": ev.odds_away}
-                                )
-                                logger.info("👀 Adicionado à watchlist: %s vs %s", ev.team_home, ev.team_away)
+                                watch_candidates.append((ev, start_utc, pev, pprob))
                         # Jogo foi salvo mas não foi selecionado - não conta como "stored" para relatório
                         continue  # Pula processamento adicional se não foi selecionado
                     
                     # Jogo foi selecionado (will_bet=True) - processar normalmente
+                    g = games_by_key[(ev.ext_id, start_utc)]
                     stored_total += 1
-                    session.refresh(g)
                     
                     if free_pass or ((g.pick_prob or 0.0) >= HIGH_CONF_THRESHOLD):
                         try:
@@ -186,7 +134,7 @@ async def scan_games_for_date(
                         except Exception:
                             pass
                     
-                    save_odd_history(session, g)
+                    odd_history_games.append(g)
                     
                     g_start = to_aware_utc(g.start_time)
                     chosen_view.append({
@@ -218,7 +166,7 @@ async def scan_games_for_date(
                             from utils.telegram_helpers import send_pick_with_buffer
                             send_pick_with_buffer(g)
                             # Marca como notificado no banco de dados (persiste após reiniciar)
-                            mark_pick_notified(g, session)
+                            mark_pick_notified(g, session, commit=False)
                             # Mantém compatibilidade com sistema antigo (pick_reason)
                             g.pick_reason = mark_high_conf_notified(g.pick_reason or "")
                             session.commit()
@@ -239,6 +187,23 @@ async def scan_games_for_date(
                     session.rollback()
                     logger.exception("Erro ao processar evento %s vs %s", getattr(ev, "team_home", "?"), getattr(ev, "team_away", "?"))
             
+            if watch_candidates:
+                try:
+                    from utils.analytics_logger import log_watchlist_action
+                    added = set(wl_add_many(session, [(ev.ext_id, url, start_utc) for ev, start_utc, _, _ in watch_candidates]))
+                    for ev, start_utc, pev, pprob in watch_candidates:
+                        if (ev.ext_id, start_utc.isoformat()) not in added:
+                            continue
+                        log_watchlist_action(
+                            "add", ev.ext_id,
+                            f"Próximo do threshold (EV={pev:.3f}, prob={pprob:.3f})",
+                            metadata={"odds_home": ev.odds_home, "odds_draw": ev.odds_draw, "odds_away": ev.odds_away}
+                        )
+                        logger.info("👀 Adicionado à watchlist: %s vs %s", ev.team_home, ev.team_away)
+                except Exception:
+                    logger.exception("Falha ao adicionar itens à watchlist (url=%s)", url)
+            
+            save_odd_history_bulk(session, odd_history_games)
             await asyncio.sleep(0.2)
     
     logger.info("🧾 Varredura concluída — analisados=%d | selecionados=%d | salvos=%d",
@@ -314,7 +279,7 @@ async def send_today_games() -> bool:
         ).count()
         
         logger.info("📊 Jogos de hoje: %d selecionados (de %d analisados)", len(games), total_analyzed)
-        msg = fmt_today_games_summary(games, today, total_analyzed)
+        msg = fmt_today_games_summary(games, today, total_analyzed, session=session)
         
         try:
             tg_send_message(msg, parse_mode="HTML", message_type="summary")
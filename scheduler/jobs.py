@@ -13,12 +13,13 @@ from sqlalchemy.exc import IntegrityError
 from config.settings import (
     APP_TZ, MORNING_HOUR, WATCHLIST_RESCAN_MIN, ZONE,
     HIGH_CONF_THRESHOLD, MIN_EV, MIN_PROB, WATCHLIST_DELTA, WATCHLIST_MIN_LEAD_MIN,
-    START_ALERT_MIN, LATE_WATCH_WINDOW_MIN, get_all_betting_links,
+    START_ALERT_MIN, LATE_WATCH_WINDOW_MIN, REMINDER_CONSOLIDATION, get_all_betting_links,
     is_high_conf, was_high_conf_notified, mark_high_conf_notified,
     ONLY_HIGH_CONF_GAMES
 )
 from utils.logger import logger
-from utils.stats import to_aware_utc, save_odd_history
+from utils.stats import to_aware_utc, save_odd_history, save_odd_history_bulk, invalidate_stats_cache
+from utils.game_helpers import game_values_from_event, upsert_games_from_events
 from utils.formatters import fmt_pick_now, fmt_watch_upgrade, fmt_live_bet_opportunity, format_night_scan_summary, fmt_combined_bet
 from models.database import Game, LiveGameTracker, SessionLocal, CombinedBet
 from scraping.fetchers import fetch_events_from_link, fetch_game_result, _fetch_requests_async, _fetch_with_playwright
@@ -26,7 +27,7 @@ from config.settings import HAS_PLAYWRIGHT
 from scraping.betnacional import parse_local_datetime, scrape_live_game_data
 from betting.decision import decide_bet, decide_live_bet_opportunity
 from notifications.telegram import tg_send_message
-from watchlist.manager import wl_load, wl_save, wl_add, wl_remove
+from watchlist.manager import wl_load, wl_save, wl_add_many, wl_remove, wl_invalidate
 
 scheduler = AsyncIOScheduler(
     timezone=APP_TZ,
@@ -57,9 +58,10 @@ async def _schedule_all_for_game(g: Game):
         now_utc = datetime.now(pytz.UTC)
         g_start = to_aware_utc(g.start_time)
 
-        # Lembrete T-15
+        # Lembrete T-15 (com consolidação ativa o lembrete sai pelo
+        # consolidate_reminders_job, agendado em setup_jobs)
         reminder_at = (g_start - timedelta(minutes=START_ALERT_MIN))
-        if reminder_at > now_utc:
+        if reminder_at > now_utc and not REMINDER_CONSOLIDATION:
             try:
                 scheduler.add_job(
                     send_reminder_job,
@@ -138,7 +140,12 @@ async def night_scan_for_early_games():
                 continue
 
             analyzed_total += len(evs)
+            # Jogos selecionados neste link: histórico de odds gravado em lote ao final
+            odd_history_games: List[Game] = []
 
+            # Decisão de cada evento; os jogos são gravados depois em um único UPSERT em lote
+            decided: List[tuple] = []
+            game_rows: List[Dict[str, Any]] = []
             for ev in evs:
                 try:
                     # Parse e normalização do horário
@@ -171,72 +178,32 @@ async def night_scan_for_early_games():
                             will = True
                             reason = (reason or "Passe livre") + " | HIGH_TRUST"
                         should_save = will  # Para madrugada, só salva se will=True (já inclui free_pass)
-                    
-                    # SALVAR TODOS OS JOGOS NO BANCO (mesmo os não selecionados)
-                    # Upsert do jogo (salva sempre, mas will_bet só é True se selecionado)
-                    g = session.query(Game).filter_by(ext_id=ev.ext_id, start_time=start_utc).one_or_none()
-                    if g:
-                        # Atualiza jogo existente
-                        g.source_link = url
-                        g.game_url = getattr(ev, "game_url", None) or g.game_url
-                        g.competition = ev.competition or g.competition
-                        g.team_home = ev.team_home or g.team_home
-                        g.team_away = ev.team_away or g.team_away
-                        g.odds_home = ev.odds_home
-                        g.odds_draw = ev.odds_draw
-                        g.odds_away = ev.odds_away
-                        g.pick = pick
-                        g.pick_prob = pprob
-                        g.pick_ev = pev
-                        g.pick_reason = reason
-                        if should_save:
-                            g.will_bet = True
-                        if g.status not in ("live", "ended"):
-                            g.status = "scheduled"
-                        session.commit()
-                    else:
-                        # Cria novo jogo (sempre salva, mesmo se não selecionado)
-                        g = Game(
-                            ext_id=ev.ext_id,
-                            source_link=url,
-                            game_url=getattr(ev, "game_url", None),
-                            competition=ev.competition,
-                            team_home=ev.team_home,
-                            team_away=ev.team_away,
-                            start_time=start_utc,
-                            odds_home=ev.odds_home,
-                            odds_draw=ev.odds_draw,
-                            odds_away=ev.odds_away,
-                            pick=pick,
-                            pick_prob=pprob,
-                            pick_ev=pev,
-                            will_bet=should_save,  # True se selecionado, False caso contrário
-                            pick_reason=reason,
-                            status="scheduled",
-                        )
-                        session.add(g)
-                        try:
-                            session.commit()
-                        except IntegrityError:
-                            session.rollback()
-                            g = session.query(Game).filter_by(ext_id=ev.ext_id, start_time=start_utc).one_or_none()
-                            if g:
-                                g.source_link = url
-                                g.game_url = getattr(ev, "game_url", None) or g.game_url
-                                g.competition = ev.competition or g.competition
-                                g.team_home = ev.team_home or g.team_home
-                                g.team_away = ev.team_away or g.team_away
-                                g.odds_home = ev.odds_home
-                                g.odds_draw = ev.odds_draw
-                                g.odds_away = ev.odds_away
-                                g.pick = pick
-                                g.pick_prob = pprob
-                                g.pick_ev = pev
-                                g.pick_reason = reason
-                                if should_save:
-                                    g.will_bet = True
-                                session.commit()
-                    
+
+                    game_rows.append(game_values_from_event(ev, start_utc, url, pick, pprob, pev, reason, should_save))
+                    decided.append((ev, start_utc, should_save, free_pass, pprob, pev))
+                except Exception:
+                    logger.exception(
+                        "Erro ao processar evento noturno %s vs %s (url=%s)",
+                        getattr(ev, "team_home", "?"),
+                        getattr(ev, "team_away", "?"),
+                        url,
+                    )
+
+            # SALVAR TODOS OS JOGOS NO BANCO (mesmo os não selecionados)
+            # Upsert em lote (salva sempre, mas will_bet só passa a True se selecionado)
+            try:
+                games_by_key = {
+                    (g.ext_id, to_aware_utc(g.start_time)): g
+                    for g in upsert_games_from_events(session, game_rows, keep_will_bet=True)
+                }
+            except Exception:
+                logger.exception("Falha ao gravar jogos noturnos de %s", url)
+                continue
+
+            # Candidatos à watchlist deste link: gravados em um único INSERT ao final
+            watch_candidates: List[tuple] = []
+            for ev, start_utc, should_save, free_pass, pprob, pev in decided:
+                try:
                     if not should_save:
                         # Ainda assim, avaliar ADD na watchlist
                         now_utc = datetime.now(pytz.UTC)
@@ -245,17 +212,12 @@ async def night_scan_for_early_games():
                         prob_ok = pprob >= MIN_PROB
 
                         if lead_ok and near_cut and prob_ok and not getattr(ev, "is_live", False):
-                            added = wl_add(session, ev.ext_id, url, start_utc)
-                            if added:
-                                logger.info(
-                                    "👀 Adicionado à WATCHLIST (madrugada): %s vs %s | EV=%.3f | prob=%.3f | start=%s",
-                                    ev.team_home, ev.team_away, pev, pprob, start_utc.isoformat()
-                                )
+                            watch_candidates.append((ev, start_utc, pev, pprob))
                         continue  # Pula processamento adicional se não foi selecionado
                     
                     # Jogo foi selecionado (will_bet=True) - processar normalmente
+                    g = games_by_key[(ev.ext_id, start_utc)]
                     stored_total += 1
-                    session.refresh(g)
 
                     # Marca tag se for alta confiança
                     if free_pass or ((g.pick_prob or 0.0) >= HIGH_CONF_THRESHOLD):
@@ -265,8 +227,8 @@ async def night_scan_for_early_games():
                         except Exception:
                             session.rollback()
 
-                    # Salva histórico de odds
-                    save_odd_history(session, g)
+                    # Histórico de odds (gravado em lote ao final do link)
+                    odd_history_games.append(g)
 
                     # Adiciona para o resumo
                     early_games.append({
@@ -300,7 +262,7 @@ async def night_scan_for_early_games():
                             from utils.telegram_helpers import send_pick_with_buffer
                             send_pick_with_buffer(g)
                             # Marca como notificado no banco de dados (persiste após reiniciar)
-                            mark_pick_notified(g, session)
+                            mark_pick_notified(g, session, commit=False)
                             # Mantém compatibilidade com sistema antigo (pick_reason)
                             g.pick_reason = mark_high_conf_notified(g.pick_reason or "")
                             session.commit()
@@ -322,6 +284,20 @@ async def night_scan_for_early_games():
                         url,
                     )
 
+            if watch_candidates:
+                try:
+                    added = set(wl_add_many(session, [(ev.ext_id, url, start_utc) for ev, start_utc, _, _ in watch_candidates]))
+                    for ev, start_utc, pev, pprob in watch_candidates:
+                        if (ev.ext_id, start_utc.isoformat()) in added:
+                            logger.info(
+                                "👀 Adicionado à WATCHLIST (madrugada): %s vs %s | EV=%.3f | prob=%.3f | start=%s",
+                                ev.team_home, ev.team_away, pev, pprob, start_utc.isoformat()
+                            )
+                except Exception:
+                    logger.exception("Falha ao adicionar itens à WATCHLIST (madrugada, url=%s)", url)
+
+            save_odd_history_bulk(session, odd_history_games)
+
     # Resumo da varredura noturna
     if early_games:
         msg = format_night_scan_summary(tomorrow, analyzed_total, early_games)
@@ -365,7 +341,10 @@ async def rescan_watchlist_job():
 
         # 3) Itera itens; remove passados; promove se cruzou o corte
         upgraded: List[str] = []
-        removed_expired = 0
+        # Remoções acumuladas durante a passada e aplicadas num único commit no fim
+        invalid_ext_ids: set = set()
+        expired_keys: set = set()
+        upgraded_keys: set = set()
 
         # Usamos uma cópia para poder remover enquanto iteramos
         for it in list(items):
@@ -375,7 +354,7 @@ async def rescan_watchlist_job():
                 start_utc = to_aware_utc(datetime.fromisoformat(it["start_time"]))
             except Exception:
                 # Se a data estiver inválida, removemos o item
-                removed_expired += wl_remove(session, lambda x, eid=ext_id: x["ext_id"] == eid)
+                invalid_ext_ids.add(ext_id)
                 continue
 
             page = page_cache.get(link, {})
@@ -393,10 +372,7 @@ async def rescan_watchlist_job():
                 if high_conf and now_utc <= (start_utc + timedelta(hours=6)):
                     logger.info("⏰ Mantido (HIGH_TRUST até +6h): %s (%s)", ext_id, it.get("start_time"))
                 else:
-                    removed_expired += wl_remove(
-                        session,
-                        lambda x, eid=ext_id, st=it["start_time"]: x["ext_id"] == eid and x["start_time"] == st
-                    )
+                    expired_keys.add((ext_id, it["start_time"]))
                 continue
 
             if not ev:
@@ -498,7 +474,7 @@ async def rescan_watchlist_job():
                         from utils.telegram_helpers import send_upgrade_with_buffer
                         send_upgrade_with_buffer(g)
                         # Marca como notificado no banco de dados (persiste após reiniciar)
-                        mark_pick_notified(g, session)
+                        mark_pick_notified(g, session, commit=False)
                         # Mantém compatibilidade com sistema antigo (pick_reason)
                         g.pick_reason = mark_high_conf_notified(g.pick_reason or "")
                         session.commit()
@@ -515,12 +491,25 @@ async def rescan_watchlist_job():
                     logger.exception("Falha ao agendar jobs para id=%s", g.id)
 
                 # remover esse item da watchlist
-                wl_remove(
-                    session,
-                    lambda x, eid=ext_id, st=it["start_time"]: x["ext_id"] == eid and x["start_time"] == st
-                )
+                upgraded_keys.add((ext_id, it["start_time"]))
                 upgraded.append(ext_id)
 
+        try:
+            removed_expired = wl_remove(
+                session,
+                lambda x: x["ext_id"] in invalid_ext_ids or (x["ext_id"], x["start_time"]) in expired_keys,
+                commit=False,
+            )
+            wl_remove(session, lambda x: (x["ext_id"], x["start_time"]) in upgraded_keys, commit=False)
+            session.commit()
+        except Exception:
+            # DELETEs não gravados: descarta a cópia em memória, que já os refletia;
+            # os itens continuam na watchlist e são reavaliados na próxima passada
+            session.rollback()
+            wl_invalidate()
+            removed_expired = 0
+            logger.exception("Falha ao remover itens da WATCHLIST")
+
         if removed_expired:
             logger.info("🧹 WATCHLIST: %d itens expirados removidos.", removed_expired)
         
@@ -610,7 +599,7 @@ async def hourly_rescan_job():
                         # Já verificamos acima que não foi notificado, então pode enviar
                         from utils.telegram_helpers import send_pick_with_buffer
                         send_pick_with_buffer(game)
-                        mark_pick_notified(game, session)
+                        mark_pick_notified(game, session, commit=False)
                         game.pick_reason = mark_high_conf_notified(game.pick_reason or "")
                         session.commit()
                         logger.info(f"✅ Palpite notificado (hourly rescan - transição alta confiança) para jogo {game.id} ({game.ext_id})")
@@ -649,7 +638,7 @@ async def hourly_rescan_job():
                         if should_notify:
                             from utils.telegram_helpers import send_pick_with_buffer
                             send_pick_with_buffer(game)
-                            mark_pick_notified(game, session)
+                            mark_pick_notified(game, session, commit=False)
                             game.pick_reason = mark_high_conf_notified(game.pick_reason or "")
                             session.commit()
                             asyncio.create_task(_schedule_all_for_game(game))
@@ -868,6 +857,7 @@ async def _handle_finished_game(session, game: Game, tracker: LiveGameTracker, n
         game.final_score = result_data.get("score")
         game.result_fetched_at = datetime.now(pytz.UTC)
         game.hit = (game.outcome == game.pick) if game.pick else None
+        invalidate_stats_cache()
         result_msg = "✅ ACERTOU" if game.hit else "❌ ERROU" if game.hit is False else "⚠️ SEM PALPITE"
         score_str = f" ({game.final_score})" if game.final_score else ""
         from utils.logger import log_with_context
@@ -1257,6 +1247,7 @@ async def watch_game_until_end_job(game_id: int):
                 game.result_fetched_at = datetime.now(pytz.UTC)
                 game.status = "ended"
                 game.hit = (game.outcome == game.pick) if game.pick else None
+                invalidate_stats_cache()
                 
                 result_msg = "✅ ACERTOU" if game.hit else "❌ ERROU" if game.hit is False else "⚠️ SEM PALPITE"
                 score_str = f" ({game.final_score})" if game.final_score else ""
@@ -1368,7 +1359,7 @@ async def health_check_job():
     
     try:
         logger.debug("🏥 Executando health checks do sistema...")
-        results = system_health.check_and_alert()
+        results = await system_health.check_and_alert()
         
         # Log resumo do status
         if results["overall"]:
@@ -1491,6 +1482,7 @@ async def fetch_finished_games_results_job():
                         game.result_fetched_at = datetime.now(pytz.UTC)
                         game.status = "ended"
                         game.hit = (game.outcome == game.pick) if game.pick else None
+                        invalidate_stats_cache()
                         result_msg = "✅ ACERTOU" if game.hit else "❌ ERROU" if game.hit is False else "⚠️ SEM PALPITE"
                         score_str = f" ({game.final_score})" if game.final_score else ""
                         logger.info(f"✅ Resultado obtido para jogo {game.id}: {game.outcome}{score_str} | {result_msg}")
@@ -1584,6 +1576,20 @@ def setup_scheduler():
         )
         logger.info("🌙 Varredura noturna ativada às %02d:00.", night_hour)
 
+    # --- Lembretes consolidados (opcional; substitui o lembrete T-15 por jogo) ---
+    if REMINDER_CONSOLIDATION:
+        from utils.reminder_consolidator import consolidate_reminders_job, REMINDER_WINDOW_MIN
+        scheduler.add_job(
+            consolidate_reminders_job,
+            trigger=CronTrigger(minute=f"*/{REMINDER_WINDOW_MIN}"),
+            id="consolidate_reminders",
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=60,
+        )
+        logger.info("🔔 Lembretes consolidados a cada %d minutos.", REMINDER_WINDOW_MIN)
+
     # --- Rechecagem periódica da watchlist ---
     scheduler.add_job(
         rescan_watchlist_job,
@@ -1,5 +1,6 @@
 """Funções de fetch de páginas web."""
 import asyncio
+import atexit
 import requests
 from typing import Optional
 from config.settings import (
@@ -11,6 +12,12 @@ from scraping.betnacional import try_parse_events
 
 HEADERS = {"User-Agent": USER_AGENT}
 
+# Sessão HTTP compartilhada: mantém conexões keep-alive (TCP+TLS) com o site
+# entre warm-up e buscas seguintes
+_http = requests.Session()
+_http.headers.update(HEADERS)
+atexit.register(_http.close)
+
 
 def fetch_requests(url: str, has_fallback: bool = True) -> str:
     """
@@ -27,7 +34,7 @@ def fetch_requests(url: str, has_fallback: bool = True) -> str:
         Exception: Se a requisição falhar após todas as tentativas
     """
     # Usar requests simples sem bypass
-    response = requests.get(url, headers=HEADERS, timeout=HTML_TIMEOUT)
+    response = _http.get(url, timeout=HTML_TIMEOUT)
     response.raise_for_status()
     return response.text
 
@@ -1,9 +1,9 @@
 """Utilitários."""
 from .logger import logger
 from .stats import (
-    global_accuracy, get_weekly_stats, get_monthly_stats,
+    global_accuracy, get_weekly_stats, get_accuracy_and_weekly, get_monthly_stats,
     get_lifetime_accuracy, get_daily_summary, to_aware_utc, save_odd_history,
-    get_accuracy_by_confidence
+    save_odd_history_bulk, get_accuracy_by_confidence
 )
 from .formatters import (
     fmt_morning_summary, fmt_result, fmt_pick_now, fmt_reminder,
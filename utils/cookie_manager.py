@@ -196,9 +196,9 @@ class CookieManager:
                 
                 cookies_data['cookies'].append(cookie_data)
             
-            # Salvar em JSON
+            # Salvar em JSON compacto (arquivo lido apenas pela aplicação)
             with open(self.cookie_file, 'w', encoding='utf-8') as f:
-                json.dump(cookies_data, f, indent=2, ensure_ascii=False)
+                json.dump(cookies_data, f, ensure_ascii=False, separators=(',', ':'))
             
             logger.debug(f"Cookies salvos em {self.cookie_file}: {len(cookies)} cookies")
             
@@ -257,6 +257,18 @@ class CookieManager:
             except Exception as e:
                 logger.warning(f"Erro ao remover arquivo de cookies: {e}")
     
+    def has_valid_cookies(self) -> bool:
+        """
+        Verifica se há ao menos um cookie não expirado.
+        
+        Mais barato que get_stats(): para no primeiro cookie válido.
+        
+        Returns:
+            True se existe cookie válido
+        """
+        now = datetime.now().timestamp()
+        return any(not cookie.expires or cookie.expires >= now for cookie in self.cookies)
+    
     def get_stats(self) -> Dict:
         """
         Retorna estatísticas dos cookies.
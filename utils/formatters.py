@@ -1,11 +1,30 @@
 """Funções de formatação de mensagens."""
+import functools
 import html
 import random
+from collections import defaultdict
 from datetime import datetime
 from typing import Any, Dict, List
 from models.database import Game, SessionLocal, CombinedBet
 from config.settings import ZONE, HIGH_CONF_THRESHOLD
-from utils.stats import global_accuracy, get_weekly_stats, to_aware_utc, get_lifetime_accuracy, get_daily_summary, get_accuracy_by_confidence
+from utils.stats import get_accuracy_and_weekly, to_aware_utc, get_lifetime_accuracy, get_daily_summary, get_accuracy_by_confidence
+
+
+_WEEKDAYS = ("Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo")
+# Blocos decorativos reutilizados pelas mensagens
+_SEP_LINE = "━━━━━━━━━━━━━━━━━━━━"
+_SEP = _SEP_LINE + "\n"
+_SEP_BLOCK = _SEP_LINE + "\n\n"
+
+_MOTIVATIONAL = (
+    "💪 Disciplina sempre vence a sorte!",
+    "🎯 Foco no processo, não no resultado.",
+    "📚 Conhecimento é a melhor estratégia.",
+    "⚖️ Equilíbrio e paciência são fundamentais.",
+    "🌟 Consistência gera resultados.",
+)
+_HTML_UNSAFE = frozenset("&<>\"'")
+_ODD_FIELDS = {"home": "odds_home", "draw": "odds_draw", "away": "odds_away"}
 
 
 def h(b: str) -> str:
@@ -13,91 +32,147 @@ def h(b: str) -> str:
     return f"<b>{b}</b>"
 
 
+@functools.lru_cache(maxsize=8192)
+def _esc_cached(s: str) -> str:
+    return html.escape(s)
+
+
 def esc(s: str) -> str:
-    """Helper para escape HTML."""
-    return html.escape(s or "")
+    """Helper para escape HTML (cacheado: nomes de times se repetem muito)."""
+    if not s:
+        return ""
+    # Caso comum: nenhum caractere a escapar, devolve a própria string
+    if _HTML_UNSAFE.isdisjoint(s):
+        return s
+    return _esc_cached(s)
+
+
+def _pick_name(team_home: str, team_away: str, pick: str, default: str = "—") -> str:
+    """Nome legível de um palpite/resultado (time escolhido ou 'Empate')."""
+    if pick == "home":
+        return team_home
+    if pick == "away":
+        return team_away
+    if pick == "draw":
+        return "Empate"
+    return default
+
+
+@functools.lru_cache(maxsize=4096)
+def _local_dt(dt: datetime) -> datetime:
+    """Converte o início do jogo (UTC) para o fuso local; cacheado por datetime."""
+    return to_aware_utc(dt).astimezone(ZONE)
+
+
+@functools.lru_cache(maxsize=4096)
+def _local_hhmm(dt: datetime) -> str:
+    """Horário local HH:MM do início do jogo; cacheado por datetime."""
+    return _local_dt(dt).strftime("%H:%M")
+
+
+def _game_hhmm(g: Game) -> str:
+    """HH:MM local do jogo: usa a coluna gravada no upsert, senão calcula."""
+    return getattr(g, "start_hhmm_local", None) or _local_hhmm(g.start_time)
+
 
+def _pick_odd(g, pick: str) -> float:
+    """Odd do lado escolhido; aceita tanto `Game` quanto dict de evento."""
+    field = _ODD_FIELDS.get(pick)
+    if field is None:
+        return 0.0
+    value = g.get(field) if isinstance(g, dict) else getattr(g, field)
+    return float(value or 0.0)
 
-def fmt_morning_summary(date_local: datetime, analyzed: int, chosen: List[Dict[str, Any]]) -> str:
+
+def _render_perf_footer(session=None) -> str:
+    """
+    Rodapé de performance (taxa geral + últimos 7 dias).
+    
+    Reutiliza a sessão do chamador quando fornecida; senão abre uma própria.
+    """
+    if session is None:
+        with SessionLocal() as s:
+            acc, week_stats = get_accuracy_and_weekly(s)
+    else:
+        acc, week_stats = get_accuracy_and_weekly(session)
+    acc *= 100
+    
+    footer = (
+        f"{_SEP}"
+        "📈 <b>PERFORMANCE</b>\n"
+        f"├ Taxa geral: <b>{acc:.1f}%</b>\n"
+    )
+    if week_stats:
+        footer += (
+            f"├ Últimos 7 dias: <b>{week_stats['win_rate']:.1f}%</b>\n"
+            f"└ ROI semanal: <b>{week_stats['roi']:+.1f}%</b>\n"
+        )
+    return footer
+
+
+def fmt_morning_summary(
+    date_local: datetime,
+    analyzed: int,
+    chosen: List[Dict[str, Any]],
+    session=None,
+    include_footer: bool = True
+) -> str:
     """Resumo matinal elegante e organizado"""
     dstr = date_local.strftime("%d/%m/%Y")
-    day_name = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"][date_local.weekday()]
+    day_name = _WEEKDAYS[date_local.weekday()]
     
     # Cabeçalho
-    msg = f"☀️ <b>BOM DIA!</b>\n"
-    msg += f"<i>{day_name}, {dstr}</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
-    
-    # Estatísticas do dia
-    msg += f"📊 <b>RESUMO DA ANÁLISE</b>\n"
-    msg += f"├ Jogos analisados: <b>{analyzed}</b>\n"
-    msg += f"└ Jogos selecionados: <b>{len(chosen)}</b>\n\n"
+    parts = [
+        "☀️ <b>BOM DIA!</b>\n",
+        f"<i>{day_name}, {dstr}</i>\n",
+        _SEP_BLOCK,
+        # Estatísticas do dia
+        "📊 <b>RESUMO DA ANÁLISE</b>\n",
+        f"├ Jogos analisados: <b>{analyzed}</b>\n",
+        f"└ Jogos selecionados: <b>{len(chosen)}</b>\n\n",
+    ]
     
     if chosen:
         # Agrupa por horário
-        by_time = {}
+        by_time: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
         for g in chosen:
-            time_str = g["start_time"].astimezone(ZONE).strftime("%H:%M")
-            if time_str not in by_time:
-                by_time[time_str] = []
-            by_time[time_str].append(g)
+            by_time[_local_hhmm(g["start_time"])].append(g)
         
-        msg += f"🎯 <b>PICKS DO DIA</b>\n\n"
+        parts.append("🎯 <b>PICKS DO DIA</b>\n\n")
         
-        for time_str in sorted(by_time.keys()):
-            games = by_time[time_str]
-            msg += f"🕐 <b>{time_str}h</b>\n"
+        for time_str, games in sorted(by_time.items()):
+            parts.append(f"🕐 <b>{time_str}h</b>\n")
             
             for g in games:
-                pick_map = {"home": g.get('team_home'), "draw": "Empate", "away": g.get('team_away')}
-                pick_str = pick_map.get(g.get("pick"), "—")
+                pick_str = _pick_name(g.get('team_home'), g.get('team_away'), g.get("pick"))
                 
                 # Formata com ícones baseados na probabilidade
                 prob = g.get('pick_prob', 0)
                 confidence = "🔥" if prob > 0.6 else "⭐" if prob > 0.4 else "💡"
                 
                 # Calcula a odd correta para o pick
-                pick_odd = 0.0
-                if g.get("pick") == "home":
-                    pick_odd = g.get('odds_home', 0)
-                elif g.get("pick") == "draw":
-                    pick_odd = g.get('odds_draw', 0)
-                elif g.get("pick") == "away":
-                    pick_odd = g.get('odds_away', 0)
+                pick_odd = _pick_odd(g, g.get("pick"))
                 
                 odds_home = float(g.get('odds_home', 0) or 0.0)
                 odds_away = float(g.get('odds_away', 0) or 0.0)
-                msg += f"  {confidence} <b>{g.get('team_home')[:20]}</b> vs <b>{g.get('team_away')[:20]}</b>\n"
-                msg += f"     → Odds: {odds_home:.2f} / {odds_away:.2f}\n"
-                msg += f"     → {pick_str} @ {pick_odd:.2f} | Prob: {prob*100:.0f}% | EV: {g.get('pick_ev')*100:+.1f}%\n\n"
+                parts.append(
+                    f"  {confidence} <b>{g.get('team_home')[:20]}</b> vs <b>{g.get('team_away')[:20]}</b>\n"
+                    f"     → Odds: {odds_home:.2f} / {odds_away:.2f}\n"
+                    f"     → {pick_str} @ {pick_odd:.2f} | Prob: {prob*100:.0f}% | EV: {g.get('pick_ev')*100:+.1f}%\n\n"
+                )
     else:
-        msg += "ℹ️ <i>Nenhum jogo atende aos critérios hoje.</i>\n\n"
-    
-    # Rodapé com performance
-    with SessionLocal() as s:
-        acc = global_accuracy(s) * 100
-        week_stats = get_weekly_stats(s)
+        parts.append("ℹ️ <i>Nenhum jogo atende aos critérios hoje.</i>\n\n")
     
-    msg += "━━━━━━━━━━━━━━━━━━━━\n"
-    msg += f"📈 <b>PERFORMANCE</b>\n"
-    msg += f"├ Taxa geral: <b>{acc:.1f}%</b>\n"
-    
-    if week_stats:
-        msg += f"├ Últimos 7 dias: <b>{week_stats['win_rate']:.1f}%</b>\n"
-        msg += f"└ ROI semanal: <b>{week_stats['roi']:+.1f}%</b>\n"
+    # Rodapé com performance (só consulta o banco se for exibido)
+    if include_footer:
+        parts.append(_render_perf_footer(session))
     
     # Mensagem motivacional randômica
-    motivational = random.choice([
-        "💪 Disciplina sempre vence a sorte!",
-        "🎯 Foco no processo, não no resultado.",
-        "📚 Conhecimento é a melhor estratégia.",
-        "⚖️ Equilíbrio e paciência são fundamentais.",
-        "🌟 Consistência gera resultados."
-    ])
+    motivational = random.choice(_MOTIVATIONAL)
     
-    msg += f"\n<i>{motivational}</i>"
+    parts.append(f"\n<i>{motivational}</i>")
     
-    return msg
+    return "".join(parts)
 
 
 def fmt_result(g: Game) -> str:
@@ -109,7 +184,7 @@ def fmt_result(g: Game) -> str:
     status = "ACERTAMOS" if g.hit else "ERRAMOS"
 
     msg = f"{emoji} <b>RESULTADO - {status}</b>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     msg += f"⚽ <b>{g.team_home}</b> vs <b>{g.team_away}</b>\n\n"
 
     # Odds dos dois times
@@ -121,13 +196,9 @@ def fmt_result(g: Game) -> str:
     msg += f"├ Empate: <b>{odds_draw:.2f}</b>\n"
     msg += f"└ {g.team_away}: <b>{odds_away:.2f}</b>\n\n"
 
-    # Mapeia resultado para texto legível
-    outcome_map = {"home": g.team_home, "draw": "Empate", "away": g.team_away}
-    pick_map = {"home": g.team_home, "draw": "Empate", "away": g.team_away}
-
     msg += f"📊 <b>RESULTADO</b>\n"
-    msg += f"├ Palpite: <b>{pick_map.get(g.pick, g.pick)}</b>\n"
-    msg += f"├ Resultado: <b>{outcome_map.get(g.outcome, g.outcome or '—')}</b>\n"
+    msg += f"├ Palpite: <b>{_pick_name(g.team_home, g.team_away, g.pick, g.pick)}</b>\n"
+    msg += f"├ Resultado: <b>{_pick_name(g.team_home, g.team_away, g.outcome, g.outcome or '—')}</b>\n"
     msg += f"└ EV estimado: {g.pick_ev*100:+.1f}%"
 
     return msg
@@ -135,14 +206,14 @@ def fmt_result(g: Game) -> str:
 
 def fmt_pick_now(g: Game) -> str:
     """Formatação elegante para novo pick"""
-    hhmm = g.start_time.astimezone(ZONE).strftime("%H:%M")
-    side = {"home": g.team_home, "draw": "Empate", "away": g.team_away}.get(g.pick, "—")
+    hhmm = _game_hhmm(g)
+    side = _pick_name(g.team_home, g.team_away, g.pick)
     
     # Calcula nível de confiança
     confidence_level = "ALTA" if g.pick_prob > 0.6 else "MÉDIA" if g.pick_prob > 0.4 else "PADRÃO"
     
     msg = f"🎯 <b>NOVA OPORTUNIDADE</b>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     
     msg += f"⚽ <b>JOGO</b>\n"
     msg += f"<b>{g.team_home}</b> vs <b>{g.team_away}</b>\n"
@@ -161,14 +232,8 @@ def fmt_pick_now(g: Game) -> str:
     msg += f"├ Aposta: <b>{side}</b>\n"
     
     # Calcula a odd correta baseada no pick
-    pick_odd = 0.0
-    if g.pick == "home":
-        pick_odd = g.odds_home
-    elif g.pick == "draw":
-        pick_odd = g.odds_draw
-    elif g.pick == "away":
-        pick_odd = g.odds_away
-        
+    pick_odd = _pick_odd(g, g.pick)
+    
     msg += f"├ Odd: <b>{pick_odd:.2f}</b>\n"
     msg += f"├ Probabilidade: <b>{g.pick_prob*100:.0f}%</b>\n"
     msg += f"├ Valor esperado: <b>{g.pick_ev*100:+.1f}%</b>\n"
@@ -178,7 +243,7 @@ def fmt_pick_now(g: Game) -> str:
     if g.pick_reason and g.pick_reason not in ["EV positivo", "Favorito claro"]:
         msg += f"\n💭 <i>{g.pick_reason}</i>\n"
     
-    msg += "\n━━━━━━━━━━━━━━━━━━━━"
+    msg += f"\n{_SEP_LINE}"
     
     return msg
 
@@ -190,7 +255,7 @@ def fmt_results_batch(games: List[Game], date_local: datetime = None) -> str:
     dstr = date_local.strftime("%d/%m/%Y")
     msg = f"📊 <b>RESULTADOS DAS APOSTAS</b>\n"
     msg += f"<i>{dstr}</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     total = len(games)
     hits = sum(1 for g in games if getattr(g, 'hit', None) is True)
     misses = sum(1 for g in games if getattr(g, 'hit', None) is False)
@@ -203,38 +268,27 @@ def fmt_results_batch(games: List[Game], date_local: datetime = None) -> str:
     # Ordena por horário
     games_sorted = sorted(games, key=lambda g: g.start_time or datetime(1970,1,1))
     for idx, g in enumerate(games_sorted, 1):
-        hhmm = (g.start_time.astimezone(ZONE).strftime("%H:%M") if g.start_time else "--:--")
-        pick_map = {"home": g.team_home, "draw": "Empate", "away": g.team_away}
-        pick_str = pick_map.get(g.pick, g.pick or "—")
-        outcome_str = pick_map.get(g.outcome, g.outcome or "—")
-        odd = 0.0
-        if g.pick == "home":
-            odd = float(g.odds_home or 0.0)
-        elif g.pick == "draw":
-            odd = float(g.odds_draw or 0.0)
-        elif g.pick == "away":
-            odd = float(g.odds_away or 0.0)
+        hhmm = (_game_hhmm(g) if g.start_time else "--:--")
+        pick_str = _pick_name(g.team_home, g.team_away, g.pick, g.pick or "—")
+        outcome_str = _pick_name(g.team_home, g.team_away, g.outcome, g.outcome or "—")
+        odd = _pick_odd(g, g.pick)
         status_emoji = "✅" if g.hit else ("❌" if g.hit is False else "ℹ️")
         status_text = "ACERTOU" if g.hit else ("ERROU" if g.hit is False else "SEM VERIFICAÇÃO")
-        msg += f"{status_emoji} <b>{idx}.</b> <b>{esc(g.team_home)}</b> vs <b>{esc(g.team_away)}</b>\n"
-        msg += f"   🕐 {hhmm}h | Pick: <b>{esc(pick_str)}</b> @ {odd:.2f}\n"
-        msg += f"   📊 Resultado real: <b>{esc(outcome_str)}</b> | {status_text}\n\n"
+        msg += (
+            f"{status_emoji} <b>{idx}.</b> <b>{esc(g.team_home)}</b> vs <b>{esc(g.team_away)}</b>\n"
+            f"   🕐 {hhmm}h | Pick: <b>{esc(pick_str)}</b> @ {odd:.2f}\n"
+            f"   📊 Resultado real: <b>{esc(outcome_str)}</b> | {status_text}\n\n"
+        )
     return msg
 
 
 def fmt_reminder(g: Game) -> str:
     """Lembrete T-15 min antes do início do jogo."""
-    hhmm = g.start_time.astimezone(ZONE).strftime("%H:%M")
-    side = {"home": g.team_home, "draw": "Empate", "away": g.team_away}.get(g.pick, "—")
+    hhmm = _game_hhmm(g)
+    side = _pick_name(g.team_home, g.team_away, g.pick)
 
     # Odd correta do lado escolhido
-    pick_odd = 0.0
-    if g.pick == "home":
-        pick_odd = g.odds_home or 0.0
-    elif g.pick == "draw":
-        pick_odd = g.odds_draw or 0.0
-    elif g.pick == "away":
-        pick_odd = g.odds_away or 0.0
+    pick_odd = _pick_odd(g, g.pick)
 
     odds_home = float(g.odds_home or 0.0)
     odds_away = float(g.odds_away or 0.0)
@@ -242,7 +296,7 @@ def fmt_reminder(g: Game) -> str:
     
     return (
         "🔔 <b>Lembrete</b>\n"
-        "━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"{_SEP_BLOCK}"
         f"⚽ <b>{esc(g.team_home)}</b> vs <b>{esc(g.team_away)}</b>\n"
         f"🕐 Início: {hhmm}h\n\n"
         f"💰 <b>ODDS</b>\n"
@@ -264,7 +318,7 @@ def fmt_watch_add(ev, ev_date_local: datetime, best_ev: float, pprob: float) ->
     odds_draw = float(getattr(ev, 'odds_draw', 0) or 0.0)
     
     msg = f"👀 <b>ADICIONADO À WATCHLIST</b>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     msg += f"⚽ <b>{ev.team_home}</b> vs <b>{ev.team_away}</b>\n"
     msg += f"🕐 Início: {hhmm}h\n\n"
     msg += f"💰 <b>ODDS</b>\n"
@@ -282,11 +336,11 @@ def fmt_watch_add(ev, ev_date_local: datetime, best_ev: float, pprob: float) ->
 
 def fmt_watch_upgrade(g: Game) -> str:
     """Formatação elegante para upgrade da watchlist"""
-    hhmm = g.start_time.astimezone(ZONE).strftime("%H:%M")
-    side = {"home": g.team_home, "draw": "Empate", "away": g.team_away}.get(g.pick, "—")
+    hhmm = _game_hhmm(g)
+    side = _pick_name(g.team_home, g.team_away, g.pick)
     
     msg = f"⬆️ <b>UPGRADE - WATCHLIST → PICK</b>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     msg += f"⚽ <b>{g.team_home}</b> vs <b>{g.team_away}</b>\n"
     msg += f"🕐 Início: {hhmm}h\n\n"
     
@@ -300,13 +354,7 @@ def fmt_watch_upgrade(g: Game) -> str:
     msg += f"└ {g.team_away}: <b>{odds_away:.2f}</b>\n\n"
     
     # Calcula odd do pick
-    pick_odd = 0.0
-    if g.pick == "home":
-        pick_odd = odds_home
-    elif g.pick == "draw":
-        pick_odd = odds_draw
-    elif g.pick == "away":
-        pick_odd = odds_away
+    pick_odd = _pick_odd(g, g.pick)
     
     msg += f"✨ <b>ODDS MELHORARAM!</b>\n"
     msg += f"├ Nova aposta: <b>{side}</b> @ {pick_odd:.2f}\n"
@@ -329,7 +377,7 @@ def fmt_live_bet_opportunity(g: Game, opportunity: Dict[str, Any], stats: Dict[s
 
     msg = (
         f"{urgency} <b>OPORTUNIDADE AO VIVO VALIDADA</b>\n"
-        "━━━━━━━━━━━━━━━━━━━━\n\n"
+        f"{_SEP_BLOCK}"
         f"⚽ <b>{g.team_home}</b> vs <b>{g.team_away}</b>\n"
         f"├ ⏱ {match_time} | Placar: {stats.get('score','—')}\n"
     )
@@ -382,36 +430,25 @@ def fmt_live_bet_opportunity(g: Game, opportunity: Dict[str, Any], stats: Dict[s
 
 def fmt_dawn_games_summary(games: List[Game], date) -> str:
     """Formata mensagem de jogos da madrugada (00h-06h) do dia atual."""
-    from datetime import date as date_type
-    
-    if isinstance(date, date_type):
-        dstr = date.strftime("%d/%m/%Y")
-        day_name = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"][date.weekday()]
-    else:
-        dstr = date.strftime("%d/%m/%Y")
-        day_name = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"][date.weekday()]
-    
-    msg = "🌙 <b>JOGOS DA MADRUGADA</b>\n"
-    msg += f"<i>{day_name}, {dstr}</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    dstr = date.strftime("%d/%m/%Y")
+    day_name = _WEEKDAYS[date.weekday()]
     
-    msg += "🎯 <b>PICKS DA MADRUGADA</b>\n\n"
+    parts = [
+        "🌙 <b>JOGOS DA MADRUGADA</b>\n",
+        f"<i>{day_name}, {dstr}</i>\n",
+        _SEP_BLOCK,
+        "🎯 <b>PICKS DA MADRUGADA</b>\n\n",
+    ]
     
     # Ordena por horário
-    games_sorted = sorted(games, key=lambda g: to_aware_utc(g.start_time).astimezone(ZONE))
+    games_sorted = sorted(games, key=lambda g: _local_dt(g.start_time))
     
     for g in games_sorted:
-        hhmm = to_aware_utc(g.start_time).astimezone(ZONE).strftime("%H:%M")
-        pick_map = {"home": g.team_home, "draw": "Empate", "away": g.team_away}
-        pick_str = pick_map.get(g.pick, g.pick or "—")
+        hhmm = _game_hhmm(g)
+        pick_str = _pick_name(g.team_home, g.team_away, g.pick, g.pick or "—")
         
         # Calcula odd correta
-        if g.pick == "home":
-            pick_odd = float(g.odds_home or 0.0)
-        elif g.pick == "draw":
-            pick_odd = float(g.odds_draw or 0.0)
-        else:
-            pick_odd = float(g.odds_away or 0.0)
+        pick_odd = _pick_odd(g, g.pick)
         
         # Ícone de confiança
         prob = float(g.pick_prob or 0.0)
@@ -419,11 +456,13 @@ def fmt_dawn_games_summary(games: List[Game], date) -> str:
         
         odds_home = float(g.odds_home or 0.0)
         odds_away = float(g.odds_away or 0.0)
-        msg += f"{confidence} <b>{esc(g.team_home)}</b> vs <b>{esc(g.team_away)}</b>\n"
-        msg += f"   🕐 {hhmm}h | Odds: {odds_home:.2f} / {odds_away:.2f}\n"
-        msg += f"   🎯 Pick: <b>{pick_str}</b> @ {pick_odd:.2f} | Prob: {prob*100:.0f}% | EV: {g.pick_ev*100:+.1f}%\n\n"
+        parts.append(
+            f"{confidence} <b>{esc(g.team_home)}</b> vs <b>{esc(g.team_away)}</b>\n"
+            f"   🕐 {hhmm}h | Odds: {odds_home:.2f} / {odds_away:.2f}\n"
+            f"   🎯 Pick: <b>{pick_str}</b> @ {pick_odd:.2f} | Prob: {prob*100:.0f}% | EV: {g.pick_ev*100:+.1f}%\n\n"
+        )
     
-    return msg
+    return "".join(parts)
 
 
 def fmt_combined_bet(combined_bet: CombinedBet, games: List[Game]) -> str:
@@ -432,11 +471,11 @@ def fmt_combined_bet(combined_bet: CombinedBet, games: List[Game]) -> str:
     """
     bet_date_local = combined_bet.bet_date.astimezone(ZONE)
     date_str = bet_date_local.strftime("%d/%m/%Y")
-    day_name = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"][bet_date_local.weekday()]
+    day_name = _WEEKDAYS[bet_date_local.weekday()]
     
     msg = "🎯 <b>APOSTA COMBINADA - ALTA CONFIANÇA</b>\n"
     msg += f"<i>{day_name}, {date_str}</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     
     msg += f"📊 <b>RESUMO</b>\n"
     msg += f"├ Total de jogos: <b>{combined_bet.total_games}</b>\n"
@@ -452,81 +491,66 @@ def fmt_combined_bet(combined_bet: CombinedBet, games: List[Game]) -> str:
     # Ordena jogos por horário
     games_sorted = sorted(games, key=lambda g: g.start_time)
     
-    # Exibir o nome do time escolhido ou 'Empate'
-    pick_map = {"home": lambda g: g.team_home, "draw": lambda g: "Empate", "away": lambda g: g.team_away}
-    
     for idx, game in enumerate(games_sorted, 1):
-        hhmm = game.start_time.astimezone(ZONE).strftime("%H:%M")
-        resolver = pick_map.get(game.pick)
-        pick_str = resolver(game) if callable(resolver) else (game.pick or "—")
+        hhmm = _game_hhmm(game)
+        # Exibir o nome do time escolhido ou 'Empate'
+        pick_str = _pick_name(game.team_home, game.team_away, game.pick, game.pick or "—")
         
         # Determina odd do pick
-        if game.pick == "home":
-            pick_odd = float(game.odds_home or 0.0)
-        elif game.pick == "draw":
-            pick_odd = float(game.odds_draw or 0.0)
-        else:
-            pick_odd = float(game.odds_away or 0.0)
+        pick_odd = _pick_odd(game, game.pick)
         
         # Ícone de confiança
         prob = float(game.pick_prob or 0.0)
         confidence_icon = "🔥" if prob >= HIGH_CONF_THRESHOLD else "⭐"
         
-        msg += f"{confidence_icon} <b>{idx}.</b> {esc(game.team_home)} vs {esc(game.team_away)}\n"
-        msg += f"   🕐 {hhmm}h | Pick: <b>{pick_str}</b> @ {pick_odd:.2f}\n"
-        msg += f"   📈 Prob: {prob*100:.0f}% | EV: {game.pick_ev*100:+.1f}%\n\n"
+        msg += (
+            f"{confidence_icon} <b>{idx}.</b> {esc(game.team_home)} vs {esc(game.team_away)}\n"
+            f"   🕐 {hhmm}h | Pick: <b>{pick_str}</b> @ {pick_odd:.2f}\n"
+            f"   📈 Prob: {prob*100:.0f}% | EV: {game.pick_ev*100:+.1f}%\n\n"
+        )
     
-    msg += "━━━━━━━━━━━━━━━━━━━━\n"
+    msg += _SEP
     msg += "💡 <i>Esta aposta combina todos os jogos de alta confiança do dia.</i>\n"
     
     return msg
 
 
-def fmt_today_games_summary(games: List[Game], date, analyzed: int) -> str:
+def fmt_today_games_summary(
+    games: List[Game],
+    date,
+    analyzed: int,
+    session=None,
+    include_footer: bool = True
+) -> str:
     """Formata mensagem de jogos de hoje (06h-23h)."""
-    from datetime import date as date_type
-    
-    if isinstance(date, date_type):
-        dstr = date.strftime("%d/%m/%Y")
-        day_name = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"][date.weekday()]
-    else:
-        dstr = date.strftime("%d/%m/%Y")
-        day_name = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"][date.weekday()]
-    
-    msg = "🌅 <b>JOGOS DE HOJE</b>\n"
-    msg += f"<i>{day_name}, {dstr}</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
-    
-    msg += "📊 <b>RESUMO</b>\n"
-    msg += f"├ Total analisado: <b>{analyzed}</b> jogos\n"
-    msg += f"└ Selecionados: <b>{len(games)}</b> jogos\n\n"
+    dstr = date.strftime("%d/%m/%Y")
+    day_name = _WEEKDAYS[date.weekday()]
+    
+    parts = [
+        "🌅 <b>JOGOS DE HOJE</b>\n",
+        f"<i>{day_name}, {dstr}</i>\n",
+        _SEP_BLOCK,
+        "📊 <b>RESUMO</b>\n",
+        f"├ Total analisado: <b>{analyzed}</b> jogos\n",
+        f"└ Selecionados: <b>{len(games)}</b> jogos\n\n",
+    ]
     
     if games:
-        msg += "🎯 <b>PICKS DO DIA</b>\n\n"
+        parts.append("🎯 <b>PICKS DO DIA</b>\n\n")
         
         # Agrupa por horário
-        by_time = {}
+        by_time: Dict[str, List[Game]] = defaultdict(list)
         for g in games:
-            time_str = to_aware_utc(g.start_time).astimezone(ZONE).strftime("%H:%M")
-            if time_str not in by_time:
-                by_time[time_str] = []
-            by_time[time_str].append(g)
+            by_time[_game_hhmm(g)].append(g)
         
-        for time_str in sorted(by_time.keys()):
-            games_at_time = by_time[time_str]
-            msg += f"🕐 <b>{time_str}h</b>\n"
+        for time_str, games_at_time in sorted(by_time.items()):
+            parts.append(f"🕐 <b>{time_str}h</b>\n")
             
             for g in games_at_time:
-                pick_map = {"home": g.team_home, "draw": "Empate", "away": g.team_away}
-                pick_str = pick_map.get(g.pick, g.pick or "—")
+                pick_str = _pick_name(g.team_home, g.team_away, g.pick, g.pick or "—")
                 
                 # Calcula odd correta
-                if g.pick == "home":
-                    pick_odd = float(g.odds_home or 0.0)
-                elif g.pick == "draw":
-                    pick_odd = float(g.odds_draw or 0.0)
-                else:
-                    pick_odd = float(g.odds_away or 0.0)
+                pick_odd = _pick_odd(g, g.pick)
                 
                 # Ícone de confiança
                 prob = float(g.pick_prob or 0.0)
@@ -534,44 +558,31 @@ def fmt_today_games_summary(games: List[Game], date, analyzed: int) -> str:
                 
                 odds_home = float(g.odds_home or 0.0)
                 odds_away = float(g.odds_away or 0.0)
-                msg += f"  {confidence} <b>{esc(g.team_home)}</b> vs <b>{esc(g.team_away)}</b>\n"
-                msg += f"     → Odds: {odds_home:.2f} / {odds_away:.2f}\n"
-                msg += f"     → {pick_str} @ {pick_odd:.2f} | Prob: {prob*100:.0f}% | EV: {g.pick_ev*100:+.1f}%\n\n"
+                parts.append(
+                    f"  {confidence} <b>{esc(g.team_home)}</b> vs <b>{esc(g.team_away)}</b>\n"
+                    f"     → Odds: {odds_home:.2f} / {odds_away:.2f}\n"
+                    f"     → {pick_str} @ {pick_odd:.2f} | Prob: {prob*100:.0f}% | EV: {g.pick_ev*100:+.1f}%\n\n"
+                )
     else:
-        msg += "ℹ️ <i>Nenhum jogo atende aos critérios hoje.</i>\n\n"
-    
-    # Rodapé com performance
-    with SessionLocal() as s:
-        acc = global_accuracy(s) * 100
-        week_stats = get_weekly_stats(s)
+        parts.append("ℹ️ <i>Nenhum jogo atende aos critérios hoje.</i>\n\n")
     
-    msg += "━━━━━━━━━━━━━━━━━━━━\n"
-    msg += f"📈 <b>PERFORMANCE</b>\n"
-    msg += f"├ Taxa geral: <b>{acc:.1f}%</b>\n"
-    
-    if week_stats:
-        msg += f"├ Últimos 7 dias: <b>{week_stats['win_rate']:.1f}%</b>\n"
-        msg += f"└ ROI semanal: <b>{week_stats['roi']:+.1f}%</b>\n"
+    # Rodapé com performance (só consulta o banco se for exibido)
+    if include_footer:
+        parts.append(_render_perf_footer(session))
     
     # Mensagem motivacional
-    motivational = random.choice([
-        "💪 Disciplina sempre vence a sorte!",
-        "🎯 Foco no processo, não no resultado.",
-        "📚 Conhecimento é a melhor estratégia.",
-        "⚖️ Equilíbrio e paciência são fundamentais.",
-        "🌟 Consistência gera resultados."
-    ])
+    motivational = random.choice(_MOTIVATIONAL)
     
-    msg += f"\n<i>{motivational}</i>"
+    parts.append(f"\n<i>{motivational}</i>")
     
-    return msg
+    return "".join(parts)
 
 
 def format_night_scan_summary(date: datetime, analyzed: int, games: List[Dict[str, Any]]) -> str:
     """Formata o resumo da varredura noturna (00:00–06:00 do dia seguinte, no fuso APP_TZ)."""
     msg = "🌙 <b>JOGOS DA MADRUGADA</b>\n"
     msg += f"<i>{date.strftime('%d/%m/%Y')} - 00:00 às 06:00</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
 
     msg += "📊 <b>ANÁLISE NOTURNA</b>\n"
     msg += f"├ Jogos analisados: <b>{analyzed}</b>\n"
@@ -580,19 +591,13 @@ def format_night_scan_summary(date: datetime, analyzed: int, games: List[Dict[st
     if games:
         msg += "🎯 <b>PICKS DA MADRUGADA</b>\n\n"
         # Ordena por horário local de início
-        games_sorted = sorted(games, key=lambda x: to_aware_utc(x["start_time"]).astimezone(ZONE))
+        games_sorted = sorted(games, key=lambda x: _local_dt(x["start_time"]))
         for g in games_sorted:
-            hhmm = to_aware_utc(g["start_time"]).astimezone(ZONE).strftime("%H:%M")
+            hhmm = _local_hhmm(g["start_time"])
             pick_key = g.get("pick")
-            pick_map = {"home": "Casa", "draw": "Empate", "away": "Fora"}
-            pick_str = pick_map.get(pick_key, pick_key or "—")
+            pick_str = _pick_name("Casa", "Fora", pick_key, pick_key or "—")
 
-            if pick_key == "home":
-                odd = float(g.get("odds_home") or 0.0)
-            elif pick_key == "draw":
-                odd = float(g.get("odds_draw") or 0.0)
-            else:
-                odd = float(g.get("odds_away") or 0.0)
+            odd = _pick_odd(g, pick_key)
 
             msg += (
                 f"🕐 <b>{hhmm}h</b>\n"
@@ -618,11 +623,11 @@ def fmt_daily_summary(session, date_local: datetime = None) -> str:
     lifetime = get_lifetime_accuracy(session)
     
     dstr = date_local.strftime("%d/%m/%Y")
-    day_name = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"][date_local.weekday()]
+    day_name = _WEEKDAYS[date_local.weekday()]
     
     msg = f"📊 <b>RESUMO DO DIA</b>\n"
     msg += f"<i>{day_name}, {dstr}</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     
     # Estatísticas do dia
     msg += f"📈 <b>ESTATÍSTICAS DO DIA</b>\n"
@@ -641,16 +646,15 @@ def fmt_daily_summary(session, date_local: datetime = None) -> str:
         msg += f"⚽ <b>JOGOS DO DIA</b>\n\n"
         for g in summary['games']:
             emoji = "✅" if g.hit else "❌"
-            outcome_map = {"home": g.team_home, "draw": "Empate", "away": g.team_away}
-            pick_map = {"home": g.team_home, "draw": "Empate", "away": g.team_away}
-            
-            hhmm = g.start_time.astimezone(ZONE).strftime("%H:%M")
-            msg += f"{emoji} <b>{g.team_home}</b> vs <b>{g.team_away}</b>\n"
-            msg += f"   🕐 {hhmm}h | Palpite: {pick_map.get(g.pick, g.pick)} | Resultado: {outcome_map.get(g.outcome, g.outcome or '—')}\n\n"
+            hhmm = _game_hhmm(g)
+            msg += (
+                f"{emoji} <b>{g.team_home}</b> vs <b>{g.team_away}</b>\n"
+                f"   🕐 {hhmm}h | Palpite: {_pick_name(g.team_home, g.team_away, g.pick, g.pick)} | Resultado: {_pick_name(g.team_home, g.team_away, g.outcome, g.outcome or '—')}\n\n"
+            )
     
     # Comparação com lifetime
     if lifetime['total'] > 0:
-        msg += "━━━━━━━━━━━━━━━━━━━━\n"
+        msg += _SEP
         msg += f"📊 <b>ASSERTIVIDADE LIFETIME</b>\n"
         msg += f"├ Total histórico: <b>{lifetime['total']}</b> jogos\n"
         msg += f"├ ✅ Acertos: <b>{lifetime['hits']}</b>\n"
@@ -700,7 +704,7 @@ def fmt_lifetime_stats(session) -> str:
     
     msg = f"📊 <b>ESTATÍSTICAS LIFETIME</b>\n"
     msg += f"<i>Histórico Completo</i>\n"
-    msg += "━━━━━━━━━━━━━━━━━━━━\n\n"
+    msg += _SEP_BLOCK
     
     if lifetime['total'] == 0:
         msg += "ℹ️ <i>Ainda não há jogos finalizados no histórico.</i>"
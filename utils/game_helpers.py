@@ -1,12 +1,16 @@
 """Funções auxiliares para gerenciamento de jogos."""
-from typing import Any, Optional, TYPE_CHECKING
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, TYPE_CHECKING
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 
 if TYPE_CHECKING:
-    from models.database import Game
+    from models.database import Game, local_start_fields
 else:
     # Importação real para uso em runtime (evita import circular)
-    from models.database import Game
+    from models.database import Game, local_start_fields
 
 from config.settings import (
     is_high_conf as is_high_conf_config,
@@ -14,6 +18,118 @@ from config.settings import (
     mark_high_conf_notified as mark_high_conf_notified_config
 )
 
+# Dialetos com suporte a INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+# Linhas por statement no UPSERT em lote (18 colunas → ~900 parâmetros,
+# abaixo do limite de 999 variáveis de versões antigas do SQLite)
+_UPSERT_BATCH_SIZE = 50
+
+
+def game_values_from_event(
+    ev: Any,
+    start_utc,
+    url: str,
+    pick: str,
+    pprob: float,
+    pev: float,
+    reason: str,
+    will: bool,
+    status: str = "scheduled"
+) -> Dict[str, Any]:
+    """Monta o dicionário de colunas de um Game a partir de um evento raspado."""
+    # INSERT via Core não passa pelo @validates do modelo: calcula aqui
+    start_hhmm_local, start_date_local = local_start_fields(start_utc)
+    return {
+        "ext_id": ev.ext_id,
+        "source_link": url,
+        "game_url": getattr(ev, "game_url", None),
+        "competition": ev.competition,
+        "team_home": ev.team_home,
+        "team_away": ev.team_away,
+        "start_time": start_utc,
+        "start_hhmm_local": start_hhmm_local,
+        "start_date_local": start_date_local,
+        "odds_home": ev.odds_home,
+        "odds_draw": ev.odds_draw,
+        "odds_away": ev.odds_away,
+        "pick": pick,
+        "pick_prob": pprob,
+        "pick_ev": pev,
+        "will_bet": will,
+        "pick_reason": reason,
+        "status": status,
+    }
+
+
+def _build_upsert(insert_fn, values, keep_will_bet: bool = False):
+    """
+    Monta o UPSERT de um jogo por (ext_id, start_time).
+    
+    Replica a semântica do update via ORM: campos descritivos vazios mantêm o
+    valor atual e status "live"/"ended" nunca é rebaixado. Com `keep_will_bet`,
+    um jogo já selecionado (will_bet=True) continua selecionado.
+    """
+    stmt = insert_fn(Game).values(values)
+    excluded = stmt.excluded
+
+    def keep_if_empty(name: str):
+        return func.coalesce(func.nullif(excluded[name], ""), getattr(Game, name))
+
+    set_ = {
+        "source_link": excluded.source_link,
+        # Preenche linhas criadas antes das colunas locais existirem
+        "start_hhmm_local": excluded.start_hhmm_local,
+        "start_date_local": excluded.start_date_local,
+        "game_url": keep_if_empty("game_url"),
+        "competition": keep_if_empty("competition"),
+        "team_home": keep_if_empty("team_home"),
+        "team_away": keep_if_empty("team_away"),
+        "odds_home": excluded.odds_home,
+        "odds_draw": excluded.odds_draw,
+        "odds_away": excluded.odds_away,
+        "pick": excluded.pick,
+        "pick_prob": excluded.pick_prob,
+        "pick_ev": excluded.pick_ev,
+        "pick_reason": excluded.pick_reason,
+        "will_bet": (excluded.will_bet | Game.will_bet) if keep_will_bet else excluded.will_bet,
+        "status": case((Game.status.in_(("live", "ended")), Game.status), else_=excluded.status),
+        "updated_at": func.now(),
+    }
+    return stmt.on_conflict_do_update(
+        index_elements=["ext_id", "start_time"], set_=set_
+    ).returning(Game)
+
+
+def _apply_game_updates(
+    g: "Game",
+    ev: Any,
+    url: str,
+    pick: str,
+    pprob: float,
+    pev: float,
+    reason: str,
+    will: bool,
+    status: str,
+    keep_will_bet: bool = False
+) -> None:
+    """Aplica os dados de um evento em um Game já existente (fluxo ORM)."""
+    g.source_link = url
+    g.game_url = getattr(ev, "game_url", None) or g.game_url
+    g.competition = ev.competition or g.competition
+    g.team_home = ev.team_home or g.team_home
+    g.team_away = ev.team_away or g.team_away
+    g.odds_home = ev.odds_home
+    g.odds_draw = ev.odds_draw
+    g.odds_away = ev.odds_away
+    g.pick = pick
+    g.pick_prob = pprob
+    g.pick_ev = pev
+    g.pick_reason = reason
+    g.will_bet = will or (keep_will_bet and bool(g.will_bet))
+    # Preserva status existente se já for "live" ou "ended", senão usa o novo
+    if g.status not in ("live", "ended"):
+        g.status = status
+
 
 def upsert_game_from_event(
     session,
@@ -25,34 +141,33 @@ def upsert_game_from_event(
     pev: float,
     reason: str,
     will: bool,
-    status: str = "scheduled"
+    status: str = "scheduled",
+    keep_will_bet: bool = False
 ) -> Optional["Game"]:
     """
     Função helper para UPSERT de jogos.
     Retorna o Game criado/atualizado ou None em caso de erro.
+    
+    Em SQLite/PostgreSQL usa um único INSERT ... ON CONFLICT DO UPDATE
+    RETURNING; nos demais dialetos cai no fluxo SELECT + INSERT/UPDATE.
+    Com `keep_will_bet`, will_bet de um jogo existente só passa de False a True.
     """
+    insert_fn = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if insert_fn is not None:
+        stmt = _build_upsert(
+            insert_fn,
+            game_values_from_event(ev, start_utc, url, pick, pprob, pev, reason, will, status),
+            keep_will_bet,
+        )
+        g = session.scalars(stmt, execution_options={"populate_existing": True}).one()
+        session.commit()
+        return g
+    
     g = session.query(Game).filter_by(ext_id=ev.ext_id, start_time=start_utc).one_or_none()
     
     if g:
         # Update existente
-        g.source_link = url
-        g.game_url = getattr(ev, "game_url", None) or g.game_url
-        g.competition = ev.competition or g.competition
-        g.team_home = ev.team_home or g.team_home
-        g.team_away = ev.team_away or g.team_away
-        g.odds_home = ev.odds_home
-        g.odds_draw = ev.odds_draw
-        g.odds_away = ev.odds_away
-        g.pick = pick
-        g.pick_prob = pprob
-        g.pick_ev = pev
-        g.pick_reason = reason
-        g.will_bet = will
-        # Preserva status existente se já for "live" ou "ended", senão usa o novo
-        if g.status in ("live", "ended"):
-            pass  # mantém
-        else:
-            g.status = status
+        _apply_game_updates(g, ev, url, pick, pprob, pev, reason, will, status, keep_will_bet)
         session.commit()
     else:
         # Create novo
@@ -82,39 +197,83 @@ def upsert_game_from_event(
             # Retry: busca o que foi inserido por outra thread
             g = session.query(Game).filter_by(ext_id=ev.ext_id, start_time=start_utc).one_or_none()
             if g:
-                g.source_link = url
-                g.game_url = getattr(ev, "game_url", None) or g.game_url
-                g.competition = ev.competition or g.competition
-                g.team_home = ev.team_home or g.team_home
-                g.team_away = ev.team_away or g.team_away
-                g.odds_home = ev.odds_home
-                g.odds_draw = ev.odds_draw
-                g.odds_away = ev.odds_away
-                g.pick = pick
-                g.pick_prob = pprob
-                g.pick_ev = pev
-                g.pick_reason = reason
-                g.will_bet = will
-                if g.status in ("live", "ended"):
-                    pass  # mantém
-                else:
-                    g.status = status
+                _apply_game_updates(g, ev, url, pick, pprob, pev, reason, will, status, keep_will_bet)
                 session.commit()
             else:
                 return None
     
-    session.refresh(g)
+    # Sem refresh: colunas geradas pelo banco (created_at/updated_at) ficam
+    # expiradas pelo próprio SQLAlchemy e só são recarregadas se acessadas.
     return g
 
 
+def upsert_games_from_events(
+    session,
+    rows: List[Dict[str, Any]],
+    keep_will_bet: bool = False
+) -> List["Game"]:
+    """
+    UPSERT em lote de jogos (um statement por bloco de linhas e um único commit).
+    
+    Args:
+        session: Sessão do banco
+        rows: Dicionários no formato de `game_values_from_event`
+        keep_will_bet: Se True, jogos já selecionados continuam com will_bet=True
+    
+    Returns:
+        Lista de Games criados/atualizados
+    """
+    if not rows:
+        return []
+    
+    # Uma mesma chave não pode aparecer duas vezes no mesmo ON CONFLICT; a última vence
+    unique_rows = list({(r["ext_id"], r["start_time"]): r for r in rows}.values())
+    
+    insert_fn = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if insert_fn is None:
+        games = []
+        for r in unique_rows:
+            ev = SimpleNamespace(**r)
+            g = upsert_game_from_event(
+                session, ev, r["start_time"], r["source_link"], r["pick"], r["pick_prob"],
+                r["pick_ev"], r["pick_reason"], r["will_bet"], r["status"], keep_will_bet
+            )
+            if g is not None:
+                games.append(g)
+        return games
+    
+    games = []
+    try:
+        for i in range(0, len(unique_rows), _UPSERT_BATCH_SIZE):
+            stmt = _build_upsert(insert_fn, unique_rows[i:i + _UPSERT_BATCH_SIZE], keep_will_bet)
+            games.extend(session.scalars(stmt, execution_options={"populate_existing": True}).all())
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return games
+
+
+def batch_fetch_games(session, ids: Iterable[int]) -> Dict[int, "Game"]:
+    """
+    Carrega vários jogos por id em uma única query.
+    
+    Returns:
+        Dict {id: Game}; ids inexistentes ficam de fora
+    """
+    ids = {i for i in ids if i}
+    if not ids:
+        return {}
+    return {g.id: g for g in session.scalars(select(Game).where(Game.id.in_(ids)))}
+
+
 def is_high_conf(game: Game) -> bool:
     """Alta confiança baseada em pick_prob (fallback para campos legados)."""
-    val = (
-        getattr(game, "pick_prob", None)
-        or getattr(game, "pick_confidence", None)
-        or getattr(game, "confidence", None)
-        or 0.0
-    )
+    pick_prob = getattr(game, "pick_prob", None)
+    if pick_prob is not None:
+        return is_high_conf_config(pick_prob)
+    # Campos legados só são consultados quando pick_prob não existe
+    val = getattr(game, "pick_confidence", None) or getattr(game, "confidence", None) or 0.0
     return is_high_conf_config(val)
 
 
@@ -2,12 +2,20 @@
 Sistema de recuperação de jogos pendentes ao reiniciar o script.
 Garante que jogos que estavam sendo monitorados continuem sendo processados após reiniciar.
 """
+import asyncio
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import pytz
-from models.database import Game, SessionLocal
+from sqlalchemy import and_, bindparam, case, event, func, or_, select, update
+from models.database import Game, SessionLocal, engine
 from utils.logger import logger
+from utils.formatters import fmt_result
+from utils.game_helpers import batch_fetch_games
+from utils.stats import invalidate_stats_cache
+from notifications.telegram import tg_send_many
 from scraping.fetchers import fetch_game_result
+from watchlist.manager import stat_get, stat_set
 from scheduler.jobs import (
     _schedule_all_for_game, 
     _ensure_tracker_exists, 
@@ -16,6 +24,87 @@ from scheduler.jobs import (
     _handle_finished_game
 )
 
+UTC = pytz.UTC
+# Duração típica de um jogo de futebol (90min + 15min de acréscimo)
+GAME_DURATION = timedelta(minutes=105)
+# Linhas por bloco na leitura dos candidatos e no carregamento dos jogos
+RECOVERY_BATCH_SIZE = 200
+# Máximo de buscas de resultado simultâneas durante a recuperação
+RESULT_FETCH_CONCURRENCY = 8
+# Backoff exponencial entre tentativas sem resultado: 2^falhas × base, até o máximo
+RESULT_RETRY_BASE = timedelta(seconds=60)
+RESULT_RETRY_MAX = timedelta(minutes=30)
+
+# Impede duas recuperações simultâneas processando (e notificando) os mesmos jogos
+_recovery_lock = asyncio.Lock()
+
+_FINISHED_STATUSES = ("live", "ended", "scheduled")
+
+# Campos do jogo alterados pela recuperação (regravados um a um se o commit do grupo falhar)
+_RECOVERY_FIELDS = (
+    "status", "outcome", "hit", "final_score_home", "final_score_away", "final_score",
+    "result_fetched_at", "last_result_attempt_at", "result_attempt_failures",
+)
+
+# Chave (tabela Stat) do watermark da recuperação e folga aplicada sobre ele
+RECOVERY_WATERMARK_KEY = "recovery_watermark"
+RECOVERY_WATERMARK_SLACK = timedelta(hours=2)
+
+# Statements montados uma única vez no import; a cada execução só mudam os
+# parâmetros de horário (bindparam), sem reconstruir as expressões.
+
+# Candidatos à recuperação: uma única consulta cobre os três grupos (ao vivo,
+# agendados e sem resultado). finished_from é o menor limite inferior entre
+# eles. Lê apenas as colunas usadas na triagem, sem materializar objetos ORM,
+# e em blocos (yield_per, que também ativa stream_results/cursor no servidor
+# onde o driver suporta).
+_RECOVERY_CANDIDATES_STMT = (
+    select(
+        Game.id, Game.ext_id, Game.status, Game.start_time, Game.outcome,
+        Game.pick, Game.team_home, Game.team_away, Game.game_url, Game.source_link,
+        Game.last_result_attempt_at, Game.result_attempt_failures,
+        # Calculado pelo banco: roteia o jogo para a busca de resultado
+        (Game.start_time <= bindparam("ended_cut")).label("ended_by_time"),
+    )
+    .where(
+        Game.will_bet.is_(True),
+        Game.start_time >= bindparam("finished_from"),
+        or_(
+            and_(Game.status == "live", Game.outcome.is_(None), Game.start_time >= bindparam("live_since")),
+            and_(
+                Game.status == "scheduled",
+                Game.start_time >= bindparam("scheduled_from"),
+                Game.start_time <= bindparam("scheduled_to"),
+            ),
+            and_(
+                Game.status.in_(_FINISHED_STATUSES),
+                Game.outcome.is_(None),
+                Game.start_time <= bindparam("finished_to"),
+            ),
+        )
+    )
+    .execution_options(yield_per=RECOVERY_BATCH_SIZE)
+)
+
+# Resumo de pendentes: uma única varredura com contagens condicionais (SUM(CASE ...))
+_PENDING_SUMMARY_STMT = select(
+    func.sum(case((and_(
+        Game.status == "live",
+        Game.outcome.is_(None)
+    ), 1), else_=0)).label("live"),
+    func.sum(case((and_(
+        Game.status == "scheduled",
+        Game.start_time >= bindparam("scheduled_from"),
+        Game.start_time <= bindparam("scheduled_to")
+    ), 1), else_=0)).label("scheduled"),
+    func.sum(case((and_(
+        Game.status.in_(["live", "ended"]),
+        Game.outcome.is_(None),
+        Game.start_time >= bindparam("finished_from"),
+        Game.start_time <= bindparam("finished_to")
+    ), 1), else_=0)).label("finished"),
+).where(Game.will_bet.is_(True))
+
 
 def _normalize_datetime_to_utc(dt: datetime) -> datetime:
     """
@@ -27,10 +116,137 @@ def _normalize_datetime_to_utc(dt: datetime) -> datetime:
     if dt is None:
         return None
     if dt.tzinfo is None:
-        # Offset-naive: assume UTC
-        return pytz.UTC.localize(dt)
+        # Offset-naive (caso do SQLite): assume UTC; replace evita o localize
+        return dt.replace(tzinfo=UTC)
+    if dt.tzinfo is UTC:
+        # Já está em UTC: nada a converter
+        return dt
     # Offset-aware: converte para UTC
-    return dt.astimezone(pytz.UTC)
+    return dt.astimezone(UTC)
+
+
+def _in_result_backoff(game: Game, now_utc: datetime) -> bool:
+    """Indica se a última tentativa sem resultado foi recente demais para tentar de novo."""
+    if game.last_result_attempt_at is None:
+        return False
+    failures = min(game.result_attempt_failures or 0, 10)
+    backoff = min(RESULT_RETRY_BASE * (2 ** failures), RESULT_RETRY_MAX)
+    return now_utc - _normalize_datetime_to_utc(game.last_result_attempt_at) < backoff
+
+
+def _apply_result(game: Game, result: Optional[dict], now_utc: datetime, notifications: List[Dict[str, Any]]) -> None:
+    """
+    Grava o resultado obtido no jogo (sem commit).
+    
+    `result` é o dict devolvido por `fetch_game_result` ("outcome", "home_goals",
+    "away_goals", "score"). A notificação de resultado é apenas enfileirada em
+    `notifications`; o envio acontece em lote após o commit (ver `_send_notifications`).
+    """
+    game.last_result_attempt_at = now_utc
+    values = _result_values(result, game.pick, now_utc)
+    if values is None:
+        game.result_attempt_failures = (game.result_attempt_failures or 0) + 1
+        logger.warning(f"⚠️  Não foi possível obter resultado para jogo {game.id} ainda (tentará novamente no próximo ciclo)")
+        return
+    
+    game.result_attempt_failures = 0
+    for column, value in values.items():
+        setattr(game, column, value)
+    invalidate_stats_cache()
+    _queue_result(game, notifications)
+
+
+def _compute_hit(outcome: str, pick) -> Optional[bool]:
+    """Acerto do palpite (None quando o jogo não tem palpite)."""
+    return (outcome == pick) if pick else None
+
+
+def _result_values(result: Optional[dict], pick, now_utc: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Colunas a gravar para um resultado de `fetch_game_result` (mesmos campos
+    de `_handle_finished_game`), ou None quando não há resultado utilizável.
+    """
+    outcome = result.get("outcome") if result else None
+    if not outcome:
+        return None
+    return {
+        "outcome": outcome,
+        "hit": _compute_hit(outcome, pick),
+        "final_score_home": result.get("home_goals"),
+        "final_score_away": result.get("away_goals"),
+        "final_score": result.get("score"),
+        "result_fetched_at": now_utc,
+    }
+
+
+def _result_update_values(values: Optional[Dict[str, Any]], now_utc: datetime) -> Dict[str, Any]:
+    """Valores do UPDATE de um jogo: o resultado obtido ou, sem resultado, o incremento do backoff."""
+    if values is None:
+        return {
+            "last_result_attempt_at": now_utc,
+            "result_attempt_failures": func.coalesce(Game.result_attempt_failures, 0) + 1,
+        }
+    return {**values, "last_result_attempt_at": now_utc, "result_attempt_failures": 0}
+
+
+def _queue_result(game: Game, notifications: List[Dict[str, Any]]) -> None:
+    """Registra no log o resultado já gravado e enfileira a notificação."""
+    result_msg = "✅ ACERTOU" if game.hit else "❌ ERROU" if game.hit is False else "⚠️ SEM PALPITE"
+    logger.info(f"✅ Resultado obtido para jogo {game.id}: {game.outcome} | {result_msg}")
+    
+    # Enfileira notificação de resultado
+    notifications.append({
+        "text": fmt_result(game),
+        "message_type": "result",
+        "game_id": game.id,
+        "ext_id": game.ext_id,
+    })
+
+
+def _send_notifications(notifications: List[Dict[str, Any]]) -> None:
+    """Envia as notificações enfileiradas em uma única conexão e esvazia a fila."""
+    if not notifications:
+        return
+    tg_send_many(notifications)
+    notifications.clear()
+
+
+def _commit_group(session, games: List[Game], notifications: List[Dict[str, Any]]) -> None:
+    """
+    Commit único de um grupo de jogos recuperados.
+    
+    Se o commit do grupo falhar, desfaz a transação e regrava os campos de
+    recuperação jogo a jogo, de modo que um jogo problemático não descarte o
+    trabalho dos demais; as notificações dos jogos não gravados são removidas.
+    (Não há savepoint por jogo porque os helpers de scheduler.jobs fazem
+    commits próprios.)
+    """
+    snapshot = {game.id: {field: getattr(game, field) for field in _RECOVERY_FIELDS} for game in games}
+    try:
+        session.commit()
+        return
+    except Exception as e:
+        session.rollback()
+        logger.exception(f"Erro no commit do grupo de recuperação, regravando jogo a jogo: {e}")
+    
+    failed = set()
+    for game in games:
+        try:
+            for field, value in snapshot[game.id].items():
+                setattr(game, field, value)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            failed.add(game.id)
+            logger.exception(f"Erro ao gravar recuperação do jogo {game.id}: {e}")
+    if failed:
+        notifications[:] = [n for n in notifications if n.get("game_id") not in failed]
+
+
+async def _finalize_with_result(game: Game, now_utc: datetime, notifications: List[Dict[str, Any]]) -> None:
+    """Busca o resultado final de um jogo encerrado e o aplica."""
+    result = await fetch_game_result(game.ext_id, game.game_url or game.source_link)
+    _apply_result(game, result, now_utc, notifications)
 
 
 async def recover_pending_games():
@@ -41,54 +257,106 @@ async def recover_pending_games():
     1. Jogos ao vivo (status='live') que ainda não têm resultado
     2. Jogos agendados (status='scheduled') com will_bet=True que precisam ser monitorados
     3. Jogos que terminaram (status='ended') mas não têm resultado ainda
+    
+    Execuções concorrentes são descartadas: se uma recuperação já estiver em
+    andamento, a nova chamada retorna sem processar (evita resultados duplicados).
     """
-    now_utc = datetime.now(pytz.UTC)
+    if _recovery_lock.locked():
+        logger.info("⏭️  Recuperação de jogos pendentes já em andamento, ignorando nova execução")
+        return
+    async with _recovery_lock:
+        await _recover_pending_games()
+
+
+async def _recover_pending_games():
+    """Corpo de `recover_pending_games` (executado sob `_recovery_lock`)."""
+    now_utc = datetime.now(UTC)
     
-    with SessionLocal() as session:
-        # 1. Buscar jogos ao vivo que ainda não têm resultado
-        live_games = (
-            session.query(Game)
-            .filter(
-                Game.status == "live",
-                Game.will_bet.is_(True),
-                Game.outcome.is_(None),  # Ainda não tem resultado
-                Game.start_time >= now_utc - timedelta(hours=3)  # Dentro de 3 horas
-            )
-            .all()
+    live_since = now_utc - timedelta(hours=3)  # Ao vivo: dentro de 3 horas
+    scheduled_from = now_utc - timedelta(hours=1)  # Agendados: próximas 24 horas
+    scheduled_to = now_utc + timedelta(hours=24)
+    finished_from = now_utc - timedelta(days=2)  # Sem resultado: últimas 48 horas
+    finished_to = now_utc - timedelta(minutes=30)  # Terminou há mais de 30min
+    finished_statuses = _FINISHED_STATUSES
+    ended_cut = now_utc - GAME_DURATION  # Iniciados antes disso já deveriam ter terminado
+    # Notificações de resultado, enviadas em lote após cada commit
+    notifications: List[Dict[str, Any]] = []
+    # Jogos sem resultado que receberam resultado via UPDATE em lote
+    updated: Dict[int, Game] = {}
+    
+    # Uma única conexão fixa para toda a recuperação: os commits por grupo
+    # não devolvem/retiram a conexão do pool a cada transação
+    with engine.connect() as conn, SessionLocal(bind=conn) as session:
+        if conn.dialect.name == "postgresql":
+            # Recuperação é reexecutável: se um commit se perder num crash, o
+            # próximo ciclo redescobre os jogos. Dispensa o fsync a cada commit
+            # (SET LOCAL vale só para a transação corrente, por isso a cada início).
+            @event.listens_for(session, "after_begin")
+            def _relax_commit_durability(session, transaction, connection):
+                connection.exec_driver_sql("SET LOCAL synchronous_commit = OFF")
+        
+        # Watermark da última execução: tudo que começou antes dela já estava
+        # resolvido, então a janela de 48h pode começar ali (com folga para
+        # jogos que passaram a precisar de recuperação depois)
+        watermark = stat_get(session, RECOVERY_WATERMARK_KEY)
+        if watermark:
+            try:
+                since_watermark = _normalize_datetime_to_utc(datetime.fromisoformat(watermark)) - RECOVERY_WATERMARK_SLACK
+                finished_from = min(max(finished_from, since_watermark), live_since)
+            except (TypeError, ValueError):
+                logger.warning(f"Watermark de recuperação inválido ignorado: {watermark!r}")
+        
+        # Candidatos dos três grupos (ver _RECOVERY_CANDIDATES_STMT); a
+        # separação é feita em memória
+        result = session.execute(
+            _RECOVERY_CANDIDATES_STMT,
+            {
+                "ended_cut": ended_cut,
+                "finished_from": finished_from,
+                "finished_to": finished_to,
+                "live_since": live_since,
+                "scheduled_from": scheduled_from,
+                "scheduled_to": scheduled_to,
+            },
         )
+        starts = {}
+        ended_by_time = {}
+        live_rows, scheduled_rows, finished_rows = [], [], []
+        for r in result:
+            start = starts[r.id] = _normalize_datetime_to_utc(r.start_time)
+            ended_by_time[r.id] = bool(r.ended_by_time)
+            if r.status == "live" and r.outcome is None and start >= live_since:
+                live_rows.append(r)
+            if r.status == "scheduled" and scheduled_from <= start <= scheduled_to:
+                scheduled_rows.append(r)
+            if r.status in finished_statuses and r.outcome is None and start <= finished_to:
+                finished_rows.append(r)
+        
+        # Objetos ORM só para os grupos ao vivo/agendados; o grupo sem
+        # resultado trabalha sobre as linhas e UPDATEs em lote
+        write_ids = list(dict.fromkeys([r.id for r in live_rows] + [r.id for r in scheduled_rows]))
+        games = {}
+        for i in range(0, len(write_ids), RECOVERY_BATCH_SIZE):
+            batch = write_ids[i:i + RECOVERY_BATCH_SIZE]
+            games.update((g.id, g) for g in session.query(Game).filter(Game.id.in_(batch)))
+        
+        # 1. Jogos ao vivo que ainda não têm resultado
+        live_games = [games[r.id] for r in live_rows]
+        # 2. Jogos agendados que precisam ser monitorados
+        scheduled_games = [games[r.id] for r in scheduled_rows]
         
         if live_games:
             logger.info(f"🔄 Recuperando {len(live_games)} jogo(s) ao vivo pendente(s)")
             for game in live_games:
                 try:
                     # IMPORTANTE: Verificar se o jogo já aconteceu (comparando data/hora)
-                    # Normalizar start_time para UTC (offset-aware)
-                    game_start_utc = _normalize_datetime_to_utc(game.start_time)
-                    time_since_start = now_utc - game_start_utc
-                    game_duration_minutes = 105  # Duração típica de um jogo de futebol (90min + 15min de acréscimo)
-                    
                     # Se já passou tempo suficiente para o jogo ter terminado, buscar resultado final
-                    if time_since_start.total_seconds() / 60 >= game_duration_minutes:
+                    if ended_by_time[game.id]:
+                        time_since_start = now_utc - starts[game.id]
                         logger.info(f"⏰ Jogo {game.id} ({game.ext_id}) já deveria ter terminado (iniciou há {int(time_since_start.total_seconds() / 60)} minutos), buscando resultado final...")
                         game.status = "ended"
                         
-                        # Buscar resultado final
-                        outcome = await fetch_game_result(game.ext_id, game.game_url or game.source_link)
-                        if outcome:
-                            game.outcome = outcome
-                            game.hit = (outcome == game.pick) if game.pick else None
-                            result_msg = "✅ ACERTOU" if game.hit else "❌ ERROU" if game.hit is False else "⚠️ SEM PALPITE"
-                            logger.info(f"✅ Resultado obtido para jogo {game.id}: {outcome} | {result_msg}")
-                            
-                            # Envia notificação de resultado
-                            from utils.formatters import fmt_result
-                            from notifications.telegram import tg_send_message
-                            tg_send_message(fmt_result(game), message_type="result", game_id=game.id, ext_id=game.ext_id)
-                            
-                            session.commit()
-                        else:
-                            logger.warning(f"⚠️  Não foi possível obter resultado para jogo {game.id} ainda (tentará novamente no próximo ciclo)")
-                            session.commit()
+                        await _finalize_with_result(game, now_utc, notifications)
                         continue
                     
                     # Jogo ainda pode estar em andamento - fazer análise ao vivo
@@ -104,51 +372,25 @@ async def recover_pending_games():
                         logger.info(f"✅ Jogo ao vivo recuperado: {game.id} ({game.ext_id}) - {game.team_home} vs {game.team_away}")
                 except Exception as e:
                     logger.exception(f"Erro ao recuperar jogo ao vivo {game.id}: {e}")
+            # Um único commit para o lote de jogos ao vivo
+            _commit_group(session, live_games, notifications)
+            _send_notifications(notifications)
         
-        # 2. Buscar jogos agendados que precisam ser monitorados
-        scheduled_games = (
-            session.query(Game)
-            .filter(
-                Game.status == "scheduled",
-                Game.will_bet.is_(True),
-                Game.start_time >= now_utc - timedelta(hours=1),  # Próximas 24 horas
-                Game.start_time <= now_utc + timedelta(hours=24)
-            )
-            .all()
-        )
-        
+        # 2. Processar jogos agendados
         if scheduled_games:
             logger.info(f"🔄 Recuperando {len(scheduled_games)} jogo(s) agendado(s) para monitoramento")
             for game in scheduled_games:
                 try:
                     # Verificar se o jogo já aconteceu (comparando data/hora)
-                    # Normalizar start_time para UTC (offset-aware)
-                    game_start_utc = _normalize_datetime_to_utc(game.start_time)
-                    time_since_start = now_utc - game_start_utc
-                    game_duration_minutes = 105  # Duração típica de um jogo de futebol (90min + 15min de acréscimo)
+                    game_start_utc = starts[game.id]
                     
                     # Se já passou tempo suficiente para o jogo ter terminado, buscar resultado final
-                    if time_since_start.total_seconds() / 60 >= game_duration_minutes:
+                    if ended_by_time[game.id]:
+                        time_since_start = now_utc - game_start_utc
                         logger.info(f"⏰ Jogo agendado {game.id} ({game.ext_id}) já deveria ter terminado (iniciou há {int(time_since_start.total_seconds() / 60)} minutos), buscando resultado final...")
                         game.status = "ended"
                         
-                        # Buscar resultado final
-                        outcome = await fetch_game_result(game.ext_id, game.game_url or game.source_link)
-                        if outcome:
-                            game.outcome = outcome
-                            game.hit = (outcome == game.pick) if game.pick else None
-                            result_msg = "✅ ACERTOU" if game.hit else "❌ ERROU" if game.hit is False else "⚠️ SEM PALPITE"
-                            logger.info(f"✅ Resultado obtido para jogo {game.id}: {outcome} | {result_msg}")
-                            
-                            # Envia notificação de resultado
-                            from utils.formatters import fmt_result
-                            from notifications.telegram import tg_send_message
-                            tg_send_message(fmt_result(game), message_type="result", game_id=game.id, ext_id=game.ext_id)
-                            
-                            session.commit()
-                        else:
-                            logger.warning(f"⚠️  Não foi possível obter resultado para jogo {game.id} ainda (tentará novamente no próximo ciclo)")
-                            session.commit()
+                        await _finalize_with_result(game, now_utc, notifications)
                         continue
                     
                     # Verificar se já começou mas ainda está em andamento
@@ -163,66 +405,140 @@ async def recover_pending_games():
                         logger.info(f"📅 Jogo agendado recuperado: {game.id} ({game.ext_id}) - {game.team_home} vs {game.team_away} às {game.start_time}")
                         # Re-agendar jobs para o jogo
                         await _schedule_all_for_game(game)
-                    session.commit()
                 except Exception as e:
                     logger.exception(f"Erro ao recuperar jogo agendado {game.id}: {e}")
+            # Um único commit para o lote de jogos agendados
+            _commit_group(session, scheduled_games, notifications)
+            _send_notifications(notifications)
         
         # 3. Buscar jogos que terminaram mas não têm resultado
         # IMPORTANTE: Verificar se o jogo já aconteceu (data/hora) antes de buscar resultado
         # Busca jogos que terminaram há mais de 30 minutos (tempo suficiente para ter resultado no site)
-        finished_no_result = (
-            session.query(Game)
-            .filter(
-                Game.status.in_(["live", "ended", "scheduled"]),  # Incluir scheduled também
-                Game.will_bet.is_(True),
-                Game.outcome.is_(None),  # Não tem resultado
-                Game.start_time >= now_utc - timedelta(days=2),  # Últimas 48 horas (expandido)
-                Game.start_time <= now_utc - timedelta(minutes=30)  # Terminou há mais de 30min (já aconteceu)
-            )
-            .all()
-        )
+        # Filtrado após os passos 1 e 2, que podem ter preenchido outcome/status.
+        # Para jogos já carregados nesses passos vale o estado do objeto ORM.
+        finished_no_result = [
+            r for r in finished_rows
+            if r.id not in games
+            or (games[r.id].outcome is None and games[r.id].status in finished_statuses)
+        ]
         
         if finished_no_result:
             logger.info(f"🔍 Buscando resultados finais para {len(finished_no_result)} jogo(s) que terminaram sem resultado")
-            for game in finished_no_result:
-                try:
-                    # Verificar se o jogo já aconteceu (comparando data/hora)
-                    # Se start_time está no passado (há mais de 30 minutos), o jogo já aconteceu
-                    # Normalizar start_time para UTC (offset-aware)
-                    game_start_utc = _normalize_datetime_to_utc(game.start_time)
-                    time_since_start = now_utc - game_start_utc
-                    game_duration_minutes = 105  # Duração típica de um jogo de futebol (90min + 15min de acréscimo)
-                    
-                    # Verificar se já passou tempo suficiente para o jogo ter terminado
-                    if time_since_start.total_seconds() / 60 < game_duration_minutes:
-                        # Jogo ainda pode estar em andamento, pular
-                        logger.debug(f"⏳ Jogo {game.id} ainda pode estar em andamento (iniciou há {int(time_since_start.total_seconds() / 60)} minutos)")
-                        continue
-                    
-                    logger.info(f"🔎 Buscando resultado final para jogo {game.id} ({game.ext_id}) - {game.team_home} vs {game.team_away} (iniciou há {int(time_since_start.total_seconds() / 60)} minutos)")
-                    
-                    # Atualizar status para "ended" se ainda não estiver
-                    if game.status != "ended":
-                        game.status = "ended"
-                        logger.debug(f"📝 Status do jogo {game.id} atualizado para 'ended'")
-                    
-                    outcome = await fetch_game_result(game.ext_id, game.game_url or game.source_link)
-                    if outcome:
-                        game.outcome = outcome
-                        game.hit = (outcome == game.pick) if game.pick else None
-                        result_msg = "✅ ACERTOU" if game.hit else "❌ ERROU" if game.hit is False else "⚠️ SEM PALPITE"
-                        logger.info(f"✅ Resultado obtido para jogo {game.id}: {outcome} | {result_msg}")
-                        
-                        # Envia notificação de resultado
-                        from utils.formatters import fmt_result
-                        from notifications.telegram import tg_send_message
-                        tg_send_message(fmt_result(game), message_type="result", game_id=game.id, ext_id=game.ext_id)
-                        
-                        session.commit()
+            to_fetch = []
+            for row in finished_no_result:
+                state = games.get(row.id, row)
+                # Verificar se o jogo já aconteceu (comparando data/hora)
+                # Se start_time está no passado (há mais de 30 minutos), o jogo já aconteceu
+                time_since_start = now_utc - starts[row.id]
+                
+                # Verificar se já passou tempo suficiente para o jogo ter terminado
+                if not ended_by_time[row.id]:
+                    # Jogo ainda pode estar em andamento, pular
+                    logger.debug(f"⏳ Jogo {row.id} ainda pode estar em andamento (iniciou há {int(time_since_start.total_seconds() / 60)} minutos)")
+                    continue
+                
+                if _in_result_backoff(state, now_utc):
+                    # Tentativa recente sem resultado: aguarda o backoff
+                    logger.debug(f"⏸️  Jogo {row.id} aguardando backoff ({state.result_attempt_failures} tentativa(s) sem resultado)")
+                    continue
+                logger.info(f"🔎 Buscando resultado final para jogo {row.id} ({row.ext_id}) - {row.team_home} vs {row.team_away} (iniciou há {int(time_since_start.total_seconds() / 60)} minutos)")
+                to_fetch.append(state)
+            
+            # Buscas de resultado são independentes: executa em paralelo
+            # (limitado) e aplica as alterações em série depois
+            sem = asyncio.Semaphore(RESULT_FETCH_CONCURRENCY)
+            
+            async def _fetch(game):
+                async with sem:
+                    try:
+                        return await fetch_game_result(game.ext_id, game.game_url or game.source_link)
+                    except Exception as e:
+                        logger.exception(f"Erro ao buscar resultado final para jogo {game.id}: {e}")
+                        return None
+            
+            results = await asyncio.gather(*(_fetch(g) for g in to_fetch))
+            values_by_id = {
+                g.id: _result_values(result, g.pick, now_utc)
+                for g, result in zip(to_fetch, results)
+            }
+            
+            failed_ids = [game_id for game_id, values in values_by_id.items() if values is None]
+            for game_id in failed_ids:
+                logger.warning(f"⚠️  Não foi possível obter resultado para jogo {game_id} ainda (tentará novamente no próximo ciclo)")
+            
+            try:
+                # Atualizar status para "ended" em um único UPDATE
+                to_end = [g.id for g in to_fetch if g.status != "ended"]
+                if to_end:
+                    session.execute(update(Game).where(Game.id.in_(to_end)).values(status="ended"))
+                    logger.debug(f"📝 Status de {len(to_end)} jogo(s) atualizado para 'ended'")
+                
+                # Tentativas sem resultado: um único UPDATE incrementando o backoff
+                if failed_ids:
+                    session.execute(
+                        update(Game)
+                        .where(Game.id.in_(failed_ids))
+                        .values(**_result_update_values(None, now_utc))
+                    )
+                
+                # Resultados obtidos: um UPDATE por combinação de valores (outcome,
+                # hit e placar; jogos com o mesmo resultado compartilham o UPDATE)
+                by_result: Dict[tuple, List[int]] = defaultdict(list)
+                for game_id, values in values_by_id.items():
+                    if values is not None:
+                        by_result[tuple(values.items())].append(game_id)
+                # Com RETURNING o próprio UPDATE devolve os jogos para as notificações,
+                # sem uma nova leitura
+                update_returning = conn.dialect.update_returning
+                for values, ids in by_result.items():
+                    stmt = (
+                        update(Game)
+                        .where(Game.id.in_(ids))
+                        .values(**_result_update_values(dict(values), now_utc))
+                    )
+                    if update_returning:
+                        updated.update((g.id, g) for g in session.scalars(stmt.returning(Game)))
                     else:
-                        logger.warning(f"⚠️  Não foi possível obter resultado para jogo {game.id} ainda (tentará novamente no próximo ciclo)")
-                except Exception as e:
-                    logger.exception(f"Erro ao buscar resultado final para jogo {game.id}: {e}")
+                        session.execute(stmt)
+                        updated.update(batch_fetch_games(session, ids))
+                
+                for row in to_fetch:
+                    if values_by_id[row.id] is not None:
+                        _queue_result(updated[row.id], notifications)
+                # Um único commit para os resultados obtidos
+                session.commit()
+            except Exception as e:
+                # Falha no lote: desfaz e grava jogo a jogo, isolando o jogo problemático
+                session.rollback()
+                logger.exception(f"Erro ao gravar resultados em lote, regravando jogo a jogo: {e}")
+                notifications.clear()
+                updated.clear()
+                for game_id, values in values_by_id.items():
+                    try:
+                        session.execute(
+                            update(Game)
+                            .where(Game.id == game_id)
+                            .values(status="ended", **_result_update_values(values, now_utc))
+                        )
+                        session.commit()
+                    except Exception as e:
+                        session.rollback()
+                        logger.exception(f"Erro ao gravar resultado final do jogo {game_id}: {e}")
+                        continue
+                    if values is not None:
+                        updated[game_id] = session.get(Game, game_id)
+                        _queue_result(updated[game_id], notifications)
+            if updated:
+                invalidate_stats_cache()
+            _send_notifications(notifications)
+        
+        # Novo watermark: início mais antigo entre os candidatos que seguem sem
+        # resultado (ou agora, se não restou nenhum)
+        still_pending = [
+            start for game_id, start in starts.items()
+            if game_id not in updated and (game_id not in games or games[game_id].outcome is None)
+        ]
+        stat_set(session, RECOVERY_WATERMARK_KEY, min(still_pending, default=now_utc).isoformat())
         
         # Resumo
         total_recovered = len(live_games) + len(scheduled_games) + len(finished_no_result)
@@ -239,29 +555,22 @@ def get_pending_games_summary() -> Dict[str, Any]:
     Returns:
         Dict com contagem de jogos por status
     """
-    now_utc = datetime.now(pytz.UTC)
+    now_utc = datetime.now(UTC)
     
     with SessionLocal() as session:
-        live_count = session.query(Game).filter(
-            Game.status == "live",
-            Game.will_bet.is_(True),
-            Game.outcome.is_(None)
-        ).count()
+        row = session.execute(
+            _PENDING_SUMMARY_STMT,
+            {
+                "scheduled_from": now_utc - timedelta(hours=1),
+                "scheduled_to": now_utc + timedelta(hours=24),
+                "finished_from": now_utc - timedelta(days=1),
+                "finished_to": now_utc - timedelta(minutes=90),
+            },
+        ).one()
         
-        scheduled_count = session.query(Game).filter(
-            Game.status == "scheduled",
-            Game.will_bet.is_(True),
-            Game.start_time >= now_utc - timedelta(hours=1),
-            Game.start_time <= now_utc + timedelta(hours=24)
-        ).count()
-        
-        finished_no_result_count = session.query(Game).filter(
-            Game.status.in_(["live", "ended"]),
-            Game.will_bet.is_(True),
-            Game.outcome.is_(None),
-            Game.start_time >= now_utc - timedelta(days=1),
-            Game.start_time <= now_utc - timedelta(minutes=90)
-        ).count()
+        live_count = row.live or 0
+        scheduled_count = row.scheduled or 0
+        finished_no_result_count = row.finished or 0
         
         return {
             "live_pending": live_count,
@@ -269,4 +578,3 @@ def get_pending_games_summary() -> Dict[str, Any]:
             "finished_no_result": finished_no_result_count,
             "total_pending": live_count + scheduled_count + finished_no_result_count
         }
-
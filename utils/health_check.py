@@ -1,14 +1,46 @@
 """
 Sistema de health checks e monitoramento do sistema.
 """
+import asyncio
+import atexit
 import time
-from typing import Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Awaitable, Callable, Dict, Any, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import func, select, text
 from utils.logger import logger
 from config.settings import DB_URL, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, API_TIMEOUT, HEALTH_CHECK_TIMEOUT
-from models.database import SessionLocal, Game
+from models.database import Game, engine
 from notifications.telegram import tg_send_message
 
+# Sessão HTTP dos probes: reaproveita a conexão keep-alive (TCP+TLS) entre checks
+_http = requests.Session()
+_http.mount("https://api.telegram.org", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+atexit.register(_http.close)
+
+# Textos dos alertas (montados uma vez; send_alert só preenche os campos)
+_CHECK_NAMES = {
+    "api": "API do Betnacional",
+    "database": "Banco de Dados",
+    "telegram": "Telegram"
+}
+_ALERT_SEVERITY = {
+    "critical": ("🔴", "CRÍTICO"),
+    "warning": ("⚠️", "ATENÇÃO"),
+}
+_ALERT_TEMPLATE = (
+    "{icon} <b>ALERTA DE SAÚDE DO SISTEMA</b>\n\n"
+    "<b>Componente:</b> {check}\n"
+    "<b>Severidade:</b> {severity}\n"
+    "<b>Erro:</b> {error}\n\n"
+    "<i>Verifique o sistema imediatamente.</i>"
+)
+_RECOVERY_MESSAGE = (
+    "✅ <b>SISTEMA RECUPERADO</b>\n\n"
+    "Todos os componentes estão funcionando normalmente novamente."
+)
+
 
 class SystemHealth:
     """
@@ -17,10 +49,58 @@ class SystemHealth:
     
     def __init__(self):
         self.last_checks: Dict[str, Dict[str, Any]] = {}
-        self.alert_cooldown: Dict[str, datetime] = {}  # Previne spam de alertas
+        self.alert_cooldown: Dict[str, float] = {}  # Previne spam de alertas (time.monotonic())
         self.cooldown_minutes = 30  # Não enviar mesmo alerta por 30 minutos
+        # Cache por check: nome -> (momento da verificação, (is_healthy, error_message))
+        self._cache: Dict[str, Tuple[float, Tuple[bool, Optional[str]]]] = {}
+        self._ok_ttl = 30.0  # Segundos que um resultado saudável é reaproveitado
+        self._err_ttl = 10.0  # Falhas expiram antes para detectar recuperação rápido
+        # Checks em andamento: chamadores concorrentes aguardam o mesmo probe
+        self._inflight: Dict[str, "asyncio.Future[Tuple[bool, Optional[str]]]"] = {}
+    
+    async def _cached(
+        self,
+        name: str,
+        check: Callable[[], Awaitable[Tuple[bool, Optional[str]]]],
+        force: bool = False
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Retorna o resultado em cache do check enquanto válido; senão executa e armazena.
+        
+        Se o mesmo check já estiver rodando, aguarda o resultado dele em vez de
+        disparar outro probe (uma ida à rede por check, por ciclo).
+        
+        Args:
+            name: Nome do check (ex: "api", "database", "telegram")
+            check: Coroutine function que executa o check
+            force: Ignora o cache e executa o check
+        
+        Returns:
+            Tuple (is_healthy, error_message)
+        """
+        cached = self._cache.get(name)
+        if cached is not None and not force:
+            checked_at, result = cached
+            ttl = self._ok_ttl if result[0] else self._err_ttl
+            if time.time() - checked_at < ttl:
+                return result
+        
+        inflight = self._inflight.get(name)
+        if inflight is not None and not force:
+            # shield: o cancelamento de um chamador não cancela o probe dos demais
+            return await asyncio.shield(inflight)
+        
+        task = asyncio.ensure_future(check())
+        self._inflight[name] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if self._inflight.get(name) is task:
+                del self._inflight[name]
+        self._cache[name] = (time.time(), result)
+        return result
     
-    def check_api_health(self) -> Tuple[bool, Optional[str]]:
+    async def check_api_health(self) -> Tuple[bool, Optional[str]]:
         """
         Verifica se a API do Betnacional está respondendo.
         
@@ -28,12 +108,12 @@ class SystemHealth:
             Tuple (is_healthy, error_message)
         """
         try:
-            import requests
             from scraping.betnacional import fetch_events_from_api
             
             # Testa com um campeonato conhecido (UEFA Champions League)
             start_time = time.time()
-            result = fetch_events_from_api(
+            result = await asyncio.to_thread(
+                fetch_events_from_api,
                 sport_id=1,
                 category_id=0,
                 tournament_id=7,
@@ -53,42 +133,55 @@ class SystemHealth:
             error_msg = str(e)[:200]
             return (False, f"Erro ao verificar API: {error_msg}")
     
-    def check_db_health(self) -> Tuple[bool, Optional[str]]:
+    async def check_db_health(self, deep: bool = False) -> Tuple[bool, Optional[str]]:
         """
         Verifica se o banco de dados está acessível e funcionando.
         
+        Args:
+            deep: Usa as contagens completas da tabela (verificação sob demanda)
+        
         Returns:
             Tuple (is_healthy, error_message)
         """
+        # Queries síncronas do SQLAlchemy rodam em thread separada
+        return await asyncio.to_thread(self._check_db_health_blocking, deep)
+    
+    def _check_db_health_blocking(self, deep: bool = False) -> Tuple[bool, Optional[str]]:
+        """Executa as queries de verificação do banco (bloqueante)."""
+        # Queries rápidas têm custo constante; as contagens dependem do tamanho da tabela
+        max_elapsed = 2.0 if deep else 0.1
         try:
-            session = SessionLocal()
-            try:
+            # Conexão direta do pool: dispensa a criação de uma Session do ORM
+            with engine.connect() as conn:
                 # Testa query simples
                 start_time = time.time()
-                count = session.query(Game).count()
+                if deep:
+                    conn.execute(select(func.count()).select_from(Game)).scalar()
+                else:
+                    conn.execute(text("SELECT 1")).scalar()
                 elapsed = time.time() - start_time
                 
-                if elapsed > 2.0:
+                if elapsed > max_elapsed:
                     return (False, f"Banco muito lento ({elapsed:.2f}s)")
                 
                 # Testa query com filtro (usando índice)
                 start_time = time.time()
-                live_count = session.query(Game).filter(Game.status == "live").count()
+                if deep:
+                    conn.execute(select(func.count()).select_from(Game).where(Game.status == "live")).scalar()
+                else:
+                    conn.execute(select(Game.id).where(Game.status == "live").limit(1)).first()
                 elapsed = time.time() - start_time
                 
-                if elapsed > 2.0:
+                if elapsed > max_elapsed:
                     return (False, f"Query com índice muito lenta ({elapsed:.2f}s)")
                 
                 return (True, None)
                 
-            finally:
-                session.close()
-                
         except Exception as e:
             error_msg = str(e)[:200]
             return (False, f"Erro ao verificar banco: {error_msg}")
     
-    def check_telegram_health(self) -> Tuple[bool, Optional[str]]:
+    async def check_telegram_health(self) -> Tuple[bool, Optional[str]]:
         """
         Verifica se o Telegram está funcionando (envia mensagem de teste silenciosa).
         
@@ -99,11 +192,9 @@ class SystemHealth:
             return (False, "Telegram não configurado (TOKEN/CHAT_ID ausentes)")
         
         try:
-            import requests
-            
             # Testa apenas getMe (não envia mensagem)
             url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getMe"
-            response = requests.get(url, timeout=HEALTH_CHECK_TIMEOUT)
+            response = await asyncio.to_thread(_http.get, url, timeout=HEALTH_CHECK_TIMEOUT)
             
             if response.status_code != 200:
                 return (False, f"Telegram API retornou {response.status_code}")
@@ -118,13 +209,32 @@ class SystemHealth:
             error_msg = str(e)[:200]
             return (False, f"Erro ao verificar Telegram: {error_msg}")
     
-    def check_all(self) -> Dict[str, Any]:
+    async def check_all(self, force: bool = False, deep: bool = False) -> Dict[str, Any]:
         """
-        Executa todos os health checks.
+        Executa todos os health checks em paralelo.
+        
+        O tempo total passa a ser o do check mais lento, e não a soma dos três.
+        Resultados recentes são reaproveitados do cache (30s se saudável, 10s
+        se com erro).
+        
+        Args:
+            force: Ignora o cache e executa todos os checks (ex: execução manual)
+            deep: Verifica o banco com contagens completas (ignora o cache do banco)
         
         Returns:
             Dict com resultados de todos os checks
         """
+        checks = await asyncio.gather(
+            self._cached("api", self.check_api_health, force),
+            self._cached("database", lambda: self.check_db_health(deep=deep), force or deep),
+            self._cached("telegram", self.check_telegram_health, force),
+            return_exceptions=True
+        )
+        (api_healthy, api_error), (db_healthy, db_error), (tg_healthy, tg_error) = (
+            (False, f"Erro inesperado no check: {str(res)[:200]}") if isinstance(res, BaseException) else res
+            for res in checks
+        )
+        
         results = {
             "timestamp": datetime.now(),
             "api": {},
@@ -133,24 +243,18 @@ class SystemHealth:
             "overall": False
         }
         
-        # Check API
-        api_healthy, api_error = self.check_api_health()
         results["api"] = {
             "healthy": api_healthy,
             "error": api_error
         }
         self.last_checks["api"] = results["api"]
         
-        # Check Database
-        db_healthy, db_error = self.check_db_health()
         results["database"] = {
             "healthy": db_healthy,
             "error": db_error
         }
         self.last_checks["database"] = results["database"]
         
-        # Check Telegram
-        tg_healthy, tg_error = self.check_telegram_health()
         results["telegram"] = {
             "healthy": tg_healthy,
             "error": tg_error
@@ -172,14 +276,12 @@ class SystemHealth:
         Returns:
             True se deve enviar alerta
         """
-        now = datetime.now()
         last_alert = self.alert_cooldown.get(check_name)
         
         if last_alert is None:
             return True
         
-        time_since_last = now - last_alert
-        return time_since_last >= timedelta(minutes=self.cooldown_minutes)
+        return time.monotonic() - last_alert >= self.cooldown_minutes * 60
     
     def send_alert(self, check_name: str, error: str, alert_type: str = "warning"):
         """
@@ -195,31 +297,16 @@ class SystemHealth:
             return
         
         # Atualiza cooldown
-        self.alert_cooldown[check_name] = datetime.now()
+        self.alert_cooldown[check_name] = time.monotonic()
         
-        # Mapeia nomes para português
-        check_names = {
-            "api": "API do Betnacional",
-            "database": "Banco de Dados",
-            "telegram": "Telegram"
-        }
+        # Ícone/severidade baseados no tipo
+        icon, severity = _ALERT_SEVERITY.get(alert_type, _ALERT_SEVERITY["warning"])
         
-        check_display = check_names.get(check_name, check_name)
-        
-        # Ícones baseados no tipo
-        if alert_type == "critical":
-            icon = "🔴"
-            severity = "CRÍTICO"
-        else:
-            icon = "⚠️"
-            severity = "ATENÇÃO"
-        
-        message = (
-            f"{icon} <b>ALERTA DE SAÚDE DO SISTEMA</b>\n\n"
-            f"<b>Componente:</b> {check_display}\n"
-            f"<b>Severidade:</b> {severity}\n"
-            f"<b>Erro:</b> {error}\n\n"
-            f"<i>Verifique o sistema imediatamente.</i>"
+        message = _ALERT_TEMPLATE.format(
+            icon=icon,
+            check=_CHECK_NAMES.get(check_name, check_name),
+            severity=severity,
+            error=error
         )
         
         try:
@@ -232,14 +319,14 @@ class SystemHealth:
         except Exception as e:
             logger.error(f"Erro ao enviar alerta de saúde: {e}")
     
-    def check_and_alert(self) -> Dict[str, Any]:
+    async def check_and_alert(self) -> Dict[str, Any]:
         """
         Executa health checks e envia alertas se necessário.
         
         Returns:
             Dict com resultados dos checks
         """
-        results = self.check_all()
+        results = await self.check_all()
         
         # Verifica cada componente e envia alertas
         if not results["api"]["healthy"]:
@@ -272,13 +359,9 @@ class SystemHealth:
             )
             
             if had_issues:
-                message = (
-                    "✅ <b>SISTEMA RECUPERADO</b>\n\n"
-                    "Todos os componentes estão funcionando normalmente novamente."
-                )
                 try:
                     tg_send_message(
-                        message,
+                        _RECOVERY_MESSAGE,
                         message_type="health_recovery",
                         parse_mode="HTML"
                     )
@@ -1,81 +1,144 @@
 """Configuração de logging."""
 import os
+import copy
 import json
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Any, Dict, Optional
-from config.settings import LOG_DIR
+from config.settings import LOG_DIR, LOG_FORMAT
+
+# orjson (opcional): serialização bem mais rápida das linhas JSON
+try:
+    import orjson
+    
+    def _dumps(payload: Dict[str, Any]) -> str:
+        return orjson.dumps(payload, default=str).decode()
+except ImportError:
+    def _dumps(payload: Dict[str, Any]) -> str:
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
 
 logger = logging.getLogger("betauto")
 logger.setLevel(logging.INFO)
 
 
+# Atributos próprios do LogRecord (inclusive os preenchidos pelo Formatter);
+# qualquer outro atributo veio de `extra` e entra no contexto do log
+_STANDARD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
 class StructuredFormatter(logging.Formatter):
     """
     Formatter que adiciona contexto estruturado aos logs.
     """
-    def format(self, record: logging.LogRecord) -> str:
-        # Formato básico
-        base_msg = super().format(record)
-        
-        # Adicionar contexto estruturado se presente
-        context = {}
-        
-        # Extrair campos de contexto do record.extra (atributos do LogRecord)
-        # Python logging adiciona campos de 'extra' como atributos do record
-        extra_fields = ['game_id', 'ext_id', 'url', 'duration_ms', 'status', 'stage', 
-                       'backend', 'attempt', 'sport_id', 'category_id', 'tournament_id',
-                       'events_count', 'method', 'outcome', 'hit', 'result_msg', 'games_count']
-        
-        for field in extra_fields:
-            if hasattr(record, field):
-                value = getattr(record, field)
-                if value is not None:
-                    context[field] = value
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        # Formato básico; o traceback (se houver) é anexado depois pelo format(),
+        # então o contexto fica na mesma linha da mensagem
+        base_msg = super().formatMessage(record)
         
-        # Adicionar outros campos dinâmicos (que não são atributos padrão do LogRecord)
-        # Excluir atributos padrão do logging
-        standard_attrs = {'name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 'filename',
-                         'module', 'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
-                         'thread', 'threadName', 'processName', 'process', 'message', 'exc_info',
-                         'exc_text', 'stack_info', 'getMessage'}
-        
-        for attr_name in dir(record):
-            if not attr_name.startswith('_') and attr_name not in standard_attrs and attr_name not in extra_fields:
-                try:
-                    value = getattr(record, attr_name)
-                    if value is not None and not callable(value):
-                        context[attr_name] = value
-                except AttributeError:
-                    pass
+        # Campos de 'extra' viram atributos do record: uma passada sobre
+        # record.__dict__ basta (sem dir(record), que também lista métodos)
+        context = {
+            k: v for k, v in record.__dict__.items()
+            if k not in _STANDARD_ATTRS and not k.startswith('_') and v is not None and not callable(v)
+        }
         
         # Se houver contexto, adicionar ao log
         if context:
-            context_str = " | ".join([f"{k}={v}" for k, v in sorted(context.items()) if v is not None])
+            context_str = " | ".join(f"{k}={context[k]}" for k in sorted(context))
             return f"{base_msg} | {context_str}"
         
         return base_msg
 
 
-# Formatter padrão com suporte a contexto estruturado
-_fmt = StructuredFormatter("%(asctime)s | %(levelname)s | %(message)s")
+class JsonFormatter(logging.Formatter):
+    """
+    Formatter JSON-lines: um objeto por registro, sem ordenação nem montagem
+    de sufixo, pronto para ingestão por ferramentas de log.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": record.created,
+            "lvl": record.levelname,
+            "msg": record.getMessage(),
+        }
+        payload.update(
+            (k, v) for k, v in record.__dict__.items()
+            if k not in _STANDARD_ATTRS and not k.startswith('_') and v is not None and not callable(v)
+        )
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return _dumps(payload)
+
+
+class _LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler para fila no mesmo processo.
+    
+    O prepare() padrão embute o traceback em `msg` e limpa `exc_info` (pensado
+    para filas entre processos); aqui só a mensagem é resolvida e `exc_info`
+    segue para o formatter, que decide onde colocar o traceback.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
 
-h_file = RotatingFileHandler(
-    os.path.join(LOG_DIR, "betauto.log"),
-    maxBytes=2_000_000,
-    backupCount=5,
-    encoding="utf-8"
-)
-h_file.setFormatter(_fmt)
-h_file.setLevel(logging.INFO)
+# Formatter padrão com suporte a contexto estruturado (LOG_FORMAT=json para JSON-lines)
+if LOG_FORMAT == "json":
+    _fmt = JsonFormatter()
+else:
+    _fmt = StructuredFormatter("%(asctime)s | %(levelname)s | %(message)s")
 
-h_out = logging.StreamHandler()
-h_out.setFormatter(_fmt)
-h_out.setLevel(logging.INFO)
 
-if not logger.handlers:
-    logger.addHandler(h_file)
-    logger.addHandler(h_out)
+def _configure_once() -> None:
+    """
+    Registra os handlers do logger "betauto" uma única vez por processo.
+    
+    O sentinela fica no próprio logger (compartilhado via logging.getLogger),
+    então mesmo que este módulo seja importado por caminhos diferentes os
+    handlers não são duplicados.
+    """
+    if getattr(logger, "_betauto_configured", False):
+        return
+    logger._betauto_configured = True
+    
+    h_file = RotatingFileHandler(
+        os.path.join(LOG_DIR, "betauto.log"),
+        maxBytes=2_000_000,
+        backupCount=5,
+        encoding="utf-8"
+    )
+    h_file.setFormatter(_fmt)
+    h_file.setLevel(logging.INFO)
+    
+    h_out = logging.StreamHandler()
+    h_out.setFormatter(_fmt)
+    h_out.setLevel(logging.INFO)
+    
+    # Quem loga só enfileira o registro; escrita em arquivo/console (e rotação)
+    # acontece na thread do QueueListener, fora do caminho quente
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger.addHandler(_LocalQueueHandler(log_queue))
+    listener = QueueListener(log_queue, h_file, h_out, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+
+_configure_once()
+
+
+_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
 
 
 def log_with_context(
@@ -107,41 +170,26 @@ def log_with_context(
         attempt: Número da tentativa
         **extra_fields: Campos adicionais de contexto (serão expandidos diretamente)
     """
-    extra = {}
-    
-    # Adicionar campos padrão
-    if game_id is not None:
-        extra['game_id'] = game_id
-    if ext_id is not None:
-        extra['ext_id'] = ext_id
-    if url is not None:
-        extra['url'] = url
-    if duration_ms is not None:
-        extra['duration_ms'] = duration_ms
-    if status is not None:
-        extra['status'] = status
-    if stage is not None:
-        extra['stage'] = stage
-    if backend is not None:
-        extra['backend'] = backend
-    if attempt is not None:
-        extra['attempt'] = attempt
+    # Nível desconhecido cai em INFO (mesmo comportamento anterior)
+    levelno = _LEVELS.get(level, logging.INFO)
+    if not logger.isEnabledFor(levelno):
+        # Mensagem seria descartada: evita montar o contexto
+        return
     
-    # Adicionar campos customizados (expandir extra_fields diretamente)
-    for key, value in extra_fields.items():
-        if value is not None:
-            extra[key] = value
+    # Campos padrão e customizados (expandidos diretamente); None é omitido
+    extra = {
+        k: v for k, v in (
+            ("game_id", game_id),
+            ("ext_id", ext_id),
+            ("url", url),
+            ("duration_ms", duration_ms),
+            ("status", status),
+            ("stage", stage),
+            ("backend", backend),
+            ("attempt", attempt),
+            *extra_fields.items(),
+        )
+        if v is not None
+    }
     
-    if level == "debug":
-        logger.debug(message, extra=extra)
-    elif level == "info":
-        logger.info(message, extra=extra)
-    elif level == "warning":
-        logger.warning(message, extra=extra)
-    elif level == "error":
-        logger.error(message, extra=extra)
-    elif level == "critical":
-        logger.critical(message, extra=extra)
-    else:
-        logger.info(message, extra=extra)
-
+    logger.log(levelno, message, extra=extra)
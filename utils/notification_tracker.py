@@ -2,12 +2,61 @@
 Sistema de rastreamento de notificações no banco de dados.
 Garante que jogos já notificados não sejam notificados novamente, mesmo após reiniciar o script.
 """
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-import pytz
-from models.database import Game, SessionLocal
+from sqlalchemy import func, select, update
+from models.database import Game, SessionLocal, engine
 from utils.logger import logger
 
+_UTC = timezone.utc
+
+# IDs de jogos já notificados (LRU limitado): a verificação vira um lookup em
+# memória em vez de carregar pick_notified_at pelo ORM
+_NOTIFIED_CACHE_MAX = 5_000
+# Carga inicial: só jogos que começam a partir de ontem (ainda podem ser
+# reavaliados/notificados); jogos antigos caem no fallback pelo próprio objeto
+_NOTIFIED_CACHE_LOOKBACK = timedelta(days=1)
+_notified_ids: "OrderedDict[int, None]" = OrderedDict()
+_notified_cache_built = False
+
+
+def _remember_notified(game_id: Optional[int]) -> None:
+    """Adiciona um jogo ao cache de notificados, descartando o mais antigo se cheio."""
+    if game_id is None:
+        return
+    _notified_ids[game_id] = None
+    _notified_ids.move_to_end(game_id)
+    if len(_notified_ids) > _NOTIFIED_CACHE_MAX:
+        _notified_ids.popitem(last=False)
+
+
+def _ensure_notified_cache() -> None:
+    """Carrega (uma vez) os IDs já notificados da janela ativa com uma única query."""
+    global _notified_cache_built
+    if _notified_cache_built:
+        return
+    try:
+        stmt = (
+            select(Game.id)
+            .where(
+                Game.pick_notified_at.isnot(None),
+                Game.start_time >= datetime.now(_UTC) - _NOTIFIED_CACHE_LOOKBACK,
+            )
+            # Os mais recentes primeiro, até o teto do cache
+            .order_by(Game.pick_notified_at.desc())
+            .limit(_NOTIFIED_CACHE_MAX)
+        )
+        with engine.connect() as conn:
+            game_ids = conn.execute(stmt).scalars().all()
+        # Inseridos do mais antigo ao mais recente (ordem do LRU)
+        for game_id in reversed(game_ids):
+            _remember_notified(game_id)
+        _notified_cache_built = True
+    except Exception as e:
+        # Sem cache: was_pick_notified continua usando o próprio objeto
+        logger.warning(f"Erro ao carregar cache de jogos notificados: {e}")
+
 
 def was_pick_notified(game: Game) -> bool:
     """
@@ -19,16 +68,24 @@ def was_pick_notified(game: Game) -> bool:
     Returns:
         True se já foi notificado, False caso contrário
     """
-    return game.pick_notified_at is not None
+    _ensure_notified_cache()
+    if game.id in _notified_ids:
+        return True
+    # Fora do cache (ex: marcado por outro processo ou descartado do LRU)
+    if game.pick_notified_at is not None:
+        _remember_notified(game.id)
+        return True
+    return False
 
 
-def mark_pick_notified(game: Game, session=None) -> bool:
+def mark_pick_notified(game: Game, session=None, commit: bool = True) -> bool:
     """
     Marca um jogo como tendo seu palpite notificado.
     
     Args:
         game: Instância do Game
         session: Sessão do banco (opcional, cria nova se None)
+        commit: Se False, deixa o commit para o chamador (apenas com session)
         
     Returns:
         True se marcado com sucesso, False caso contrário
@@ -36,17 +93,31 @@ def mark_pick_notified(game: Game, session=None) -> bool:
     try:
         if game.pick_notified_at is not None:
             # Já foi notificado, não precisa fazer nada
+            _remember_notified(game.id)
             return True
         
-        game.pick_notified_at = datetime.now(pytz.UTC)
+        notified_at = datetime.now(_UTC)
         
         if session:
-            session.commit()
+            game.pick_notified_at = notified_at
+            if commit:
+                session.commit()
         else:
+            # Jogo fora de sessão: UPDATE direto da coluna, sem reanexar o objeto
+            stmt = (
+                update(Game)
+                .where(Game.id == game.id, Game.pick_notified_at.is_(None))
+                .values(pick_notified_at=notified_at)
+            )
             with SessionLocal() as sess:
-                sess.add(game)
+                marked = sess.execute(stmt).rowcount
                 sess.commit()
+            if not marked:
+                logger.warning(f"Jogo {game.id} ({game.ext_id}) não foi marcado como notificado (nenhuma linha alterada)")
+                return False
+            game.pick_notified_at = notified_at
         
+        _remember_notified(game.id)
         logger.debug(f"Jogo {game.id} ({game.ext_id}) marcado como notificado em {game.pick_notified_at}")
         return True
     except Exception as e:
@@ -54,6 +125,18 @@ def mark_pick_notified(game: Game, session=None) -> bool:
         return False
 
 
+def _notified_on_date(date: datetime) -> tuple:
+    """Critérios de "notificado na data" (dia inteiro de `date`)."""
+    # Normalizar data para início e fim do dia
+    date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    date_end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return (
+        Game.pick_notified_at >= date_start,
+        Game.pick_notified_at <= date_end,
+        Game.will_bet.is_(True),
+    )
+
+
 def get_notified_games_for_date(date: datetime, session=None) -> list:
     """
     Busca todos os jogos que foram notificados em uma determinada data.
@@ -66,25 +149,11 @@ def get_notified_games_for_date(date: datetime, session=None) -> list:
         Lista de jogos que foram notificados na data
     """
     try:
-        # Normalizar data para início e fim do dia
-        date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        date_end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
         if session:
-            games = session.query(Game).filter(
-                Game.pick_notified_at >= date_start,
-                Game.pick_notified_at <= date_end,
-                Game.will_bet.is_(True)
-            ).all()
-            return games
+            return session.query(Game).filter(*_notified_on_date(date)).all()
         else:
             with SessionLocal() as sess:
-                games = sess.query(Game).filter(
-                    Game.pick_notified_at >= date_start,
-                    Game.pick_notified_at <= date_end,
-                    Game.will_bet.is_(True)
-                ).all()
-                return games
+                return sess.query(Game).filter(*_notified_on_date(date)).all()
     except Exception as e:
         logger.exception(f"Erro ao buscar jogos notificados para data {date}: {e}")
         return []
@@ -137,9 +206,10 @@ def get_notified_games_count(session=None) -> int:
             count = session.query(Game).filter(Game.pick_notified_at.isnot(None)).count()
             return count
         else:
-            with SessionLocal() as sess:
-                count = sess.query(Game).filter(Game.pick_notified_at.isnot(None)).count()
-                return count
+            # Sem sessão: conexão direta do pool, sem montar uma Session do ORM
+            stmt = select(func.count()).select_from(Game).where(Game.pick_notified_at.isnot(None))
+            with engine.connect() as conn:
+                return conn.execute(stmt).scalar_one()
     except Exception as e:
         logger.exception(f"Erro ao contar jogos notificados: {e}")
         return 0
@@ -2,6 +2,7 @@
 Sistema de rate limiting e retry com backoff exponencial.
 """
 import asyncio
+from collections import deque
 from time import time
 from typing import Optional, Callable, Any
 from functools import wraps
@@ -25,73 +26,82 @@ class RateLimiter:
         """
         self.max_requests = max_requests
         self.window = window_seconds
-        self.requests: list = []
+        # Timestamps em ordem crescente: os mais antigos saem pela esquerda
+        self.requests: deque = deque()
         self._lock = asyncio.Lock()
         self.stats = {
             'total_waits': 0,
             'total_wait_time': 0.0
         }
     
+    def _evict(self, now: float) -> None:
+        """Remove da janela as requisições antigas (custo proporcional às removidas)."""
+        while self.requests and now - self.requests[0] >= self.window:
+            self.requests.popleft()
+    
     async def acquire(self):
         """
         Aguarda até que seja possível fazer uma requisição dentro do limite.
         
-        Remove requisições antigas da janela e espera se necessário.
+        O horário da requisição é reservado sob o lock, mas a espera acontece
+        fora dele: chamadores concorrentes recebem horários consecutivos em vez
+        de esperarem um atrás do outro.
         """
         async with self._lock:
             now = time()
             
             # Remove requisições antigas (fora da janela)
-            self.requests = [r for r in self.requests if now - r < self.window]
+            self._evict(now)
             
-            # Se já atingiu o limite, calcular tempo de espera
+            slot = now
             if len(self.requests) >= self.max_requests:
-                # Calcular quanto tempo falta para a requisição mais antiga sair da janela
-                oldest_request = min(self.requests)
-                sleep_time = self.window - (now - oldest_request) + 0.1  # +0.1s para margem
-                
-                if sleep_time > 0:
-                    logger.debug(
-                        f"⏳ Rate limit atingido ({len(self.requests)}/{self.max_requests}). "
-                        f"Aguardando {sleep_time:.1f}s..."
-                    )
-                    
-                    self.stats['total_waits'] += 1
-                    self.stats['total_wait_time'] += sleep_time
-                    
-                    await asyncio.sleep(sleep_time)
-                    
-                    # Recalcular após espera
-                    now = time()
-                    self.requests = [r for r in self.requests if now - r < self.window]
+                # Vaga abre quando a max_requests-ésima requisição mais recente sair da janela
+                slot = self.requests[-self.max_requests] + self.window + 0.1  # +0.1s para margem
+            if self.requests:
+                # Mantém a deque ordenada mesmo com reservas futuras
+                slot = max(slot, self.requests[-1])
+            
+            # Registrar (reservar) nova requisição
+            self.requests.append(slot)
             
-            # Registrar nova requisição
-            self.requests.append(now)
+            sleep_time = slot - now
+            if sleep_time > 0:
+                logger.debug(
+                    f"⏳ Rate limit atingido ({len(self.requests) - 1}/{self.max_requests}). "
+                    f"Aguardando {sleep_time:.1f}s..."
+                )
+                
+                self.stats['total_waits'] += 1
+                self.stats['total_wait_time'] += sleep_time
+        
+        if sleep_time > 0:
+            try:
+                await asyncio.sleep(sleep_time)
+            except asyncio.CancelledError:
+                # Chamador desistiu (ex: timeout): devolve o horário reservado
+                # para que não ocupe a janela de quem chegar depois
+                try:
+                    self.requests.remove(slot)
+                except ValueError:
+                    pass
+                raise
     
     def get_stats(self) -> dict:
         """
         Retorna estatísticas do rate limiter.
         
+        Custo O(1) além das remoções: a deque já mantém a janela atual, então
+        current_requests é apenas o seu tamanho (inclui horários já reservados
+        por chamadores que estão aguardando).
+        
         Returns:
             Dict com estatísticas (total_waits, total_wait_time, current_requests)
         """
-        async def _get_stats():
-            async with self._lock:
-                now = time()
-                self.requests = [r for r in self.requests if now - r < self.window]
-                return {
-                    'total_waits': self.stats['total_waits'],
-                    'total_wait_time': self.stats['total_wait_time'],
-                    'current_requests': len(self.requests),
-                    'max_requests': self.max_requests,
-                    'window_seconds': self.window
-                }
-        
-        # Para uso síncrono, retornar stats atuais
+        self._evict(time())
         return {
             'total_waits': self.stats['total_waits'],
             'total_wait_time': self.stats['total_wait_time'],
-            'current_requests': len([r for r in self.requests if time() - r < self.window]),
+            'current_requests': len(self.requests),
             'max_requests': self.max_requests,
             'window_seconds': self.window
         }
@@ -126,6 +136,8 @@ async def retry_with_backoff(
     """
     delay = initial_delay
     last_exception = None
+    # Tipo da função não muda entre tentativas: verifica uma única vez
+    is_coro = asyncio.iscoroutinefunction(func)
     
     for attempt in range(max_retries):
         try:
@@ -134,10 +146,9 @@ async def retry_with_backoff(
                 await rate_limiter.acquire()
             
             # Executar função (async ou sync)
-            if asyncio.iscoroutinefunction(func):
+            if is_coro:
                 return await func()
-            else:
-                return func()
+            return func()
                 
         except exceptions as e:
             last_exception = e
@@ -190,13 +201,15 @@ def with_retry(
             pass
     """
     def decorator(func: Callable) -> Callable:
+        # Tipo da função decorada é conhecido na decoração
+        is_coro = asyncio.iscoroutinefunction(func)
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
             async def _func():
-                if asyncio.iscoroutinefunction(func):
+                if is_coro:
                     return await func(*args, **kwargs)
-                else:
-                    return func(*args, **kwargs)
+                return func(*args, **kwargs)
             
             return await retry_with_backoff(
                 _func,
@@ -2,13 +2,35 @@
 Sistema de consolidação de lembretes próximos no tempo.
 Agrupa lembretes que acontecem em janela curta de tempo para evitar spam.
 """
+import asyncio
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import pytz
-from models.database import Game, SessionLocal
+from sqlalchemy import Row, select
+from models.database import Game, engine
 from utils.logger import logger
-from utils.formatters import fmt_reminder
+from utils.formatters import esc, fmt_reminder
+from utils.stats import to_aware_utc
 from notifications.telegram import tg_send_message
+from utils.telegram_message_buffer import add_to_buffer
+
+# Janela (minutos) agrupada por execução; o job é agendado nesse mesmo intervalo
+REMINDER_WINDOW_MIN = 5
+
+# Colunas lidas por consolidate_reminders_job: tudo que fmt_reminder e
+# send_consolidated_reminder acessam
+_REMINDER_COLUMNS = (
+    Game.id, Game.ext_id, Game.start_time, Game.start_hhmm_local,
+    Game.team_home, Game.team_away, Game.pick, Game.pick_prob, Game.pick_ev,
+    Game.odds_home, Game.odds_draw, Game.odds_away,
+)
+
+# Bloco de cada jogo no lembrete consolidado (nomes já escapados para HTML)
+_REMINDER_ITEM_TEMPLATE = (
+    "<b>{i}.</b> <b>{home}</b> vs <b>{away}</b>\n"
+    "   🕐 {hhmm}h | Pick: <b>{pick}</b> @ {prob:.0f}%"
+)
 
 
 def consolidate_reminders_job():
@@ -18,102 +40,157 @@ def consolidate_reminders_job():
     """
     from config.settings import START_ALERT_MIN, ZONE
     
-    now_utc = datetime.now(pytz.UTC)
-    window_minutes = 5  # Janela de 5 minutos para agrupar lembretes
-    
-    with SessionLocal() as session:
-        # Busca jogos que têm lembretes agendados na próxima janela
-        window_start = now_utc + timedelta(minutes=START_ALERT_MIN)
-        window_end = window_start + timedelta(minutes=window_minutes)
-        
-        upcoming_games = (
-            session.query(Game)
-            .filter(
+    # Alinhado ao minuto: execuções a cada REMINDER_WINDOW_MIN cobrem janelas
+    # contíguas mesmo que o job dispare alguns segundos atrasado
+    now_utc = datetime.now(pytz.UTC).replace(second=0, microsecond=0)
+    window_minutes = REMINDER_WINDOW_MIN
+    
+    # Busca jogos que têm lembretes agendados na próxima janela [início, fim)
+    window_start = now_utc + timedelta(minutes=START_ALERT_MIN)
+    window_end = window_start + timedelta(minutes=window_minutes)
+    
+    # Apenas as colunas usadas nas mensagens (lembrete individual e
+    # consolidado): linhas leves em vez de entidades do ORM, lidas por uma
+    # conexão direta (sem Session) e devolvida ao pool antes dos envios.
+    # Filtro e ordenação casam com idx_game_reminder_window
+    # (will_bet, status, start_time): manter ao alterar a query. No tick sem
+    # jogos (o caso comum) isso já é uma única sondagem de índice que volta
+    # vazia; um COUNT/EXISTS prévio só somaria uma ida ao banco quando há lembretes.
+    with engine.connect() as conn:
+        upcoming_games = conn.execute(
+            select(*_REMINDER_COLUMNS)
+            .where(
                 Game.will_bet.is_(True),
                 Game.status == "scheduled",
                 Game.start_time >= window_start,
-                Game.start_time <= window_end
+                Game.start_time < window_end
             )
             .order_by(Game.start_time)
-            .all()
+        ).all()
+    
+    if not upcoming_games:
+        return
+    
+    # Agrupa jogos por intervalo de 5 minutos (ex: 14:00-14:04, 14:05-14:09)
+    # com aritmética inteira sobre o timestamp; o rótulo é formatado uma vez por grupo
+    bucket_seconds = window_minutes * 60
+    buckets: Dict[int, List[Row]] = defaultdict(list)
+    for game in upcoming_games:
+        buckets[int(to_aware_utc(game.start_time).timestamp()) // bucket_seconds].append(game)
+    
+    groups: Dict[str, List[Row]] = {
+        datetime.fromtimestamp(bucket * bucket_seconds, tz=pytz.UTC).astimezone(ZONE).strftime("%H:%M"): games
+        for bucket, games in buckets.items()
+    }
+    
+    # Lembretes do mesmo tick vão para o buffer de mensagens e saem juntos
+    # em uma única chamada à API do Telegram
+    for group_key, games in groups.items():
+        if len(games) == 1:
+            # Se só tem um jogo, envia lembrete individual normal
+            game = games[0]
+            _send_reminder(fmt_reminder(game), game_id=game.id, ext_id=game.ext_id)
+            logger.info(f"🔔 Lembrete individual enfileirado para jogo {game.id}")
+        else:
+            # Se tem múltiplos jogos, consolida em uma mensagem
+            _send_reminder(
+                build_consolidated_reminder(games, group_key),
+                game_id=games[0].id,
+                ext_id=f"consolidated_{len(games)}",
+                count=len(games),
+            )
+            logger.info(f"🔔 Lembrete consolidado enfileirado para {len(games)} jogos ({group_key})")
+
+
+def _send_reminder(message: str, game_id: int, ext_id: str, count: int = 1) -> None:
+    """
+    Entrega um lembrete via buffer de mensagens (tipo "reminder").
+    
+    Sem event loop rodando (job executado em thread) o buffer não consegue
+    agendar o flush; nesse caso, e com o buffer desabilitado, envia direto.
+    """
+    try:
+        asyncio.get_running_loop()
+        buffered = add_to_buffer(
+            message_type="reminder",
+            content=message,
+            game_id=game_id,
+            ext_id=ext_id,
+            metadata={"count": count},
         )
-        
-        if not upcoming_games:
-            return
-        
-        # Agrupa jogos por intervalo de tempo (ex: todos os jogos entre 14:00-14:05)
-        groups: Dict[str, List[Game]] = {}
-        for game in upcoming_games:
-            game_start_local = game.start_time.astimezone(ZONE)
-            # Agrupa por intervalo de 5 minutos
-            group_key = game_start_local.strftime("%H:%M")[:4] + "0"  # Ex: "14:00", "14:05"
-            if group_key not in groups:
-                groups[group_key] = []
-            groups[group_key].append(game)
-        
-        # Envia mensagem consolidada para cada grupo
-        for group_key, games in groups.items():
-            if len(games) == 1:
-                # Se só tem um jogo, envia lembrete individual normal
-                game = games[0]
-                tg_send_message(
-                    fmt_reminder(game),
-                    message_type="reminder",
-                    game_id=game.id,
-                    ext_id=game.ext_id
-                )
-                logger.info(f"🔔 Lembrete individual enviado para jogo {game.id}")
-            else:
-                # Se tem múltiplos jogos, consolida em uma mensagem
-                send_consolidated_reminder(games, group_key)
+    except RuntimeError:
+        buffered = False
+    
+    if not buffered:
+        tg_send_message(message, parse_mode="HTML", message_type="reminder", game_id=game_id, ext_id=ext_id)
 
 
-def send_consolidated_reminder(games: List[Game], time_window: str):
+def _pick_label(game) -> str:
+    """Nome do palpite: time escolhido, 'Empate' ou o próprio valor (— se vazio)."""
+    if game.pick == "home":
+        return game.team_home
+    if game.pick == "away":
+        return game.team_away
+    if game.pick == "draw":
+        return "Empate"
+    return game.pick or "—"
+
+
+def build_consolidated_reminder(games: List[Any], time_window: str) -> str:
     """
-    Envia um lembrete consolidado para múltiplos jogos.
+    Monta o texto do lembrete consolidado para múltiplos jogos.
     
     Args:
-        games: Lista de jogos para lembrar
+        games: Jogos para lembrar (Game ou linhas com as colunas de _REMINDER_COLUMNS)
         time_window: Janela de tempo (ex: "14:00")
+    
+    Returns:
+        Mensagem em HTML (string vazia se não houver jogos)
     """
     from config.settings import ZONE
     
     if not games:
-        return
+        return ""
     
     # Ordena por horário de início
     games_sorted = sorted(games, key=lambda g: g.start_time)
     
-    # Monta mensagem consolidada
-    lines = [
-        f"🔔 <b>LEMBRETES ({time_window})</b>",
-        f"━━━━━━━━━━━━━━━━━━━━━━",
-        ""
-    ]
-    
-    for i, game in enumerate(games_sorted, 1):
-        game_start_local = game.start_time.astimezone(ZONE)
-        time_str = game_start_local.strftime("%H:%M")
-        
-        pick_map = {
-            "home": game.team_home,
-            "draw": "Empate",
-            "away": game.team_away
-        }
-        pick_str = pick_map.get(game.pick, game.pick or "—")
-        
-        lines.append(
-            f"<b>{i}.</b> <b>{game.team_home}</b> vs <b>{game.team_away}</b>\n"
-            f"   🕐 {time_str}h | Pick: <b>{pick_str}</b> @ {game.pick_prob * 100:.0f}%"
+    # Monta mensagem consolidada: cabeçalho + um bloco por jogo, separados por linha em branco
+    items = "\n\n".join(
+        _REMINDER_ITEM_TEMPLATE.format(
+            i=i,
+            home=esc(game.team_home),
+            away=esc(game.team_away),
+            # HH:MM local gravado no upsert; conversão de fuso só para linhas antigas
+            hhmm=game.start_hhmm_local or to_aware_utc(game.start_time).astimezone(ZONE).strftime("%H:%M"),
+            pick=esc(_pick_label(game)),
+            prob=(game.pick_prob or 0.0) * 100,
         )
-        lines.append("")
+        for i, game in enumerate(games_sorted, 1)
+    )
+    return (
+        f"🔔 <b>LEMBRETES ({time_window})</b>\n"
+        "━━━━━━━━━━━━━━━━━━━━━━\n"
+        "\n"
+        f"{items}\n"
+    )
+
+
+def send_consolidated_reminder(games: List[Any], time_window: str):
+    """
+    Envia um lembrete consolidado para múltiplos jogos.
     
-    message = "\n".join(lines)
+    Args:
+        games: Jogos para lembrar (Game ou linhas com as colunas de _REMINDER_COLUMNS)
+        time_window: Janela de tempo (ex: "14:00")
+    """
+    if not games:
+        return
     
-    # Usa game_id do primeiro jogo para rastreamento
-    first_game = games_sorted[0]
+    # Usa game_id do primeiro jogo (o mais cedo) para rastreamento
+    first_game = min(games, key=lambda g: g.start_time)
     tg_send_message(
-        message,
+        build_consolidated_reminder(games, time_window),
         parse_mode="HTML",
         message_type="reminder",
         game_id=first_game.id,
@@ -121,4 +198,3 @@ def send_consolidated_reminder(games: List[Game], time_window: str):
     )
     
     logger.info(f"🔔 Lembrete consolidado enviado para {len(games)} jogos ({time_window})")
-
@@ -3,12 +3,18 @@ Sistema de warm-up de sessão para melhorar taxa de sucesso da API.
 Visita a página HTML primeiro para criar cookies/sessão antes de tentar API.
 """
 import asyncio
+import time
 from typing import Optional
 from utils.logger import logger
 from scraping.fetchers import _fetch_with_playwright, _fetch_requests_async
 from config.settings import HAS_PLAYWRIGHT
 from utils.cookie_manager import get_cookie_manager
 
+# Intervalo mínimo entre warm-ups (segundos) e lock que une chamadores concorrentes
+WARMUP_MIN_INTERVAL = 60.0
+_warmup_lock = asyncio.Lock()
+_last_warmup = 0.0
+
 
 async def warmup_session_for_api(base_url: str = "https://betnacional.bet.br/") -> bool:
     """
@@ -54,16 +60,26 @@ async def warmup_session_if_needed() -> bool:
     """
     Faz warm-up de sessão se necessário (sem cookies ou cookies expirados).
     
+    Chamadores concorrentes compartilham um único warm-up, e um novo só é
+    tentado após WARMUP_MIN_INTERVAL segundos do anterior.
+    
     Returns:
         True se warm-up foi feito, False caso contrário
     """
+    global _last_warmup
+    
     manager = get_cookie_manager()
-    stats = manager.get_stats()
+    if manager.has_valid_cookies():
+        return False
     
-    # Se não há cookies válidos, fazer warm-up
-    if stats['valid_cookies'] == 0:
+    async with _warmup_lock:
+        # Outro chamador pode ter feito o warm-up enquanto aguardávamos o lock
+        if time.monotonic() - _last_warmup < WARMUP_MIN_INTERVAL or manager.has_valid_cookies():
+            return False
+        
+        # Se não há cookies válidos, fazer warm-up
         logger.debug("Nenhum cookie válido encontrado, fazendo warm-up...")
-        return await warmup_session_for_api()
-    
-    return False
-
+        try:
+            return await warmup_session_for_api()
+        finally:
+            _last_warmup = time.monotonic()
@@ -1,62 +1,145 @@
 """Estatísticas e performance."""
-from datetime import datetime, timedelta
-from typing import Any, Dict
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, Iterable, Tuple
 import pytz
+from sqlalchemy import case, func, insert, select
 from models.database import Game, SessionLocal
 from config.settings import ZONE
 
+# Cache curto das estatísticas e do resumo diário:
+# {(função, data local): (instante monotônico, resultado)}.
+# Mudam devagar e são recalculadas a cada resumo/mensagem enviada.
+STATS_TTL_SECONDS = 60.0
+_stats_cache: Dict[Tuple[str, date], Tuple[float, Any]] = {}
 
+# Colunas lidas por fmt_daily_summary nos jogos do resumo diário
+_DAILY_SUMMARY_COLUMNS = (
+    Game.id, Game.ext_id, Game.team_home, Game.team_away, Game.start_time,
+    Game.start_hhmm_local, Game.status, Game.pick, Game.pick_prob,
+    Game.odds_home, Game.odds_draw, Game.odds_away, Game.outcome, Game.hit,
+)
+
+
+def _ttl_get(name: str, day: date, compute: Callable[[], Any]) -> Any:
+    """Devolve o resultado em cache de `name` para `day` ou o recalcula com `compute()`."""
+    key = (name, day)
+    now = time.monotonic()
+    cached = _stats_cache.get(key)
+    if cached is not None and now - cached[0] < STATS_TTL_SECONDS:
+        return cached[1]
+    
+    result = compute()
+    # Entradas de outros dias não serão mais consultadas
+    for old_key in [k for k in _stats_cache if k[1] != day]:
+        del _stats_cache[old_key]
+    _stats_cache[key] = (now, result)
+    return result
+
+
+def _ttl_cached(fn: Callable) -> Callable:
+    """Reaproveita o resultado de `fn(session)` por STATS_TTL_SECONDS no mesmo dia."""
+    @wraps(fn)
+    def wrapper(session):
+        return _ttl_get(fn.__name__, datetime.now(ZONE).date(), lambda: fn(session))
+    return wrapper
+
+
+def invalidate_stats_cache() -> None:
+    """Descarta as estatísticas em cache (chamar quando resultados de jogos mudam)."""
+    _stats_cache.clear()
+
+
+def _hit_totals(session, *criteria) -> Tuple[int, int]:
+    """(total, acertos) dos jogos com resultado verificado, agregados no banco."""
+    total, hits = session.execute(select(
+        func.count(Game.id),
+        func.sum(case((Game.hit.is_(True), 1), else_=0)),
+    ).where(Game.hit.isnot(None), *criteria)).one()
+    return total, hits or 0
+
+
+@_ttl_cached
 def global_accuracy(session) -> float:
     """Calcula a taxa de acerto global."""
-    total = session.query(Game).filter(Game.hit.isnot(None)).count()
-    if total == 0:
-        return 0.0
-    hits = session.query(Game).filter(Game.hit.is_(True)).count()
-    return hits / total
+    total, hits = _hit_totals(session)
+    return hits / total if total else 0.0
 
 
+@_ttl_cached
 def get_weekly_stats(session) -> Dict[str, Any]:
     """Retorna estatísticas dos últimos 7 dias."""
     week_ago = datetime.now(pytz.UTC) - timedelta(days=7)
-    games = session.query(Game).filter(
-        Game.start_time >= week_ago,
-        Game.hit.isnot(None)
-    ).all()
+    total, hits = _hit_totals(session, Game.start_time >= week_ago)
     
-    if not games:
+    if not total:
         return {}
     
-    hits = sum(1 for g in games if g.hit)
-    total = len(games)
     return {
         'total': total,
         'hits': hits,
-        'win_rate': (hits / total * 100) if total > 0 else 0,
-        'roi': ((hits * 2 - total) / total * 100) if total > 0 else 0
+        'win_rate': hits / total * 100,
+        'roi': (hits * 2 - total) / total * 100
+    }
+
+
+@_ttl_cached
+def get_accuracy_and_weekly(session) -> Tuple[float, Dict[str, Any]]:
+    """
+    Retorna (taxa de acerto global, estatísticas dos últimos 7 dias) em uma única query.
+    
+    Equivale a `global_accuracy(session)` + `get_weekly_stats(session)`, usado
+    no rodapé de performance dos resumos.
+    """
+    week_ago = datetime.now(pytz.UTC) - timedelta(days=7)
+    in_week = Game.start_time >= week_ago
+    total, hits, week_total, week_hits = session.execute(select(
+        func.count(Game.id),
+        func.sum(case((Game.hit.is_(True), 1), else_=0)),
+        func.sum(case((in_week, 1), else_=0)),
+        func.sum(case((in_week & Game.hit.is_(True), 1), else_=0)),
+    ).where(Game.hit.isnot(None))).one()
+    
+    acc = (hits or 0) / total if total else 0.0
+    if not week_total:
+        return acc, {}
+    
+    week_hits = week_hits or 0
+    return acc, {
+        'total': week_total,
+        'hits': week_hits,
+        'win_rate': week_hits / week_total * 100,
+        'roi': (week_hits * 2 - week_total) / week_total * 100
     }
 
 
+@_ttl_cached
 def get_monthly_stats(session) -> Dict[str, Any]:
     """Retorna estatísticas do mês atual."""
     now = datetime.now(ZONE)
-    month_start = ZONE.localize(datetime(now.year, now.month, 1)).astimezone(pytz.UTC)
-    games = session.query(Game).filter(
-        Game.start_time >= month_start,
-        Game.hit.isnot(None)
-    ).all()
+    month_start, _ = _day_bounds_utc(now.year, now.month, 1)
+    total, hits = _hit_totals(session, Game.start_time >= month_start)
     
-    if not games:
+    if not total:
         return {}
     
-    hits = sum(1 for g in games if g.hit)
-    total = len(games)
     return {
         'total': total,
         'hits': hits,
-        'win_rate': (hits / total * 100) if total > 0 else 0
+        'win_rate': hits / total * 100
     }
 
 
+@lru_cache(maxsize=128)
+def _day_bounds_utc(year: int, month: int, day: int) -> Tuple[datetime, datetime]:
+    """Início (00:00:00) e fim (23:59:59) do dia local em UTC; cacheado por data."""
+    start = ZONE.localize(datetime(year, month, day, 0, 0)).astimezone(pytz.UTC)
+    # Fim localizado à parte: em dia de mudança de horário não é start + 24h
+    end = ZONE.localize(datetime(year, month, day, 23, 59, 59)).astimezone(pytz.UTC)
+    return start, end
+
+
 def to_aware_utc(dt: datetime | None) -> datetime | None:
     """Converte datetime para UTC aware."""
     if dt is None:
@@ -66,18 +149,34 @@ def to_aware_utc(dt: datetime | None) -> datetime | None:
     return dt.astimezone(pytz.UTC)
 
 
+@_ttl_cached
 def get_lifetime_accuracy(session) -> Dict[str, Any]:
     """
     Calcula assertividade lifetime (histórico completo).
     Retorna estatísticas detalhadas de todos os tempos.
     """
-    # Todos os jogos com resultado verificado
-    all_games = session.query(Game).filter(
+    # Odd do palpite de cada jogo (NULL se o palpite não for home/draw/away)
+    pick_odd = case(
+        (Game.pick == "home", Game.odds_home),
+        (Game.pick == "draw", Game.odds_draw),
+        (Game.pick == "away", Game.odds_away),
+        else_=None
+    )
+    # Acertos com odd válida (odd NULL ou zero não entra na média)
+    hit_with_odd = Game.hit.is_(True) & (pick_odd != 0)
+    
+    # Contagens e odd média dos acertos em uma única query agregada
+    # (AVG ignora os NULLs do CASE, então só os acertos com odd entram)
+    total, hits, avg_odd = session.execute(select(
+        func.count(Game.id),
+        func.sum(case((Game.hit.is_(True), 1), else_=0)),
+        func.avg(case((hit_with_odd, pick_odd), else_=None)),
+    ).where(
         Game.hit.isnot(None),
         Game.status == "ended"
-    ).all()
+    )).one()
     
-    if not all_games:
+    if not total:
         return {
             'total': 0,
             'hits': 0,
@@ -87,30 +186,14 @@ def get_lifetime_accuracy(session) -> Dict[str, Any]:
             'roi': 0.0
         }
     
-    total = len(all_games)
-    hits = sum(1 for g in all_games if g.hit is True)
+    # ROI estimado (assumindo aposta de 1 unidade por jogo)
+    # ROI = (acertos * odd_media - total) / total
+    hits = hits or 0
+    avg_odd = float(avg_odd or 0.0)
+    
     misses = total - hits
     accuracy = hits / total if total > 0 else 0.0
     
-    # ROI estimado (assumindo aposta de 1 unidade por jogo)
-    # ROI = (acertos * odd_media - total) / total
-    total_odds = 0.0
-    hits_with_odds = 0
-    for g in all_games:
-        if g.hit:
-            pick_odd = None
-            if g.pick == "home":
-                pick_odd = g.odds_home
-            elif g.pick == "draw":
-                pick_odd = g.odds_draw
-            elif g.pick == "away":
-                pick_odd = g.odds_away
-            
-            if pick_odd:
-                total_odds += pick_odd
-                hits_with_odds += 1
-    
-    avg_odd = total_odds / hits_with_odds if hits_with_odds > 0 else 0.0
     roi = ((hits * avg_odd - total) / total * 100) if total > 0 and avg_odd > 0 else 0.0
     
     return {
@@ -128,22 +211,35 @@ def get_daily_summary(session, date_local: datetime = None) -> Dict[str, Any]:
     """
     Retorna resumo de todos os jogos finalizados de um dia específico.
     Se date_local não for fornecido, usa o dia atual.
+    
+    O resultado é cacheado por STATS_TTL_SECONDS para a mesma data,
+    evitando repetir a agregação quando o resumo é renderizado várias vezes.
     """
     if date_local is None:
         date_local = datetime.now(ZONE)
     
-    day_start = ZONE.localize(datetime(date_local.year, date_local.month, date_local.day, 0, 0)).astimezone(pytz.UTC)
-    day_end = ZONE.localize(datetime(date_local.year, date_local.month, date_local.day, 23, 59, 59)).astimezone(pytz.UTC)
+    return _ttl_get(
+        "get_daily_summary", date_local.date(),
+        lambda: _build_daily_summary(session, date_local),
+    )
+
+
+def _build_daily_summary(session, date_local: datetime) -> Dict[str, Any]:
+    """Consulta e agrega os jogos finalizados do dia (sem cache)."""
+    day_start, day_end = _day_bounds_utc(date_local.year, date_local.month, date_local.day)
     
-    games = session.query(Game).filter(
+    # Linhas só com as colunas que o resumo renderiza: nada de entidades do ORM
+    # presas ao cache (sem lazy load nem DetachedInstanceError depois da sessão)
+    games = session.execute(select(*_DAILY_SUMMARY_COLUMNS).where(
         Game.start_time >= day_start,
         Game.start_time <= day_end,
         Game.status == "ended"
-    ).order_by(Game.start_time).all()
+    )).all()
     
-    # Separa jogos com resultado verificado dos não verificados
-    verified_games = [g for g in games if g.hit is not None]
-    unverified_games = [g for g in games if g.hit is None]
+    # Separa jogos com resultado verificado dos não verificados; a ordenação
+    # por horário é feita aqui (poucas linhas por dia) em vez de no banco
+    verified_games = sorted((g for g in games if g.hit is not None), key=lambda g: g.start_time)
+    unverified_games = sorted((g for g in games if g.hit is None), key=lambda g: g.start_time)
     
     hits = sum(1 for g in verified_games if g.hit is True)
     misses = len(verified_games) - hits
@@ -161,6 +257,7 @@ def get_daily_summary(session, date_local: datetime = None) -> Dict[str, Any]:
     }
 
 
+@_ttl_cached
 def get_accuracy_by_confidence(session) -> Dict[str, Any]:
     """
     Calcula assertividade segmentada por nível de confiança.
@@ -175,40 +272,28 @@ def get_accuracy_by_confidence(session) -> Dict[str, Any]:
     """
     from config.settings import HIGH_CONF_THRESHOLD
     
-    # Todos os jogos com resultado verificado
-    all_games = session.query(Game).filter(
+    # Faixa de confiança de cada jogo; o banco devolve uma linha por faixa
+    bucket = case(
+        (Game.pick_prob >= HIGH_CONF_THRESHOLD, "high"),
+        (Game.pick_prob >= 0.40, "medium"),
+        else_="low"
+    ).label("bucket")
+    rows = session.execute(select(
+        bucket,
+        func.count(Game.id),
+        func.sum(case((Game.hit.is_(True), 1), else_=0)),
+    ).where(
         Game.hit.isnot(None),
         Game.status == "ended",
         Game.pick_prob.isnot(None)
-    ).all()
-    
-    if not all_games:
-        return {
-            'high': {'total': 0, 'hits': 0, 'accuracy': 0.0, 'accuracy_percent': 0.0},
-            'medium': {'total': 0, 'hits': 0, 'accuracy': 0.0, 'accuracy_percent': 0.0},
-            'low': {'total': 0, 'hits': 0, 'accuracy': 0.0, 'accuracy_percent': 0.0}
-        }
+    ).group_by(bucket)).all()
+    totals = {name: (total, hits or 0) for name, total, hits in rows}
     
-    # Separa por nível de confiança
-    high_conf_games = []
-    medium_conf_games = []
-    low_conf_games = []
-    
-    for game in all_games:
-        prob = game.pick_prob or 0.0
-        if prob >= HIGH_CONF_THRESHOLD:
-            high_conf_games.append(game)
-        elif prob >= 0.40:
-            medium_conf_games.append(game)
-        else:
-            low_conf_games.append(game)
-    
-    def calc_accuracy(games):
-        if not games:
+    def calc_accuracy(name):
+        total, hits = totals.get(name, (0, 0))
+        if not total:
             return {'total': 0, 'hits': 0, 'accuracy': 0.0, 'accuracy_percent': 0.0}
-        total = len(games)
-        hits = sum(1 for g in games if g.hit is True)
-        accuracy = hits / total if total > 0 else 0.0
+        accuracy = hits / total
         return {
             'total': total,
             'hits': hits,
@@ -218,9 +303,9 @@ def get_accuracy_by_confidence(session) -> Dict[str, Any]:
         }
     
     return {
-        'high': calc_accuracy(high_conf_games),
-        'medium': calc_accuracy(medium_conf_games),
-        'low': calc_accuracy(low_conf_games)
+        'high': calc_accuracy("high"),
+        'medium': calc_accuracy("medium"),
+        'low': calc_accuracy("low")
     }
 
 
@@ -248,3 +333,35 @@ def save_odd_history(session, game) -> bool:
         session.rollback()
         return False
 
+
+def save_odd_history_bulk(session, games: Iterable[Any]) -> int:
+    """
+    Salva histórico de odds de vários jogos em um único INSERT e um commit.
+    
+    Returns:
+        Quantidade de registros gravados (0 em caso de falha)
+    """
+    from models.database import OddHistory
+    from utils.logger import logger
+    
+    rows = [
+        {
+            "game_id": g.id,
+            "ext_id": g.ext_id,
+            "odds_home": g.odds_home,
+            "odds_draw": g.odds_draw,
+            "odds_away": g.odds_away,
+        }
+        for g in games if g and g.id
+    ]
+    if not rows:
+        return 0
+    
+    try:
+        session.execute(insert(OddHistory), rows)
+        session.commit()
+        return len(rows)
+    except Exception as e:
+        logger.warning(f"Falha ao salvar histórico de odds em lote ({len(rows)} jogos): {e}")
+        session.rollback()
+        return 0
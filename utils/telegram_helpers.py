@@ -2,6 +2,7 @@
 from notifications.telegram import tg_send_message
 from utils.formatters import fmt_pick_now, fmt_watch_upgrade
 from models.database import Game
+from utils.logger import logger
 from typing import Optional, Dict, Any
 
 
@@ -98,14 +99,9 @@ def send_summary_safe(text: str, message_type: str = "summary") -> None:
         tg_send_message(text, parse_mode="HTML", message_type=message_type)
         return
     except Exception:
-        from utils.logger import logger
         logger.exception("Falha com HTML; tentando sem parse_mode…")
+    # tg_send_message sempre aceita parse_mode (None = texto simples)
     try:
         tg_send_message(text, parse_mode=None, message_type=message_type)
-    except TypeError:
-        try:
-            tg_send_message(text, message_type=message_type)
-        except Exception:
-            logger.exception("Falha ao enviar resumo ao Telegram (fallback simples).")
     except Exception:
         logger.exception("Falha ao enviar resumo ao Telegram (fallback simples).")
@@ -3,24 +3,88 @@ Sistema de buffer para consolidar mensagens do Telegram.
 Agrupa mensagens do mesmo tipo em uma janela de tempo.
 """
 import os
+import re
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
-import pytz
 from utils.logger import logger
-from config.settings import ZONE
+from utils.formatters import _game_hhmm
 
+# Teto da espera da task de flush: rede de segurança caso um prazo não seja sinalizado
+_FLUSH_MAX_WAIT_SECONDS = 300.0
+# Flush por ocupação: acima de HIGH envia já, abaixo de LOW espera a janela
+# inteira e entre os dois a espera cai proporcionalmente ao preenchimento
+_FLUSH_FILL_HIGH = 0.8
+_FLUSH_FILL_LOW = 0.2
 
-@dataclass
+# Linha de um jogo nas mensagens consolidadas de picks/upgrades
+_GAME_LINE_TEMPLATE = (
+    "<b>{i}.</b> {icon}<b>{home}</b> vs <b>{away}</b>\n"
+    "   🕐 {hhmm}h | Pick: <b>{pick}</b> @ {odd:.2f}\n"
+    "   📊 Prob: {prob:.0f}% | EV: {ev:+.1f}%"
+)
+# Por palpite: (campo do time exibido ou None para "Empate", campo da odd)
+_PICK_FIELDS = {
+    "home": ("team_home", "odds_home"),
+    "draw": (None, "odds_draw"),
+    "away": ("team_away", "odds_away"),
+}
+# Níveis de confiança dos picks, do índice 0 (baixa) ao 2 (alta):
+# (nível em _consolidate_picks_by_confidence, sufixo do ext_id)
+_PICK_LEVELS = (("baixa", "low"), ("média", "medium"), ("alta", "high"))
+# Minutos finais que marcam uma oportunidade ao vivo como urgente; o minuto é
+# o número no início de match_time ("87", "87'", "87:12", "90+3")
+_LATE_MINUTES = frozenset(range(85, 91))
+_MATCH_MINUTE_RE = re.compile(r"\s*(\d+)")
+
+
+def _format_game_line(game: Any, index: int, with_confidence_icon: bool = False) -> str:
+    """Formata a linha de um jogo (palpite, odd, probabilidade e EV) para as mensagens consolidadas."""
+    # Uma consulta à tabela fixa em vez de montar um dict de rótulos por linha
+    fields = _PICK_FIELDS.get(game.pick)
+    if fields:
+        team_field, odd_field = fields
+        pick_str = getattr(game, team_field) if team_field else "Empate"
+        odd = getattr(game, odd_field) or 0
+    else:
+        pick_str = game.pick or "—"
+        odd = 0.0
+    prob = (game.pick_prob or 0) * 100
+    icon = ""
+    if with_confidence_icon:
+        icon = ("🔥" if prob >= 60 else "⭐" if prob >= 40 else "💡") + " "
+    return _GAME_LINE_TEMPLATE.format(
+        i=index,
+        icon=icon,
+        home=game.team_home,
+        away=game.team_away,
+        hhmm=_game_hhmm(game),
+        pick=pick_str,
+        odd=odd,
+        prob=prob,
+        ev=(game.pick_ev or 0) * 100,
+    )
+
+
+def _render_consolidated(header: str, blocks: List[str], footer: str = "") -> str:
+    """Cabeçalho, blocos separados por linha em branco e rodapé opcional (já separado por linha)."""
+    body = "\n\n" + "\n\n".join(blocks) if blocks else ""
+    return f"{header}{body}\n" + (f"\n{footer}" if footer else "")
+
+
+@dataclass(slots=True)
 class BufferedMessage:
     """Mensagem em buffer aguardando consolidação."""
     message_type: str
     content: str
     game_id: Optional[int] = None
     ext_id: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    timestamp: datetime = field(default_factory=lambda: datetime.now(pytz.UTC))
+    # None quando não há metadados (maioria das mensagens): evita um dict por item
+    metadata: Optional[Dict[str, Any]] = None
+    # Instante monotônico de entrada no buffer (só usado para medir a janela)
+    timestamp: float = field(default_factory=time.monotonic)
 
 
 class MessageBuffer:
@@ -44,6 +108,11 @@ class MessageBuffer:
                 "max_items": int(os.getenv("TELEGRAM_UPGRADE_BUFFER_MAX", "20")),  # Máximo 20 upgrades
                 "enabled": os.getenv("TELEGRAM_UPGRADE_BUFFER_ENABLED", "true").lower() == "true"
             },
+            "reminder": {
+                "window_seconds": int(os.getenv("TELEGRAM_REMINDER_BUFFER_SECONDS", "30")),  # 30 segundos
+                "max_items": int(os.getenv("TELEGRAM_REMINDER_BUFFER_MAX", "10")),  # Máximo 10 lembretes
+                "enabled": os.getenv("TELEGRAM_REMINDER_BUFFER_ENABLED", "true").lower() == "true"
+            },
             "live_opportunity": {
                 "window_seconds": int(os.getenv("TELEGRAM_LIVE_BUFFER_SECONDS", "180")),  # 3 minutos
                 "max_items": int(os.getenv("TELEGRAM_LIVE_BUFFER_MAX", "5")),  # Máximo 5 oportunidades
@@ -51,9 +120,16 @@ class MessageBuffer:
             }
         }
         
-        # Task de flush periódico
+        # Task de flush: dorme até o prazo mais próximo entre os buffers
         self._flush_task: Optional[asyncio.Task] = None
         self._running = False
+        # Acorda a task quando um buffer vazio recebe mensagem (novo prazo)
+        # ou quando um buffer enche
+        self._wakeup: Optional[asyncio.Event] = None
+        # Tipos cujo buffer encheu e aguardam flush imediato
+        self._flush_requested: Set[str] = set()
+        # Prazo até o qual a task de flush está dormindo (None se sem prazo)
+        self._scheduled_deadline: Optional[float] = None
     
     def add_message(self, message_type: str, content: str, game_id: Optional[int] = None, 
                    ext_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> bool:
@@ -74,77 +150,114 @@ class MessageBuffer:
         if not config or not config["enabled"]:
             return False  # Não usa buffer, enviar imediatamente
         
-        if message_type not in self._buffers:
-            self._buffers[message_type] = []
-        
         msg = BufferedMessage(
             message_type=message_type,
             content=content,
             game_id=game_id,
             ext_id=ext_id,
-            metadata=metadata or {}
+            metadata=metadata or None
         )
         
-        self._buffers[message_type].append(msg)
+        buffer = self._buffers.setdefault(message_type, [])
+        buffer.append(msg)
         
-        # Verifica se deve fazer flush imediato (muitos itens ou janela expirada)
-        buffer = self._buffers[message_type]
-        if len(buffer) >= config["max_items"]:
-            # Buffer cheio, fazer flush
-            asyncio.create_task(self._flush_buffer(message_type))
-            return True
+        full = len(buffer) >= config["max_items"]
+        if full:
+            # Buffer cheio: pede flush imediato à task de flush, que processa
+            # um tipo por vez (sem tasks soltas nem flushes concorrentes)
+            self._flush_requested.add(message_type)
         
-        # Inicia task de flush periódico se não estiver rodando
+        # Inicia task de flush se não estiver rodando; se já estiver, acorda-a
+        # quando há flush pedido ou quando o prazo deste buffer (que encurta
+        # conforme ele enche) fica antes do prazo em que a task vai acordar
         if not self._running:
             self._start_flush_task()
+        if full or self._scheduled_deadline is None or \
+                self._buffer_deadline(buffer, config) < self._scheduled_deadline:
+            self._wakeup.set()
         
         return True  # Mensagem adicionada ao buffer
     
+    @staticmethod
+    def _buffer_deadline(buffer: List[BufferedMessage], config: Dict[str, Any]) -> float:
+        """
+        Instante monotônico de flush de um buffer não vazio, conforme sua ocupação.
+        
+        Até _FLUSH_FILL_LOW espera a janela inteira (teto); a partir de
+        _FLUSH_FILL_HIGH o prazo é a própria chegada da primeira mensagem.
+        """
+        window = config["window_seconds"]
+        fill = len(buffer) / config["max_items"]
+        if fill >= _FLUSH_FILL_HIGH:
+            wait = 0.0
+        elif fill <= _FLUSH_FILL_LOW:
+            wait = window
+        else:
+            wait = window * (_FLUSH_FILL_HIGH - fill) / (_FLUSH_FILL_HIGH - _FLUSH_FILL_LOW)
+        return buffer[0].timestamp + wait
+    
+    def _next_deadline(self) -> Optional[float]:
+        """Instante monotônico do próximo flush entre os buffers (None se vazios)."""
+        deadlines = [
+            self._buffer_deadline(buffer, self._buffer_configs[message_type])
+            for message_type, buffer in self._buffers.items()
+            if buffer and message_type in self._buffer_configs
+        ]
+        return min(deadlines, default=None)
+    
     def _start_flush_task(self):
-        """Inicia task de flush periódico."""
+        """Inicia task de flush por prazo (sem polling com buffers vazios)."""
         if self._running:
             return
         
-        self._running = True
-        
         async def periodic_flush():
             while self._running:
                 try:
-                    await asyncio.sleep(30)  # Verifica a cada 30 segundos
+                    # Dorme até o próximo prazo ou até add_message sinalizar um novo
+                    # (sem sleep periódico nem sleep(0) entre os envios do flush)
+                    deadline = self._next_deadline()
+                    self._scheduled_deadline = deadline
+                    timeout = _FLUSH_MAX_WAIT_SECONDS
+                    if deadline is not None:
+                        timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+                    self._scheduled_deadline = None
+                    requested, self._flush_requested = self._flush_requested, set()
+                    for message_type in requested:
+                        await self._flush_buffer(message_type)
                     await self._flush_expired_buffers()
                 except asyncio.CancelledError:
                     break
                 except Exception as e:
                     logger.exception(f"Erro no flush periódico: {e}")
         
+        self._wakeup = asyncio.Event()
+        # Referência forte na instância; só marca como rodando se houver event loop
         self._flush_task = asyncio.create_task(periodic_flush())
+        self._running = True
     
     async def _flush_expired_buffers(self):
         """Faz flush de buffers que expiraram."""
-        now = datetime.now(pytz.UTC)
+        now = time.monotonic()
         
-        for message_type in list(self._buffers.keys()):
+        # Coleta os tipos expirados numa única passada (o flush remove do dict)
+        expired = []
+        for message_type, buffer in self._buffers.items():
             config = self._buffer_configs.get(message_type)
-            if not config:
-                continue
-            
-            buffer = self._buffers[message_type]
-            if not buffer:
-                continue
-            
-            # Verifica se a janela expirou (primeira mensagem + window_seconds)
-            first_msg = buffer[0]
-            elapsed = (now - first_msg.timestamp).total_seconds()
-            
-            if elapsed >= config["window_seconds"]:
-                await self._flush_buffer(message_type)
+            # Verifica se o prazo expirou (janela reduzida conforme a ocupação)
+            if config and buffer and now >= self._buffer_deadline(buffer, config):
+                expired.append(message_type)
+        
+        for message_type in expired:
+            await self._flush_buffer(message_type)
     
     async def _flush_buffer(self, message_type: str):
         """Faz flush de um buffer específico."""
-        if message_type not in self._buffers:
-            return
-        
-        buffer = self._buffers.pop(message_type)
+        buffer = self._buffers.pop(message_type, None)
         if not buffer:
             return
         
@@ -156,9 +269,10 @@ class MessageBuffer:
             consolidated = self._consolidate_messages(message_type, buffer)
             
             if consolidated:
-                # Envia mensagem consolidada
+                # Envia mensagem consolidada (HTTP bloqueante fora do event loop)
                 from notifications.telegram import tg_send_message
-                tg_send_message(
+                await asyncio.to_thread(
+                    tg_send_message,
                     consolidated,
                     parse_mode="HTML",
                     message_type=message_type,
@@ -170,68 +284,45 @@ class MessageBuffer:
     async def _flush_picks_by_confidence(self, messages: List[BufferedMessage]):
         """Faz flush de picks agrupados por nível de confiança."""
         from config.settings import HIGH_CONF_THRESHOLD
-        from models.database import SessionLocal, Game
+        from models.database import SessionLocal
+        from utils.game_helpers import batch_fetch_games
         from notifications.telegram import tg_send_message
         
-        # Agrupa mensagens por nível de confiança
-        high_conf = []
-        medium_conf = []
-        low_conf = []
+        # Limites inferiores de média e alta: bisect_right dá o índice do nível
+        # (0 = baixa, 1 = média, 2 = alta) numa única comparação por jogo
+        thresholds = (0.40, HIGH_CONF_THRESHOLD)
+        buckets: Tuple[list, list, list] = ([], [], [])
         
         with SessionLocal() as session:
-            for msg in messages:
-                game = None
-                if msg.game_id:
-                    game = session.query(Game).filter_by(id=msg.game_id).first()
-                
-                if game:
-                    prob = game.pick_prob or 0.0
-                    if prob >= HIGH_CONF_THRESHOLD:
-                        high_conf.append(msg)
-                    elif prob >= 0.40:
-                        medium_conf.append(msg)
-                    else:
-                        low_conf.append(msg)
-                else:
-                    # Se não conseguir buscar o jogo, coloca na média (fallback)
-                    medium_conf.append(msg)
-        
-        # Envia mensagem consolidada para cada nível de confiança
-        if high_conf:
-            consolidated = self._consolidate_picks_by_confidence(high_conf, "alta")
-            if consolidated:
-                tg_send_message(
-                    consolidated,
-                    parse_mode="HTML",
-                    message_type="pick_now",
-                    game_id=high_conf[0].game_id if high_conf else None,
-                    ext_id=f"picks_high_{len(high_conf)}"
-                )
-                logger.info(f"📦 Picks de alta confiança enviados: {len(high_conf)} itens")
-        
-        if medium_conf:
-            consolidated = self._consolidate_picks_by_confidence(medium_conf, "média")
-            if consolidated:
-                tg_send_message(
-                    consolidated,
-                    parse_mode="HTML",
-                    message_type="pick_now",
-                    game_id=medium_conf[0].game_id if medium_conf else None,
-                    ext_id=f"picks_medium_{len(medium_conf)}"
-                )
-                logger.info(f"📦 Picks de média confiança enviados: {len(medium_conf)} itens")
-        
-        if low_conf:
-            consolidated = self._consolidate_picks_by_confidence(low_conf, "baixa")
+            # Um único SELECT para todos os jogos do buffer; cada nível recebe
+            # os pares (jogo, mensagem) já carregados
+            games = batch_fetch_games(session, (msg.game_id for msg in messages))
+        for msg in messages:
+            game = games.get(msg.game_id)
+            if game:
+                buckets[bisect_right(thresholds, game.pick_prob or 0.0)].append((game, msg))
+            else:
+                # Se não conseguir buscar o jogo, coloca na média (fallback)
+                buckets[1].append((None, msg))
+        
+        # Envia mensagem consolidada para cada nível de confiança (alta primeiro);
+        # o envio (HTTP bloqueante) roda em thread para não travar o event loop
+        for level in (2, 1, 0):
+            confidence_level, ext_key = _PICK_LEVELS[level]
+            items = buckets[level]
+            if not items:
+                continue
+            consolidated = self._consolidate_picks_by_confidence(items, confidence_level)
             if consolidated:
-                tg_send_message(
+                await asyncio.to_thread(
+                    tg_send_message,
                     consolidated,
                     parse_mode="HTML",
                     message_type="pick_now",
-                    game_id=low_conf[0].game_id if low_conf else None,
-                    ext_id=f"picks_low_{len(low_conf)}"
+                    game_id=items[0][1].game_id,
+                    ext_id=f"picks_{ext_key}_{len(items)}"
                 )
-                logger.info(f"📦 Picks de baixa confiança enviados: {len(low_conf)} itens")
+                logger.info(f"📦 Picks de {confidence_level} confiança enviados: {len(items)} itens")
     
     def _consolidate_messages(self, message_type: str, messages: List[BufferedMessage]) -> Optional[str]:
         """
@@ -260,63 +351,33 @@ class MessageBuffer:
     
     def _consolidate_picks(self, messages: List[BufferedMessage]) -> str:
         """Consolida picks em uma mensagem única."""
-        from utils.formatters import fmt_pick_now
-        from models.database import SessionLocal, Game
+        from models.database import SessionLocal
+        from utils.game_helpers import batch_fetch_games
         
-        lines = [
-            f"🎯 <b>NOVOS PICKS ({len(messages)})</b>",
-            "━━━━━━━━━━━━━━━━━━━━━━",
-            ""
-        ]
+        header = f"🎯 <b>NOVOS PICKS ({len(messages)})</b>\n━━━━━━━━━━━━━━━━━━━━━━"
         
-        # Agrupa por horário
         with SessionLocal() as session:
-            for i, msg in enumerate(messages, 1):
-                game = None
-                if msg.game_id:
-                    game = session.query(Game).filter_by(id=msg.game_id).first()
-                
-                if game:
-                    # Usa formatação do formatter, mas adaptado para lista
-                    pick_map = {
-                        "home": game.team_home,
-                        "draw": "Empate",
-                        "away": game.team_away
-                    }
-                    pick_str = pick_map.get(game.pick, game.pick or "—")
-                    
-                    start_local = game.start_time.astimezone(ZONE)
-                    time_str = start_local.strftime("%H:%M")
-                    
-                    pick_odd = 0.0
-                    if game.pick == "home":
-                        pick_odd = game.odds_home or 0
-                    elif game.pick == "draw":
-                        pick_odd = game.odds_draw or 0
-                    elif game.pick == "away":
-                        pick_odd = game.odds_away or 0
-                    
-                    prob = (game.pick_prob or 0) * 100
-                    ev = (game.pick_ev or 0) * 100
-                    
-                    confidence = "🔥" if prob >= 60 else "⭐" if prob >= 40 else "💡"
-                    
-                    lines.append(
-                        f"<b>{i}.</b> {confidence} <b>{game.team_home}</b> vs <b>{game.team_away}</b>\n"
-                        f"   🕐 {time_str}h | Pick: <b>{pick_str}</b> @ {pick_odd:.2f}\n"
-                        f"   📊 Prob: {prob:.0f}% | EV: {ev:+.1f}%"
-                    )
-                    lines.append("")
-                else:
-                    # Fallback: usa conteúdo original
-                    lines.append(f"<b>{i}.</b> {msg.content}")
-                    lines.append("")
-        
-        return "\n".join(lines)
+            # Um único SELECT para todos os jogos do buffer
+            games = batch_fetch_games(session, (msg.game_id for msg in messages))
+        
+        # Um bloco por mensagem; sem jogo carregado, usa o conteúdo original
+        blocks = [
+            _format_game_line(game, i, with_confidence_icon=True)
+            if (game := games.get(msg.game_id)) else f"<b>{i}.</b> {msg.content}"
+            for i, msg in enumerate(messages, 1)
+        ]
+        return _render_consolidated(header, blocks)
     
-    def _consolidate_picks_by_confidence(self, messages: List[BufferedMessage], confidence_level: str) -> str:
-        """Consolida picks de um nível de confiança específico."""
-        from models.database import SessionLocal, Game
+    def _consolidate_picks_by_confidence(self, items: List[Tuple[Optional[Any], BufferedMessage]],
+                                         confidence_level: str) -> str:
+        """
+        Consolida picks de um nível de confiança específico.
+        
+        Args:
+            items: Pares (Game já carregado ou None, mensagem) do nível
+            confidence_level: "alta", "média" ou "baixa"
+        """
+        from models.database import SessionLocal
         from utils.stats import get_accuracy_by_confidence
         
         # Ícones e labels por nível
@@ -328,150 +389,76 @@ class MessageBuffer:
         
         config = confidence_config.get(confidence_level, {"icon": "🎯", "label": "CONFIANÇA", "threshold": "", "key": "high"})
         
-        lines = [
-            f"{config['icon']} <b>PICKS - {config['label']} ({config['threshold']})</b>",
-            f"<i>{len(messages)} jogo(s)</i>",
-            "━━━━━━━━━━━━━━━━━━━━━━",
-            ""
-        ]
+        header = (
+            f"{config['icon']} <b>PICKS - {config['label']} ({config['threshold']})</b>\n"
+            f"<i>{len(items)} jogo(s)</i>\n"
+            "━━━━━━━━━━━━━━━━━━━━━━"
+        )
         
-        with SessionLocal() as session:
-            # Ordena por horário
-            games_with_time = []
-            for msg in messages:
-                game = None
-                if msg.game_id:
-                    game = session.query(Game).filter_by(id=msg.game_id).first()
-                if game:
-                    games_with_time.append((game.start_time, game, msg))
-            
-            # Ordena por horário
-            games_with_time.sort(key=lambda x: x[0])
+        # Ordena por horário (mensagens sem jogo carregado não entram na lista)
+        games_sorted = sorted((game for game, _ in items if game), key=lambda g: g.start_time)
+        blocks = [_format_game_line(game, i) for i, game in enumerate(games_sorted, 1)]
+        
+        # Adiciona assertividade do nível de confiança
+        footer = ""
+        try:
+            with SessionLocal() as session:
+                accuracy_stats = get_accuracy_by_confidence(session)
+            level_stats = accuracy_stats.get(config['key'], {})
             
-            for i, (start_time, game, msg) in enumerate(games_with_time, 1):
-                pick_map = {
-                    "home": game.team_home,
-                    "draw": "Empate",
-                    "away": game.team_away
-                }
-                pick_str = pick_map.get(game.pick, game.pick or "—")
+            if level_stats.get('total', 0) > 0:
+                accuracy_pct = level_stats.get('accuracy_percent', 0.0)
+                hits = level_stats.get('hits', 0)
+                total = level_stats.get('total', 0)
                 
-                start_local = game.start_time.astimezone(ZONE)
-                time_str = start_local.strftime("%H:%M")
-                
-                pick_odd = 0.0
-                if game.pick == "home":
-                    pick_odd = game.odds_home or 0
-                elif game.pick == "draw":
-                    pick_odd = game.odds_draw or 0
-                elif game.pick == "away":
-                    pick_odd = game.odds_away or 0
-                
-                prob = (game.pick_prob or 0) * 100
-                ev = (game.pick_ev or 0) * 100
-                
-                lines.append(
-                    f"<b>{i}.</b> <b>{game.team_home}</b> vs <b>{game.team_away}</b>\n"
-                    f"   🕐 {time_str}h | Pick: <b>{pick_str}</b> @ {pick_odd:.2f}\n"
-                    f"   📊 Prob: {prob:.0f}% | EV: {ev:+.1f}%"
+                footer = (
+                    "━━━━━━━━━━━━━━━━━━━━━━\n"
+                    f"📊 <b>Assertividade {config['label']}:</b> "
+                    f"<b>{accuracy_pct:.1f}%</b> "
+                    f"({hits} acertos de {total} jogos)"
                 )
-                lines.append("")
-            
-            # Adiciona assertividade do nível de confiança
-            try:
-                accuracy_stats = get_accuracy_by_confidence(session)
-                level_stats = accuracy_stats.get(config['key'], {})
-                
-                if level_stats.get('total', 0) > 0:
-                    accuracy_pct = level_stats.get('accuracy_percent', 0.0)
-                    hits = level_stats.get('hits', 0)
-                    total = level_stats.get('total', 0)
-                    
-                    lines.append("━━━━━━━━━━━━━━━━━━━━━━")
-                    lines.append(
-                        f"📊 <b>Assertividade {config['label']}:</b> "
-                        f"<b>{accuracy_pct:.1f}%</b> "
-                        f"({hits} acertos de {total} jogos)"
-                    )
-            except Exception as e:
-                logger.warning(f"Erro ao calcular assertividade por confiança: {e}")
+        except Exception as e:
+            logger.warning(f"Erro ao calcular assertividade por confiança: {e}")
         
-        return "\n".join(lines)
+        return _render_consolidated(header, blocks, footer)
     
     def _consolidate_upgrades(self, messages: List[BufferedMessage]) -> str:
         """Consolida upgrades da watchlist em uma mensagem única."""
-        from utils.formatters import fmt_watch_upgrade
-        from models.database import SessionLocal, Game
+        from models.database import SessionLocal
+        from utils.game_helpers import batch_fetch_games
         
-        lines = [
-            f"⬆️ <b>UPGRADES DA WATCHLIST ({len(messages)})</b>",
-            "━━━━━━━━━━━━━━━━━━━━━━",
-            ""
-        ]
+        header = f"⬆️ <b>UPGRADES DA WATCHLIST ({len(messages)})</b>\n━━━━━━━━━━━━━━━━━━━━━━"
         
-        # Agrupa por horário
         with SessionLocal() as session:
-            for i, msg in enumerate(messages, 1):
-                game = None
-                if msg.game_id:
-                    game = session.query(Game).filter_by(id=msg.game_id).first()
-                
-                if game:
-                    pick_map = {
-                        "home": game.team_home,
-                        "draw": "Empate",
-                        "away": game.team_away
-                    }
-                    pick_str = pick_map.get(game.pick, game.pick or "—")
-                    
-                    start_local = game.start_time.astimezone(ZONE)
-                    time_str = start_local.strftime("%H:%M")
-                    
-                    pick_odd = 0.0
-                    if game.pick == "home":
-                        pick_odd = game.odds_home or 0
-                    elif game.pick == "draw":
-                        pick_odd = game.odds_draw or 0
-                    elif game.pick == "away":
-                        pick_odd = game.odds_away or 0
-                    
-                    prob = (game.pick_prob or 0) * 100
-                    ev = (game.pick_ev or 0) * 100
-                    
-                    confidence = "🔥" if prob >= 60 else "⭐" if prob >= 40 else "💡"
-                    
-                    lines.append(
-                        f"<b>{i}.</b> {confidence} <b>{game.team_home}</b> vs <b>{game.team_away}</b>\n"
-                        f"   🕐 {time_str}h | Pick: <b>{pick_str}</b> @ {pick_odd:.2f}\n"
-                        f"   📊 Prob: {prob:.0f}% | EV: {ev:+.1f}%"
-                    )
-                    lines.append("")
-                else:
-                    # Fallback: usa conteúdo original
-                    lines.append(f"<b>{i}.</b> {msg.content}")
-                    lines.append("")
-        
-        return "\n".join(lines)
+            # Um único SELECT para todos os jogos do buffer
+            games = batch_fetch_games(session, (msg.game_id for msg in messages))
+        
+        # Um bloco por mensagem; sem jogo carregado, usa o conteúdo original
+        blocks = [
+            _format_game_line(game, i, with_confidence_icon=True)
+            if (game := games.get(msg.game_id)) else f"<b>{i}.</b> {msg.content}"
+            for i, msg in enumerate(messages, 1)
+        ]
+        return _render_consolidated(header, blocks)
     
     def _consolidate_live_opportunities(self, messages: List[BufferedMessage]) -> str:
         """Consolida oportunidades ao vivo em uma mensagem única."""
-        from models.database import SessionLocal, Game
+        from models.database import SessionLocal
+        from utils.game_helpers import batch_fetch_games
         
-        lines = [
-            f"⚡ <b>OPORTUNIDADES AO VIVO ({len(messages)})</b>",
-            "━━━━━━━━━━━━━━━━━━━━━━",
-            ""
-        ]
+        header = f"⚡ <b>OPORTUNIDADES AO VIVO ({len(messages)})</b>\n━━━━━━━━━━━━━━━━━━━━━━"
+        blocks = []
         
         with SessionLocal() as session:
+            # Um único SELECT para todos os jogos do buffer
+            games = batch_fetch_games(session, (msg.game_id for msg in messages))
             for i, msg in enumerate(messages, 1):
-                game = None
-                if msg.game_id:
-                    game = session.query(Game).filter_by(id=msg.game_id).first()
+                game = games.get(msg.game_id)
                 
                 # Extrai informações da oportunidade dos metadados
-                opportunity = msg.metadata.get("opportunity", {})
-                stats = msg.metadata.get("stats", {})
+                metadata = msg.metadata or {}
+                opportunity = metadata.get("opportunity", {})
+                stats = metadata.get("stats", {})
                 
                 if game and opportunity:
                     match_time = stats.get('match_time', '—')
@@ -483,15 +470,16 @@ class MessageBuffer:
                     profit = opportunity.get("profit", 0.0)
                     confidence_score = stats.get('confidence_score', 0.0) * 100
                     
-                    urgency = "🔥🔥🔥" if any(x in match_time for x in ["85","86","87","88","89","90"]) else "🔥"
+                    minute_match = _MATCH_MINUTE_RE.match(str(match_time))
+                    minute = int(minute_match.group(1)) if minute_match else -1
+                    urgency = "🔥🔥🔥" if minute in _LATE_MINUTES else "🔥"
                     
-                    lines.append(
+                    blocks.append(
                         f"<b>{i}.</b> {urgency} <b>{game.team_home}</b> vs <b>{game.team_away}</b>\n"
                         f"   ⏱ {match_time} | Placar: {score}\n"
                         f"   💰 {option} @ {odd:.2f} | Prob: {est_p:.0f}%\n"
                         f"   📊 Confiança: {confidence_score:.0f}% | Aporte: R$ {stake:.2f} | Lucro: R$ {profit:.2f}"
                     )
-                    lines.append("")
                 else:
                     # Fallback: usa conteúdo original (mas simplificado)
                     # Remove cabeçalho e separadores para evitar duplicação
@@ -502,11 +490,9 @@ class MessageBuffer:
                         if len(parts) > 1:
                             content = parts[1].strip()
                     
-                    lines.append(f"<b>{i}.</b> {content}")
-                    lines.append("")
+                    blocks.append(f"<b>{i}.</b> {content}")
         
-        lines.append("\n⚡ <i>Aja rápido — odds ao vivo mudam!</i>")
-        return "\n".join(lines)
+        return _render_consolidated(header, blocks, "\n⚡ <i>Aja rápido — odds ao vivo mudam!</i>")
     
     async def flush_all(self):
         """Faz flush de todos os buffers pendentes."""
@@ -3,13 +3,43 @@ Sistema de rate limiting para mensagens do Telegram.
 Previne spam e melhora a experiência do usuário.
 """
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from collections import deque
-import pytz
+import time
+import atexit
+import asyncio
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Optional
+from collections import OrderedDict, deque
 from utils.logger import logger
 from models.database import SessionLocal, Stat
 
+# Cooldown por tipo de mensagem (minutos); somente leitura
+_TYPE_COOLDOWN_MINUTES = MappingProxyType({
+    "live_opportunity": 8,  # 8 minutos entre oportunidades ao vivo
+    "reminder": 5,  # 5 minutos entre lembretes
+    "watch_upgrade": 3,  # 3 minutos entre upgrades
+    "pick_now": 2,  # 2 minutos entre picks
+    "summary": 30,  # 30 minutos entre resumos
+    "results_batch": 5,  # 5 minutos entre batches de resultados
+})
+# Mesmos cooldowns em segundos, para comparar direto com o relógio em can_send
+_TYPE_COOLDOWN_SECONDS = MappingProxyType({k: v * 60 for k, v in _TYPE_COOLDOWN_MINUTES.items()})
+# Retenção dos últimos envios por tipo: cobre o maior cooldown e a janela de
+# 1 hora de get_stats; o teto limita a memória se surgirem tipos dinâmicos
+_COOLDOWN_TTL_SECONDS = 3600
+_MAX_TYPE_COOLDOWNS = 64
+# Atraso da gravação dos cooldowns: envios em rajada viram um único commit
+_COOLDOWN_FLUSH_DELAY = 0.5
+
+
+def _parse_cooldown(value: str) -> float:
+    """Lê um último envio persistido: epoch em segundos ou ISO 8601 (formato antigo)."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 
 class TelegramRateLimiter:
     """
@@ -18,24 +48,30 @@ class TelegramRateLimiter:
     """
     
     def __init__(self):
-        # Histórico de mensagens enviadas (timestamp)
-        self._message_history: deque = deque(maxlen=1000)  # Mantém últimas 1000 mensagens
+        # Instantes monotônicos das mensagens enviadas na última hora e no
+        # último minuto; em ordem de envio, então a poda é só popleft()
+        self._hour_window: deque = deque()
+        self._minute_window: deque = deque()
+        self._total_sent = 0
         
         # Limites padrão (configuráveis via env)
         self._max_per_minute = int(os.getenv("TELEGRAM_MAX_PER_MINUTE", "5"))  # Max 5 mensagens/min
         self._max_per_hour = int(os.getenv("TELEGRAM_MAX_PER_HOUR", "30"))  # Max 30 mensagens/hora
         self._min_interval_seconds = float(os.getenv("TELEGRAM_MIN_INTERVAL", "10"))  # Min 10s entre mensagens
         
-        # Cooldown por tipo de mensagem
-        self._type_cooldowns: Dict[str, datetime] = {}
-        self._type_cooldown_minutes = {
-            "live_opportunity": 8,  # 8 minutos entre oportunidades ao vivo
-            "reminder": 5,  # 5 minutos entre lembretes
-            "watch_upgrade": 3,  # 3 minutos entre upgrades
-            "pick_now": 2,  # 2 minutos entre picks
-            "summary": 30,  # 30 minutos entre resumos
-            "results_batch": 5,  # 5 minutos entre batches de resultados
-        }
+        # Último envio por tipo de mensagem (epoch, float): relógio de parede
+        # porque é persistido no banco e sobrevive a reinícios. Em ordem de
+        # envio (mais antigo primeiro), então a expiração é só popitem(last=False)
+        self._type_cooldowns: "OrderedDict[str, float]" = OrderedDict()
+        # Protege janelas e cooldowns: tg_send_message também roda em threads
+        # (asyncio.to_thread nos flushes do buffer e jobs síncronos do scheduler)
+        self._lock = threading.Lock()
+        # Cooldowns ainda não persistidos (write-behind) e o loop em que o
+        # flush está agendado (None se não há flush pendente)
+        self._pending_cooldowns: Dict[str, float] = {}
+        self._cooldown_flush_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending_lock = threading.Lock()
+        self._type_cooldown_minutes = _TYPE_COOLDOWN_MINUTES
         
         # Carrega configurações do banco
         self._load_config()
@@ -44,29 +80,87 @@ class TelegramRateLimiter:
         """Carrega configurações persistentes do banco de dados."""
         try:
             with SessionLocal() as session:
-                from watchlist.manager import stat_get
+                from watchlist.manager import stat_get_many
                 
-                # Carrega cooldowns por tipo
-                for msg_type in self._type_cooldown_minutes.keys():
-                    key = f"telegram_cooldown_{msg_type}"
-                    last_sent_str = stat_get(session, key, None)
-                    if last_sent_str:
-                        try:
-                            self._type_cooldowns[msg_type] = datetime.fromisoformat(last_sent_str)
-                        except Exception:
-                            pass
+                # Carrega os cooldowns de todos os tipos em uma única query
+                stored = stat_get_many(
+                    session, (f"telegram_cooldown_{msg_type}" for msg_type in self._type_cooldown_minutes)
+                )
+            loaded = {}
+            for msg_type in self._type_cooldown_minutes:
+                last_sent_str = stored.get(f"telegram_cooldown_{msg_type}")
+                if last_sent_str:
+                    try:
+                        loaded[msg_type] = _parse_cooldown(last_sent_str)
+                    except Exception:
+                        pass
+            # Insere em ordem de envio para manter a invariante de _type_cooldowns
+            for msg_type, ts in sorted(loaded.items(), key=lambda item: item[1]):
+                self._type_cooldowns[msg_type] = ts
+            self._evict_cooldowns(time.time())
         except Exception as e:
             logger.debug(f"Erro ao carregar configurações de rate limiter: {e}")
     
-    def _save_cooldown(self, message_type: str, timestamp: datetime):
-        """Salva cooldown no banco de dados."""
+    def _save_cooldown(self, message_type: str, timestamp: float):
+        """
+        Agenda a gravação do cooldown no banco (write-behind).
+        
+        Dentro do event loop, os cooldowns acumulados em _COOLDOWN_FLUSH_DELAY
+        são gravados juntos; fora dele (thread), grava na hora.
+        """
+        with self._pending_lock:
+            self._pending_cooldowns[message_type] = timestamp
+            # Flush já agendado em um loop que ainda roda: ele levará este valor
+            loop = self._cooldown_flush_loop
+            if loop is not None and not loop.is_closed():
+                return
+            self._cooldown_flush_loop = None
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_cooldowns()
+            return
+        with self._pending_lock:
+            self._cooldown_flush_loop = loop
+        loop.call_later(_COOLDOWN_FLUSH_DELAY, self.flush_cooldowns)
+    
+    def flush_cooldowns(self):
+        """Persiste os cooldowns pendentes (epoch em segundos) em um único commit."""
+        with self._pending_lock:
+            pending, self._pending_cooldowns = self._pending_cooldowns, {}
+            self._cooldown_flush_loop = None
+        if not pending:
+            return
+        
         try:
             with SessionLocal() as session:
-                from watchlist.manager import stat_set
-                key = f"telegram_cooldown_{message_type}"
-                stat_set(session, key, timestamp.isoformat())
+                from watchlist.manager import stat_set_many
+                stat_set_many(session, {
+                    f"telegram_cooldown_{message_type}": str(int(ts))
+                    for message_type, ts in pending.items()
+                })
         except Exception as e:
-            logger.debug(f"Erro ao salvar cooldown de {message_type}: {e}")
+            logger.debug(f"Erro ao salvar cooldowns ({', '.join(pending)}): {e}")
+    
+    def _evict(self, now: float) -> None:
+        """Descarta das janelas os envios mais antigos que 1 hora / 1 minuto."""
+        hour_ago = now - 3600
+        while self._hour_window and self._hour_window[0] < hour_ago:
+            self._hour_window.popleft()
+        minute_ago = now - 60
+        while self._minute_window and self._minute_window[0] < minute_ago:
+            self._minute_window.popleft()
+    
+    def _evict_cooldowns(self, now: float) -> None:
+        """Descarta os últimos envios mais antigos que a retenção ou acima do teto (LRU)."""
+        cooldowns = self._type_cooldowns
+        expired_before = now - _COOLDOWN_TTL_SECONDS
+        while cooldowns and (
+            len(cooldowns) > _MAX_TYPE_COOLDOWNS
+            or next(iter(cooldowns.values())) <= expired_before
+        ):
+            cooldowns.popitem(last=False)
     
     def can_send(self, message_type: Optional[str] = None) -> tuple[bool, str]:
         """
@@ -78,40 +172,39 @@ class TelegramRateLimiter:
         Returns:
             Tuple (can_send: bool, reason: str)
         """
-        now = datetime.now(pytz.UTC)
-        
-        # 1. Verificar intervalo mínimo entre qualquer mensagem
-        if self._message_history:
-            last_sent = self._message_history[-1]
-            elapsed = (now - last_sent).total_seconds()
-            if elapsed < self._min_interval_seconds:
-                remaining = self._min_interval_seconds - elapsed
-                return False, f"Aguarde {remaining:.1f}s (intervalo mínimo entre mensagens)"
-        
-        # 2. Verificar limite por minuto
-        one_min_ago = now - timedelta(minutes=1)
-        recent_count = sum(1 for ts in self._message_history if ts >= one_min_ago)
-        if recent_count >= self._max_per_minute:
-            return False, f"Limite de {self._max_per_minute} mensagens/minuto atingido"
-        
-        # 3. Verificar limite por hora
-        one_hour_ago = now - timedelta(hours=1)
-        hourly_count = sum(1 for ts in self._message_history if ts >= one_hour_ago)
-        if hourly_count >= self._max_per_hour:
-            return False, f"Limite de {self._max_per_hour} mensagens/hora atingido"
-        
-        # 4. Verificar cooldown específico por tipo
-        if message_type:
-            cooldown_min = self._type_cooldown_minutes.get(message_type)
-            if cooldown_min:
-                last_sent = self._type_cooldowns.get(message_type)
-                if last_sent:
-                    elapsed_min = (now - last_sent).total_seconds() / 60
-                    if elapsed_min < cooldown_min:
-                        remaining = cooldown_min - elapsed_min
-                        return False, f"Cooldown de {message_type}: aguarde {remaining:.1f}min"
-        
-        return True, "OK"
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            
+            # 1. Verificar intervalo mínimo entre qualquer mensagem
+            if self._hour_window:
+                elapsed = now - self._hour_window[-1]
+                if elapsed < self._min_interval_seconds:
+                    remaining = self._min_interval_seconds - elapsed
+                    return False, f"Aguarde {remaining:.1f}s (intervalo mínimo entre mensagens)"
+            
+            # 2. Verificar limite por minuto
+            if len(self._minute_window) >= self._max_per_minute:
+                return False, f"Limite de {self._max_per_minute} mensagens/minuto atingido"
+            
+            # 3. Verificar limite por hora
+            if len(self._hour_window) >= self._max_per_hour:
+                return False, f"Limite de {self._max_per_hour} mensagens/hora atingido"
+            
+            # 4. Verificar cooldown específico por tipo
+            if message_type:
+                cooldown_s = _TYPE_COOLDOWN_SECONDS.get(message_type)
+                if cooldown_s:
+                    wall_now = time.time()
+                    self._evict_cooldowns(wall_now)
+                    last_sent = self._type_cooldowns.get(message_type)
+                    if last_sent:
+                        elapsed = wall_now - last_sent
+                        if elapsed < cooldown_s:
+                            remaining = (cooldown_s - elapsed) / 60
+                            return False, f"Cooldown de {message_type}: aguarde {remaining:.1f}min"
+            
+            return True, "OK"
     
     def record_sent(self, message_type: Optional[str] = None):
         """
@@ -120,12 +213,20 @@ class TelegramRateLimiter:
         Args:
             message_type: Tipo da mensagem enviada
         """
-        now = datetime.now(pytz.UTC)
-        self._message_history.append(now)
-        
-        if message_type:
-            self._type_cooldowns[message_type] = now
-            self._save_cooldown(message_type, now)
+        with self._lock:
+            now = time.monotonic()
+            self._hour_window.append(now)
+            self._minute_window.append(now)
+            self._total_sent += 1
+            
+            if not message_type:
+                return
+            sent_at = time.time()
+            self._type_cooldowns[message_type] = sent_at
+            self._type_cooldowns.move_to_end(message_type)
+            self._evict_cooldowns(sent_at)
+        # Fora do lock: sem event loop (thread) a gravação no banco é imediata
+        self._save_cooldown(message_type, sent_at)
     
     def get_stats(self) -> Dict[str, any]:
         """
@@ -134,27 +235,27 @@ class TelegramRateLimiter:
         Returns:
             Dict com estatísticas
         """
-        now = datetime.now(pytz.UTC)
-        one_min_ago = now - timedelta(minutes=1)
-        one_hour_ago = now - timedelta(hours=1)
-        
-        return {
-            "total_messages": len(self._message_history),
-            "messages_last_minute": sum(1 for ts in self._message_history if ts >= one_min_ago),
-            "messages_last_hour": sum(1 for ts in self._message_history if ts >= one_hour_ago),
-            "max_per_minute": self._max_per_minute,
-            "max_per_hour": self._max_per_hour,
-            "min_interval_seconds": self._min_interval_seconds,
-            "active_cooldowns": {
-                k: (now - v).total_seconds() / 60 
-                for k, v in self._type_cooldowns.items() 
-                if v > now - timedelta(hours=1)
+        with self._lock:
+            self._evict(time.monotonic())
+            now = time.time()
+            self._evict_cooldowns(now)
+            
+            return {
+                "total_messages": self._total_sent,
+                "messages_last_minute": len(self._minute_window),
+                "messages_last_hour": len(self._hour_window),
+                "max_per_minute": self._max_per_minute,
+                "max_per_hour": self._max_per_hour,
+                "min_interval_seconds": self._min_interval_seconds,
+                # Após a expiração só restam envios da última hora
+                "active_cooldowns": {k: (now - v) / 60 for k, v in self._type_cooldowns.items()}
             }
-        }
 
 
 # Instância global
 _rate_limiter = TelegramRateLimiter()
+# Não perde cooldowns ainda pendentes ao encerrar o processo
+atexit.register(_rate_limiter.flush_cooldowns)
 
 
 def check_rate_limit(message_type: Optional[str] = None) -> tuple[bool, str]:
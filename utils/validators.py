@@ -1,9 +1,32 @@
 """
 Sistema de validação de dados da API e scraping.
 """
+import functools
 from typing import Optional, Tuple, Any, Dict, List
 from utils.logger import logger
 
+# Faixa aceita para odds (decimal); fora dela a odd é descartada
+_ODD_MIN = 1.0
+_ODD_MAX = 100.0
+# Teto de gols por time num placar plausível
+_MAX_GOALS = 50
+
+
+def _coerce_odd(value: Any, label: str) -> Optional[float]:
+    """
+    Converte uma odd para float e descarta valores fora da faixa.
+    
+    Uma única comparação encadeada cobre zero, negativos, valores acima do
+    teto e NaN. Propaga ValueError/TypeError de valores não numéricos.
+    """
+    if value is None:
+        return None
+    odd = float(value)
+    if not _ODD_MIN <= odd <= _ODD_MAX:
+        logger.debug("Odd %s inválida (fora do range): %s", label, odd)
+        return None
+    return odd
+
 
 def validate_odds(odds_home: Any, odds_draw: Any, odds_away: Any) -> Tuple[Optional[float], Optional[float], Optional[float]]:
     """
@@ -22,47 +45,55 @@ def validate_odds(odds_home: Any, odds_draw: Any, odds_away: Any) -> Tuple[Optio
     - Todas as três odds devem estar presentes
     - Valores devem ser numéricos
     """
+    # Caminho rápido: evento sem nenhuma odd (sem conversões nem log)
+    if odds_home is None and odds_draw is None and odds_away is None:
+        return (None, None, None)
+    
     try:
-        # Converter para float
-        home = float(odds_home) if odds_home is not None else None
-        draw = float(odds_draw) if odds_draw is not None else None
-        away = float(odds_away) if odds_away is not None else None
-        
-        # Validar range (1.0 a 100.0)
-        if home is not None:
-            if home < 1.0 or home > 100.0:
-                logger.debug(f"Odd home inválida (fora do range): {home}")
-                home = None
-            elif home == 0:
-                logger.debug(f"Odd home inválida (zero): {home}")
-                home = None
-        
-        if draw is not None:
-            if draw < 1.0 or draw > 100.0:
-                logger.debug(f"Odd draw inválida (fora do range): {draw}")
-                draw = None
-            elif draw == 0:
-                logger.debug(f"Odd draw inválida (zero): {draw}")
-                draw = None
-        
-        if away is not None:
-            if away < 1.0 or away > 100.0:
-                logger.debug(f"Odd away inválida (fora do range): {away}")
-                away = None
-            elif away == 0:
-                logger.debug(f"Odd away inválida (zero): {away}")
-                away = None
-        
-        # Todas devem estar presentes e válidas
-        if not (home and draw and away):
-            logger.debug(f"Odds incompletas: home={home}, draw={draw}, away={away}")
-            return (None, None, None)
-        
-        return (home, draw, away)
-        
+        home = _coerce_odd(odds_home, "home")
+        draw = _coerce_odd(odds_draw, "draw")
+        away = _coerce_odd(odds_away, "away")
     except (ValueError, TypeError) as e:
-        logger.debug(f"Erro ao validar odds: {e}")
+        logger.debug("Erro ao validar odds: %s", e)
+        return (None, None, None)
+    
+    # Todas devem estar presentes e válidas
+    if home is None or draw is None or away is None:
+        logger.debug("Odds incompletas: home=%s, draw=%s, away=%s", home, draw, away)
         return (None, None, None)
+    
+    return (home, draw, away)
+
+
+def _validate_event_base(event_id: Any, home: Any, away: Any) -> Optional[Dict[str, Any]]:
+    """Valida id e nomes dos times (parte comum a todo evento); 'odds' fica None."""
+    # Validar event_id
+    try:
+        event_id = int(event_id) if event_id is not None else None
+        if event_id is None or event_id <= 0:
+            logger.debug("event_id inválido: %s", event_id)
+            return None
+    except (ValueError, TypeError):
+        logger.debug("event_id não é um número válido: %s", event_id)
+        return None
+    
+    # Validar nomes dos times (strip uma única vez por nome)
+    home_name = home.strip() if isinstance(home, str) else ""
+    if not home_name:
+        logger.debug("Nome do time da casa inválido: %s", home)
+        return None
+    
+    away_name = away.strip() if isinstance(away, str) else ""
+    if not away_name:
+        logger.debug("Nome do time visitante inválido: %s", away)
+        return None
+    
+    return {
+        'event_id': event_id,
+        'home': home_name,
+        'away': away_name,
+        'odds': None
+    }
 
 
 def validate_event_data(
@@ -87,46 +118,24 @@ def validate_event_data(
     Returns:
         Dict com dados validados ou None se inválido
     """
-    # Validar event_id
-    try:
-        event_id = int(event_id) if event_id is not None else None
-        if event_id is None or event_id <= 0:
-            logger.debug(f"event_id inválido: {event_id}")
-            return None
-    except (ValueError, TypeError):
-        logger.debug(f"event_id não é um número válido: {event_id}")
-        return None
+    data = _validate_event_base(event_id, home, away)
+    # Sem odds (ou evento já inválido): nada mais a validar
+    if data is None or (odds_home is None and odds_draw is None and odds_away is None):
+        return data
     
-    # Validar nomes dos times
-    if not home or not isinstance(home, str) or not home.strip():
-        logger.debug(f"Nome do time da casa inválido: {home}")
+    # Validar odds fornecidas
+    home_odd, draw_odd, away_odd = validate_odds(odds_home, odds_draw, odds_away)
+    if not (home_odd and draw_odd and away_odd):
+        # Se odds foram fornecidas mas são inválidas, retornar None
+        logger.debug("Odds fornecidas mas inválidas para evento %s", data['event_id'])
         return None
     
-    if not away or not isinstance(away, str) or not away.strip():
-        logger.debug(f"Nome do time visitante inválido: {away}")
-        return None
-    
-    # Validar odds se fornecidas
-    validated_odds = None
-    if odds_home is not None or odds_draw is not None or odds_away is not None:
-        home_odd, draw_odd, away_odd = validate_odds(odds_home, odds_draw, odds_away)
-        if home_odd and draw_odd and away_odd:
-            validated_odds = {
-                'home': home_odd,
-                'draw': draw_odd,
-                'away': away_odd
-            }
-        else:
-            # Se odds foram fornecidas mas são inválidas, retornar None
-            logger.debug(f"Odds fornecidas mas inválidas para evento {event_id}")
-            return None
-    
-    return {
-        'event_id': event_id,
-        'home': home.strip(),
-        'away': away.strip(),
-        'odds': validated_odds
+    data['odds'] = {
+        'home': home_odd,
+        'draw': draw_odd,
+        'away': away_odd
     }
+    return data
 
 
 def validate_tournament_data(
@@ -151,15 +160,15 @@ def validate_tournament_data(
     try:
         tournament_id = int(tournament_id) if tournament_id is not None else None
         if tournament_id is None or tournament_id <= 0:
-            logger.debug(f"tournament_id inválido: {tournament_id}")
+            logger.debug("tournament_id inválido: %s", tournament_id)
             return None
     except (ValueError, TypeError):
-        logger.debug(f"tournament_id não é um número válido: {tournament_id}")
+        logger.debug("tournament_id não é um número válido: %s", tournament_id)
         return None
     
     # Validar nome do torneio
     if not tournament_name or not isinstance(tournament_name, str) or not tournament_name.strip():
-        logger.debug(f"Nome do torneio inválido: {tournament_name}")
+        logger.debug("Nome do torneio inválido: %s", tournament_name)
         return None
     
     result = {
@@ -200,23 +209,34 @@ def validate_score(home_goals: Any, away_goals: Any) -> Optional[Tuple[int, int]
         if home is None or away is None:
             return None
         
-        # Gols devem ser >= 0
-        if home < 0 or away < 0:
-            logger.debug(f"Placar inválido (valores negativos): {home}-{away}")
-            return None
+        # Caminho comum: ambos na faixa válida (0 a _MAX_GOALS)
+        if 0 <= home <= _MAX_GOALS and 0 <= away <= _MAX_GOALS:
+            return (home, away)
         
-        # Gols não devem ser absurdamente altos (ex: > 50)
-        if home > 50 or away > 50:
-            logger.debug(f"Placar inválido (valores muito altos): {home}-{away}")
-            return None
-        
-        return (home, away)
+        if home < 0 or away < 0:
+            logger.debug("Placar inválido (valores negativos): %s-%s", home, away)
+        else:
+            # Gols não devem ser absurdamente altos (ex: > 50)
+            logger.debug("Placar inválido (valores muito altos): %s-%s", home, away)
+        return None
         
     except (ValueError, TypeError):
-        logger.debug(f"Erro ao validar placar: home_goals={home_goals}, away_goals={away_goals}")
+        logger.debug("Erro ao validar placar: home_goals=%s, away_goals=%s", home_goals, away_goals)
         return None
 
 
+@functools.lru_cache(maxsize=4096)
+def _validate_date_str(date_str: str) -> Optional[str]:
+    """Núcleo de validate_date_string; cacheado (as mesmas datas se repetem no scraping)."""
+    date_str = date_str.strip()
+    
+    if not date_str or len(date_str) < 8:  # Mínimo: "YYYYMMDD" ou "DD/MM/YY"
+        logger.debug("String de data muito curta: %s", date_str)
+        return None
+    
+    return date_str
+
+
 def validate_date_string(date_str: Any) -> Optional[str]:
     """
     Valida string de data.
@@ -230,19 +250,34 @@ def validate_date_string(date_str: Any) -> Optional[str]:
     if not date_str:
         return None
     
+    # Strings (caso comum) vão direto ao núcleo; só outros tipos passam por str()
     if not isinstance(date_str, str):
         try:
             date_str = str(date_str)
         except Exception:
             return None
     
-    date_str = date_str.strip()
+    # Curta demais mesmo antes do strip: rejeita sem ocupar o cache
+    if len(date_str) < 8:
+        logger.debug("String de data muito curta: %s", date_str.strip())
+        return None
     
-    if not date_str or len(date_str) < 8:  # Mínimo: "YYYYMMDD" ou "DD/MM/YY"
-        logger.debug(f"String de data muito curta: {date_str}")
+    return _validate_date_str(date_str)
+
+
+@functools.lru_cache(maxsize=4096)
+def _sanitize_str(s: str, max_length: int) -> Optional[str]:
+    """Núcleo de sanitize_string; cacheado (nomes de times e torneios se repetem muito)."""
+    s = s.strip()
+    if not s:
         return None
     
-    return date_str
+    # Limitar tamanho
+    if len(s) > max_length:
+        s = s[:max_length]
+        logger.debug("String truncada para %s caracteres", max_length)
+    
+    return s
 
 
 def sanitize_string(s: Any, max_length: int = 200) -> Optional[str]:
@@ -260,16 +295,7 @@ def sanitize_string(s: Any, max_length: int = 200) -> Optional[str]:
         return None
     
     try:
-        s = str(s).strip()
-        if not s:
-            return None
-        
-        # Limitar tamanho
-        if len(s) > max_length:
-            s = s[:max_length]
-            logger.debug(f"String truncada para {max_length} caracteres")
-        
-        return s
+        # Só strings entram no cache: str() de outros tipos é convertido antes
+        return _sanitize_str(s if isinstance(s, str) else str(s), max_length)
     except Exception:
         return None
-
@@ -4,11 +4,15 @@ Controla se o XHR deve ser usado ou se deve usar apenas HTML scraping.
 
 Quando o XHR falha, ele é desabilitado permanentemente até o script ser reiniciado.
 """
+import threading
 from typing import Optional
 from utils.logger import logger
 
-# Flag global: True = XHR desabilitado (usar apenas HTML), False = XHR habilitado
-_xhr_disabled: bool = False
+# Sinalizado = XHR desabilitado (usar apenas HTML); não sinalizado = XHR habilitado.
+# Os fetches rodam também em threads (asyncio.to_thread): o lock garante que
+# só a primeira chamada de disable_xhr/enable_xhr faz a transição e loga
+_xhr_disabled = threading.Event()
+_xhr_lock = threading.Lock()
 
 
 def is_xhr_disabled() -> bool:
@@ -19,7 +23,7 @@ def is_xhr_disabled() -> bool:
         True se XHR está desabilitado (deve usar apenas HTML scraping)
         False se XHR está habilitado (pode tentar usar XHR)
     """
-    return _xhr_disabled
+    return _xhr_disabled.is_set()
 
 
 def disable_xhr(reason: Optional[str] = None):
@@ -29,13 +33,16 @@ def disable_xhr(reason: Optional[str] = None):
     Args:
         reason: Motivo da desabilitação (opcional, para logs)
     """
-    global _xhr_disabled
-    
-    if not _xhr_disabled:
-        _xhr_disabled = True
-        reason_msg = f" - {reason}" if reason else ""
-        logger.warning(f"XHR API desabilitado permanentemente até reiniciar o script{reason_msg}")
-        logger.info("Sistema agora usará apenas HTML scraping (método 1)")
+    # Caminho comum: já desabilitado, sem pegar o lock
+    if _xhr_disabled.is_set():
+        return
+    with _xhr_lock:
+        if _xhr_disabled.is_set():
+            return
+        _xhr_disabled.set()
+    reason_msg = f" - {reason}" if reason else ""
+    logger.warning(f"XHR API desabilitado permanentemente até reiniciar o script{reason_msg}")
+    logger.info("Sistema agora usará apenas HTML scraping (método 1)")
 
 
 def enable_xhr():
@@ -45,11 +52,11 @@ def enable_xhr():
     Nota: Esta função geralmente não é chamada durante a execução normal.
     O XHR só é reabilitado quando o script é reiniciado (módulo recarregado).
     """
-    global _xhr_disabled
-    
-    if _xhr_disabled:
-        _xhr_disabled = False
-        logger.info("XHR API reabilitado")
+    with _xhr_lock:
+        if not _xhr_disabled.is_set():
+            return
+        _xhr_disabled.clear()
+    logger.info("XHR API reabilitado")
 
 
 def get_xhr_status() -> dict:
@@ -59,9 +66,11 @@ def get_xhr_status() -> dict:
     Returns:
         Dict com informações de status
     """
+    # Uma leitura só: os três campos ficam coerentes entre si
+    disabled = _xhr_disabled.is_set()
     return {
-        'disabled': _xhr_disabled,
-        'using_html_only': _xhr_disabled,
-        'will_retry_xhr': not _xhr_disabled
+        'disabled': disabled,
+        'using_html_only': disabled,
+        'will_retry_xhr': not disabled
     }
 
@@ -1,6 +1,6 @@
 """Módulo de gerenciamento da watchlist."""
 from .manager import (
-    wl_load, wl_save, wl_add, wl_remove,
+    wl_load, wl_save, wl_add, wl_add_many, wl_remove, wl_invalidate,
     rescan_watchlist_job
 )
 
@@ -1,7 +1,19 @@
 """Gerenciamento da watchlist."""
+import time
 from datetime import datetime
-from typing import Any, Callable, Dict
-from models.database import Stat, SessionLocal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from models.database import Stat, SessionLocal, WatchlistItem
+
+# Cópia em memória da watchlist (tabela watchlist_items): evita um SELECT por
+# wl_load/wl_add/wl_remove. As escritas mantêm a cópia em dia; o TTL só limita
+# a defasagem caso o banco seja alterado por fora do processo (ou use wl_invalidate)
+_WL_CACHE_TTL_SECONDS = 60.0
+_wl_cache: Optional[Dict[str, Any]] = None
+_wl_cache_at = 0.0
+# Chaves (ext_id, start_time ISO) dos itens da cópia: deduplicação O(1) em wl_add
+_wl_keys: Set[Tuple[Any, Any]] = set()
 
 
 def stat_get(session, key: str, default=None):
@@ -10,6 +22,18 @@ def stat_get(session, key: str, default=None):
     return (st.value if (st and st.value is not None) else default)
 
 
+def stat_get_many(session, keys: Iterable[str]) -> Dict[str, Any]:
+    """Obtém várias estatísticas do banco em uma única query (chaves ausentes ficam de fora)."""
+    keys = list(keys)
+    if not keys:
+        return {}
+    return {
+        st.key: st.value
+        for st in session.query(Stat).filter(Stat.key.in_(keys))
+        if st.value is not None
+    }
+
+
 def stat_set(session, key: str, value):
     """Define uma estatística no banco."""
     st = session.query(Stat).filter_by(key=key).one_or_none()
@@ -21,35 +45,154 @@ def stat_set(session, key: str, value):
     session.commit()
 
 
+def stat_set_many(session, values: Dict[str, Any]) -> None:
+    """Define várias estatísticas no banco com um único commit."""
+    if not values:
+        return
+    existing = {st.key: st for st in session.query(Stat).filter(Stat.key.in_(values.keys()))}
+    for key, value in values.items():
+        st = existing.get(key)
+        if st:
+            st.value = value
+        else:
+            session.add(Stat(key=key, value=value))
+    session.commit()
+
+
+def _wl_copy(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Cópia rasa com lista de itens própria (quem chama pode alterá-la à vontade)."""
+    return {**data, "items": list(data.get("items", []))}
+
+
+def _wl_set_cache(data: Dict[str, Any]) -> None:
+    """Guarda a cópia em memória e reconstrói o índice de chaves."""
+    global _wl_cache, _wl_cache_at, _wl_keys
+    _wl_cache = _wl_copy(data)
+    _wl_cache_at = time.monotonic()
+    _wl_keys = {(it.get("ext_id"), it.get("start_time")) for it in _wl_cache["items"]}
+
+
+def wl_invalidate() -> None:
+    """Descarta a cópia em memória; o próximo wl_load relê do banco."""
+    global _wl_cache
+    _wl_cache = None
+
+
 def wl_load(session) -> Dict[str, Any]:
-    """Carrega a watchlist do banco."""
-    return stat_get(session, "watchlist", {"items": []}) or {"items": []}
+    """Carrega a watchlist (da cópia em memória, ou do banco se expirada)."""
+    if _wl_cache is None or time.monotonic() - _wl_cache_at > _WL_CACHE_TTL_SECONDS:
+        rows = session.execute(
+            select(WatchlistItem.ext_id, WatchlistItem.link, WatchlistItem.start_time)
+            .order_by(WatchlistItem.id)
+        )
+        _wl_set_cache({"items": [
+            {"ext_id": ext_id, "link": link, "start_time": start_time}
+            for ext_id, link, start_time in rows
+        ]})
+    return _wl_copy(_wl_cache)
 
 
 def wl_save(session, data: Dict[str, Any]) -> None:
-    """Salva a watchlist no banco."""
-    stat_set(session, "watchlist", data)
+    """Substitui a watchlist inteira no banco e atualiza a cópia em memória."""
+    rows = {}
+    for it in data.get("items", []):
+        rows.setdefault((it.get("ext_id"), it.get("start_time")), {
+            "ext_id": it.get("ext_id"), "start_time": it.get("start_time"), "link": it.get("link"),
+        })
+    try:
+        session.execute(delete(WatchlistItem))
+        if rows:
+            session.execute(insert(WatchlistItem), list(rows.values()))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    _wl_set_cache(data)
 
 
 def wl_add(session, ext_id: str, link: str, start_time_utc: datetime) -> bool:
-    """Adiciona um item à watchlist."""
-    wl = wl_load(session)
-    items = wl.get("items", [])
-    if any((it.get("ext_id") == ext_id and it.get("start_time") == start_time_utc.isoformat()) for it in items):
+    """Adiciona um item à watchlist (um INSERT; duplicatas são ignoradas)."""
+    wl_load(session)
+    start_iso = start_time_utc.isoformat()
+    # Índice montado junto com a cópia em memória (que wl_load acabou de validar)
+    if (ext_id, start_iso) in _wl_keys:
+        return False
+    session.add(WatchlistItem(ext_id=ext_id, link=link, start_time=start_iso))
+    try:
+        session.commit()
+    except IntegrityError:
+        # Inserido por fora deste processo: a cópia em memória está defasada
+        session.rollback()
+        wl_invalidate()
         return False
-    items.append({"ext_id": ext_id, "link": link, "start_time": start_time_utc.isoformat()})
-    wl["items"] = items
-    wl_save(session, wl)
+    _wl_cache["items"].append({"ext_id": ext_id, "link": link, "start_time": start_iso})
+    _wl_keys.add((ext_id, start_iso))
     return True
 
 
-def wl_remove(session, predicate: Callable) -> int:
-    """Remove itens da watchlist baseado em um predicado."""
+def wl_add_many(session, items: Iterable[Tuple[str, str, datetime]]) -> List[Tuple[str, str]]:
+    """
+    Adiciona vários itens à watchlist com um único INSERT e um único commit.
+    
+    Args:
+        session: Sessão do banco
+        items: Tuplas (ext_id, link, start_time_utc)
+    
+    Returns:
+        Chaves (ext_id, start_time ISO) efetivamente adicionadas (duplicatas são ignoradas)
+    """
+    wl_load(session)
+    rows = {}
+    for ext_id, link, start_time_utc in items:
+        key = (ext_id, start_time_utc.isoformat())
+        if key not in _wl_keys and key not in rows:
+            rows[key] = {"ext_id": ext_id, "link": link, "start_time": key[1]}
+    if not rows:
+        return []
+    try:
+        session.execute(insert(WatchlistItem), list(rows.values()))
+        session.commit()
+    except IntegrityError:
+        # Algum item foi inserido por fora deste processo: cai no caminho item a item
+        session.rollback()
+        wl_invalidate()
+        return [
+            key for key, r in rows.items()
+            if wl_add(session, r["ext_id"], r["link"], datetime.fromisoformat(r["start_time"]))
+        ]
+    _wl_cache["items"].extend(rows.values())
+    _wl_keys.update(rows)
+    return list(rows)
+
+
+def wl_remove(session, predicate: Callable, commit: bool = True) -> int:
+    """
+    Remove itens da watchlist baseado em um predicado (um DELETE pelas chaves).
+    
+    Com commit=False o DELETE fica na transação de quem chama, que deve fazer o
+    commit (ou chamar wl_invalidate após um rollback).
+    """
     wl = wl_load(session)
-    before = len(wl.get("items", []))
-    wl["items"] = [it for it in wl.get("items", []) if not predicate(it)]
-    wl_save(session, wl)
-    return before - len(wl["items"])
+    keep, removed_keys = [], []
+    for it in wl["items"]:
+        if predicate(it):
+            removed_keys.append((it.get("ext_id"), it.get("start_time")))
+        else:
+            keep.append(it)
+    # Nada removido: não toca no banco
+    if not removed_keys:
+        return 0
+    try:
+        session.execute(
+            delete(WatchlistItem).where(tuple_(WatchlistItem.ext_id, WatchlistItem.start_time).in_(removed_keys))
+        )
+        if commit:
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    _wl_set_cache({**wl, "items": keep})
+    return len(removed_keys)
 
 
 async def rescan_watchlist_job():
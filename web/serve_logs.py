@@ -1,8 +1,8 @@
 """Servidor HTTP simples para visualizar logs (sem dependências externas)."""
 import os
 import sys
+import html
 import http.server
-import socketserver
 from pathlib import Path
 
 # Adiciona o diretório raiz ao path para importar config
@@ -18,160 +18,106 @@ except ImportError:
 PORT = int(os.getenv('LOG_VIEWER_PORT', 5000))
 LOG_PATH = Path(LOG_DIR).resolve()
 
+# Arquivos listados na página, do mais recente ao mais antigo (rotação do logger)
+_LOG_FILENAMES = ("betauto.log",) + tuple(f"betauto.log.{i}" for i in range(1, 6))
 
-class LogRequestHandler(http.server.SimpleHTTPRequestHandler):
-    """Handler customizado para servir logs com interface amigável."""
-    
-    def end_headers(self):
-        """Adiciona headers CORS opcionais."""
-        self.send_header('Access-Control-Allow-Origin', '*')
-        super().end_headers()
-    
-    def do_GET(self):
-        """Processa requisições GET."""
-        # Se for a raiz, serve a página HTML customizada
-        if self.path == '/' or self.path == '/index.html':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(self.get_index_html().encode('utf-8'))
-            return
-        
-        # Se for um arquivo de log específico, serve diretamente
-        if self.path.startswith('/betauto.log'):
-            file_path = LOG_PATH / self.path.lstrip('/')
-            if file_path.exists() and file_path.is_file():
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain; charset=utf-8')
-                self.send_header('Content-Length', str(file_path.stat().st_size))
-                self.end_headers()
-                with open(file_path, 'rb') as f:
-                    self.wfile.write(f.read())
-                return
-        
-        # Caso contrário, serve arquivos estáticos do diretório de logs
-        self.path = str(LOG_PATH / self.path.lstrip('/'))
-        return super().do_GET()
-    
-    def get_index_html(self):
-        """Retorna HTML da página principal."""
-        # Lista arquivos de log disponíveis
-        log_files = []
-        for i in range(6):
-            if i == 0:
-                filename = "betauto.log"
-            else:
-                filename = f"betauto.log.{i}"
-            file_path = LOG_PATH / filename
-            if file_path.exists():
-                size = file_path.stat().st_size
-                size_mb = size / (1024 * 1024)
-                log_files.append({
-                    'name': filename,
-                    'size': f"{size_mb:.2f} MB",
-                    'url': f"/{filename}"
-                })
-        
-        files_html = '\n'.join([
-            f'        <li><a href="{f["url"]}" target="_blank">{f["name"]}</a> <span style="color: #888;">({f["size"]})</span></li>'
-            for f in log_files
-        ])
-        
-        return f"""<!DOCTYPE html>
+# Página principal pré-montada: só a lista de arquivos e as informações do
+# servidor variam entre requisições (o CSS não é reprocessado a cada GET /)
+_INDEX_HTML_HEAD = """<!DOCTYPE html>
 <html lang="pt-BR">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Logs - BetAuto</title>
     <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             background: #1a1a1a;
             color: #e0e0e0;
             padding: 20px;
             line-height: 1.6;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #4CAF50;
             margin-bottom: 10px;
             font-size: 28px;
-        }}
-        .subtitle {{
+        }
+        .subtitle {
             color: #888;
             margin-bottom: 30px;
             font-size: 14px;
-        }}
-        .info-box {{
+        }
+        .info-box {
             background: #2a2a2a;
             padding: 20px;
             border-radius: 8px;
             margin-bottom: 20px;
-        }}
-        .info-box h2 {{
+        }
+        .info-box h2 {
             color: #4CAF50;
             margin-bottom: 15px;
             font-size: 20px;
-        }}
-        .file-list {{
+        }
+        .file-list {
             list-style: none;
             padding: 0;
-        }}
-        .file-list li {{
+        }
+        .file-list li {
             padding: 12px;
             margin: 8px 0;
             background: #1a1a1a;
             border-radius: 4px;
             border-left: 3px solid #4CAF50;
-        }}
-        .file-list a {{
+        }
+        .file-list a {
             color: #4CAF50;
             text-decoration: none;
             font-weight: bold;
             font-size: 16px;
-        }}
-        .file-list a:hover {{
+        }
+        .file-list a:hover {
             color: #66BB6A;
             text-decoration: underline;
-        }}
-        .instructions {{
+        }
+        .instructions {
             background: #2a2a2a;
             padding: 20px;
             border-radius: 8px;
             margin-top: 20px;
-        }}
-        .instructions h3 {{
+        }
+        .instructions h3 {
             color: #4CAF50;
             margin-bottom: 10px;
-        }}
-        .instructions ul {{
+        }
+        .instructions ul {
             margin-left: 20px;
             color: #bbb;
-        }}
-        .instructions li {{
+        }
+        .instructions li {
             margin: 8px 0;
-        }}
-        code {{
+        }
+        code {
             background: #1a1a1a;
             padding: 2px 6px;
             border-radius: 3px;
             color: #4CAF50;
             font-family: 'Courier New', monospace;
-        }}
-        .note {{
+        }
+        .note {
             background: #3a2a1a;
             border-left: 3px solid #ff9800;
             padding: 15px;
             margin-top: 20px;
             border-radius: 4px;
-        }}
-        .note strong {{
+        }
+        .note strong {
             color: #ff9800;
-        }}
+        }
     </style>
 </head>
 <body>
@@ -182,8 +128,9 @@ class LogRequestHandler(http.server.SimpleHTTPRequestHandler):
         <div class="info-box">
             <h2>📁 Arquivos de Log Disponíveis</h2>
             <ul class="file-list">
-{files_html if files_html else '                <li style="color: #888;">Nenhum arquivo de log encontrado.</li>'}
-            </ul>
+"""
+_INDEX_HTML_NO_FILES = '                <li style="color: #888;">Nenhum arquivo de log encontrado.</li>\n'
+_INDEX_HTML_MIDDLE = """            </ul>
         </div>
         
         <div class="instructions">
@@ -201,17 +148,102 @@ class LogRequestHandler(http.server.SimpleHTTPRequestHandler):
             para encontrar palavras-chave, níveis de log (ERROR, WARNING, INFO), ou horários específicos.
         </div>
         
-        <div class="info-box" style="margin-top: 20px;">
+"""
+_INDEX_HTML_SERVER_INFO = """        <div class="info-box" style="margin-top: 20px;">
             <h2>📊 Informações do Servidor</h2>
-            <p><strong>Diretório de logs:</strong> <code>{LOG_PATH}</code></p>
-            <p><strong>Porta:</strong> <code>{PORT}</code></p>
-            <p><strong>URL:</strong> <code>http://{self.server.server_name or 'localhost'}:{PORT}</code></p>
+            <p><strong>Diretório de logs:</strong> <code>{log_path}</code></p>
+            <p><strong>Porta:</strong> <code>{port}</code></p>
+            <p><strong>URL:</strong> <code>http://{host}:{port}</code></p>
         </div>
     </div>
 </body>
 </html>"""
 
 
+class LogRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Handler customizado para servir logs com interface amigável."""
+    
+    # Keep-alive: o navegador reaproveita a conexão (toda resposta tem Content-Length)
+    protocol_version = "HTTP/1.1"
+    
+    def end_headers(self):
+        """Adiciona headers CORS opcionais."""
+        self.send_header('Access-Control-Allow-Origin', '*')
+        super().end_headers()
+    
+    def do_GET(self):
+        """Processa requisições GET."""
+        # Se for a raiz, serve a página HTML customizada
+        if self.path == '/' or self.path == '/index.html':
+            body = self.get_index_html().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        
+        # Se for um arquivo de log específico, serve diretamente
+        if self.path.startswith('/betauto.log'):
+            file_path = LOG_PATH / self.path.lstrip('/')
+            if file_path.exists() and file_path.is_file():
+                with open(file_path, 'rb') as f:
+                    # Tamanho do arquivo aberto: o log pode crescer durante o envio
+                    size = os.fstat(f.fileno()).st_size
+                    self.send_response(200)
+                    self.send_header('Content-type', 'text/plain; charset=utf-8')
+                    self.send_header('Content-Length', str(size))
+                    self.end_headers()
+                    # Envia em streaming (os.sendfile quando disponível), sem
+                    # carregar o arquivo inteiro na memória
+                    self.connection.sendfile(f, 0, size)
+                return
+        
+        # Caso contrário, serve arquivos estáticos do diretório de logs
+        self.path = str(LOG_PATH / self.path.lstrip('/'))
+        return super().do_GET()
+    
+    def get_index_html(self):
+        """Retorna HTML da página principal."""
+        # Lista arquivos de log disponíveis: uma leitura do diretório (os.scandir
+        # já traz o tipo e o stat sai do DirEntry) em vez de exists()+stat() por nome
+        sizes = {}
+        try:
+            with os.scandir(LOG_PATH) as it:
+                for entry in it:
+                    if entry.name in _LOG_FILENAMES and entry.is_file():
+                        sizes[entry.name] = entry.stat().st_size
+        except OSError:
+            pass  # Diretório inexistente/inacessível: lista vazia
+        
+        log_files = []
+        for filename in _LOG_FILENAMES:
+            if filename in sizes:
+                size_mb = sizes[filename] / (1024 * 1024)
+                log_files.append({
+                    'name': filename,
+                    'size': f"{size_mb:.2f} MB",
+                    'url': f"/{filename}"
+                })
+        
+        files_html = '\n'.join([
+            f'        <li><a href="{f["url"]}" target="_blank">{f["name"]}</a> <span style="color: #888;">({f["size"]})</span></li>'
+            for f in log_files
+        ])
+        
+        return "".join((
+            _INDEX_HTML_HEAD,
+            files_html + "\n" if files_html else _INDEX_HTML_NO_FILES,
+            _INDEX_HTML_MIDDLE,
+            # Valores vindos do ambiente/rede são escapados antes de entrar no HTML
+            _INDEX_HTML_SERVER_INFO.format(
+                log_path=html.escape(str(LOG_PATH)),
+                port=PORT,
+                host=html.escape(self.server.server_name or 'localhost'),
+            ),
+        ))
+
+
 def main():
     """Inicia o servidor HTTP."""
     # Verificar se o diretório de logs existe
@@ -223,8 +255,8 @@ def main():
     # Mudar para o diretório de logs para servir arquivos
     os.chdir(LOG_PATH)
     
-    # Criar servidor
-    with socketserver.TCPServer(("", PORT), LogRequestHandler) as httpd:
+    # Criar servidor (uma thread por conexão: um download grande não trava o índice)
+    with http.server.ThreadingHTTPServer(("", PORT), LogRequestHandler) as httpd:
         print(f"🌐 Servidor de logs iniciado!")
         print(f"📁 Diretório: {LOG_PATH}")
         print(f"🔗 URL: http://localhost:{PORT}")